@@ -2,18 +2,26 @@ import os
 import time
 import logging
 import socket
+import threading
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path='../.env')
+load_dotenv(dotenv_path='.env')
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Check if environment variables are loaded correctly
-from dotenv import load_dotenv
-import os
-import mysql.connector
-import logging
+# Connection settings are read once at import instead of re-parsing .env on every call
+_DB_HOST = os.getenv("DB_HOST", "")
+_DB_PORT = os.getenv("DB_PORT")
+_DB_USER = os.getenv("DB_USER")
+_DB_PASS = os.getenv("DB_PASS")
+_DB_NAME = os.getenv("DB_NAME")
+_DB_SSL_CA = os.getenv("DB_SSL_CA")  # optional path to CA pem for managed DBs
+_DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
 def _split_host_and_port(host_raw):
     host_raw = (host_raw or "").strip()
     if not host_raw:
@@ -39,16 +47,13 @@ def get_db_connection(retries: int = 3, backoff: float = 1.0):
       - Tries both use_pure True/False implementations
       - Supports optional DB_SSL_CA (path to CA file)
     """
-    load_dotenv(dotenv_path=".env")
-    host_raw = os.getenv("DB_HOST", "")
-    host_parsed, host_port = _split_host_and_port(host_raw)
-    port_env = os.getenv("DB_PORT")
-    port = int(port_env) if port_env and port_env.isdigit() else (host_port or 3306)
+    host_parsed, host_port = _split_host_and_port(_DB_HOST)
+    port = int(_DB_PORT) if _DB_PORT and _DB_PORT.isdigit() else (host_port or 3306)
 
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASS")
-    database = os.getenv("DB_NAME")
-    ssl_ca = os.getenv("DB_SSL_CA")  # optional path to CA pem for managed DBs
+    user = _DB_USER
+    password = _DB_PASS
+    database = _DB_NAME
+    ssl_ca = _DB_SSL_CA
 
     logging.info("DB connect params: host=%s port=%s user=%s db=%s ssl_ca=%s", host_parsed, port, user, database, bool(ssl_ca))
     print("DB_HOST:", host_parsed, "DB_PORT:", port, "DB_USER:", user, "DB_NAME:", database, "DB_SSL_CA set:", bool(ssl_ca))
@@ -103,18 +108,60 @@ def get_db_connection(retries: int = 3, backoff: float = 1.0):
 
     logging.error("All connection attempts failed: %s", last_exc)
     raise last_exc
-def execute_with_retry(conn, sql_query, params=None, retries=3, initial_delay=0.1):
+def _get_pool():
+    """Process-wide connection pool, created on first use."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                host_parsed, host_port = _split_host_and_port(_DB_HOST)
+                port = int(_DB_PORT) if _DB_PORT and _DB_PORT.isdigit() else (host_port or 3306)
+                connect_kwargs = dict(
+                    host=host_parsed,
+                    port=port,
+                    user=_DB_USER,
+                    password=_DB_PASS,
+                    database=_DB_NAME,
+                    connection_timeout=8,
+                    # C extension when it is built, pure Python otherwise
+                    use_pure=not getattr(mysql.connector, "HAVE_CEXT", False),
+                )
+                if _DB_SSL_CA:
+                    connect_kwargs.update({"ssl_ca": _DB_SSL_CA, "ssl_verify_cert": True})
+                _POOL = pooling.MySQLConnectionPool(pool_name="fetch", pool_size=_DB_POOL_SIZE, **connect_kwargs)
+                logging.info("Created DB connection pool (size=%d)", _DB_POOL_SIZE)
+    return _POOL
+
+def get_pooled_connection():
+    """
+    Connection borrowed from the shared pool; close() hands it back instead of
+    tearing down the socket. Falls back to get_db_connection() when the pool
+    cannot be created or is exhausted.
+    """
+    try:
+        return _get_pool().get_connection()
+    except Error as e:
+        logging.warning("Pooled connection unavailable (%s); opening a direct connection", e)
+        return get_db_connection()
+
+def execute_with_retry(conn, sql_query, params=None, retries=3, initial_delay=0.1, cursor=None):
     """
     Executes a given SQL query with retry mechanism on failure.
     Retries the execution in case of errors like deadlocks or connection issues.
+    Pass a long-lived `cursor` (e.g. conn.cursor(prepared=True) for a statement that is
+    executed many times with different params) to avoid opening a cursor per call;
+    the caller owns and closes it.
     """
-    load_dotenv(dotenv_path='../.env')
     delay = initial_delay
     for i in range(retries):
         try:
-            with conn.cursor() as cur:
-                cur.execute(sql_query, params)
-                conn.commit()  # Make sure changes are committed
+            if cursor is not None:
+                cursor.execute(sql_query, params)
+                conn.commit()
+            else:
+                with conn.cursor() as cur:
+                    cur.execute(sql_query, params)
+                    conn.commit()  # Make sure changes are committed
             return
         except (Error) as e:
             conn.rollback()
@@ -133,43 +180,42 @@ def create_and_populate_table(conn, table_name, table_schema, data_to_insert=Non
     Creates and populates a table with data.
     Drops the table if it exists, creates a new one, and inserts the provided data.
     """
-    load_dotenv(dotenv_path='../.env')
-    drop_table_sql = f"DROP TABLE IF EXISTS {table_name};"
-    execute_with_retry(conn, drop_table_sql)
-    logging.info(f"Dropped table {table_name}.")
+    # one cursor for DROP, CREATE and every insert batch
+    with conn.cursor() as cur:
+        drop_table_sql = f"DROP TABLE IF EXISTS {table_name};"
+        execute_with_retry(conn, drop_table_sql, cursor=cur)
+        logging.info(f"Dropped table {table_name}.")
+
+        create_table_sql = table_schema["ddl"]
+        execute_with_retry(conn, create_table_sql, cursor=cur)
+        logging.info(f"Created table {table_name}.")
 
-    create_table_sql = table_schema["ddl"]
-    execute_with_retry(conn, create_table_sql)
-    logging.info(f"Created table {table_name}.")
+        if not data_to_insert:
+            return []
 
-    if data_to_insert:
         columns = table_schema["columns"]
         insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
-        
-        if returning_col:
-            # MySQL doesn't support RETURNING like PostgreSQL; handle this differently.
-            insert_sql += f" RETURNING {returning_col}"
 
         batch_size = 1000
         total_inserted = 0
         returned_ids = []
 
-        with conn.cursor() as cur:
-            for i in range(0, len(data_to_insert), batch_size):
-                batch = data_to_insert[i:i + batch_size]
-                if not batch:
-                    continue
-
-                cur.executemany(insert_sql, batch)
-                if returning_col:
-                    cur.execute(insert_sql, batch)
-                    returned_ids.extend([row[0] for row in cur.fetchall()])
-                else:
-                    conn.commit()  # Commit the batch insertion
-
-                total_inserted += len(batch)
-                logging.info(f"Inserted {total_inserted}/{len(data_to_insert)} rows into {table_name}.")
-        
+        for i in range(0, len(data_to_insert), batch_size):
+            batch = data_to_insert[i:i + batch_size]
+            if not batch:
+                continue
+
+            cur.executemany(insert_sql, batch)
+            if returning_col:
+                # MySQL has no RETURNING; executemany sends the batch as one multi-row
+                # INSERT, so LAST_INSERT_ID() is the first AUTO_INCREMENT id of the batch.
+                first_id = cur.lastrowid
+                if first_id:
+                    returned_ids.extend(range(first_id, first_id + cur.rowcount))
+            conn.commit()  # Commit the batch insertion
+
+            total_inserted += len(batch)
+            logging.info(f"Inserted {total_inserted}/{len(data_to_insert)} rows into {table_name}.")
+
         return returned_ids
-    return []
 
@@ -1,17 +1,35 @@
 import os
 import sys
+import errno
+import io
+import shutil
 import time
 import uuid
 import threading
+import functools
+import hashlib
+import sqlite3
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 from datetime import datetime, timezone
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import shutil
-import json
+from flask import Flask, Response, render_template, request, send_from_directory
 import json
+from pathlib import Path
 import logging
-import builtins
+import logging.handlers
+import queue
+import atexit
 import traceback
-from werkzeug.utils import safe_join
+from werkzeug.utils import safe_join, secure_filename
+from urllib.parse import quote
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
 from flask import send_from_directory, abort
 from markupsafe import escape
 from flask import send_file, abort
@@ -19,238 +37,751 @@ from flask import render_template, abort
 from flask import render_template, abort
 from flask import send_file, abort
 # -------------------- INITIAL SETUP --------------------
-print("[INIT] Starting Flask pipeline service...")
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s - %(levelname)s - %(message)s")
+log = logging.getLogger("flask_app")
+
+log.info("[INIT] Starting Flask pipeline service...")
 
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
-print(f"[INIT] Project root: {project_root}")
+log.info("[INIT] Project root: %s", project_root)
 
 # -------------------- MODULE IMPORTS --------------------
 try:
     from modules.query_Cleaner import clean_text, save_to_txt
-    from modules.conversions import process_uploaded_files, convert_html_to_csv
-    from modules.metadata import generate_metadata, get_csv_files_from_directory
+    from modules.conversions import process_uploaded_files, convert_html_to_csv, is_convertible
+    from modules.metadata import generate_metadata, get_csv_files_from_directory, has_csv_files, invalidate_csv_cache
     from modules.conceptual_Designer import generate_dimensional_model
     from modules.schema_Generator import generate_schema, schema_correction
     from modules.schema_Testing import run_phase1, run_phase2
     from modules.schema_Correction import correction
-    from modules.sql_Create_Writer import generate_create_sql_writer_script
+    from modules.sql_Create_Writer import generate_create_sql_writer_script, evict_create_sql_writer_script
     from modules.reorder_create_sql import reorder_create_sql_file
     from modules.execute_sql_script import execute_sql_from_file
     from modules.insert_Push_data import load_csvs_into_db
     from modules.files_to_tables import table_converter
     from modules.fetch_tables import fetch_tables_with_insert_stats as _fetch_stats
-    from modules.script_Runner import run_python_code
-    from modules.data_Fetch import fetch_from_dynamodb, fetch_from_s3, fetch_from_cosmosdb
-    print("[INIT] All module imports successful.")
+    from modules.script_Runner import run_python_file
+    from modules.data_Fetch import iter_dynamodb_items, fetch_from_s3, iter_cosmosdb_docs, write_json_records
+    log.info("[INIT] All module imports successful.")
 except Exception as e:
-    print(f"[ERROR] Failed to import modules: {e}")
+    log.error("[ERROR] Failed to import modules: %s", e)
     raise
 
 # -------------------- FLASK CONFIG --------------------
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'Run_Space'
 app.config['TEMPLATES_AUTO_RELOAD'] = True
+# Let the front web server stream artifacts with sendfile(2) (emits X-Sendfile; only enable behind a server that honours it)
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+# nginx ignores X-Sendfile; behind it, Run_Space files are handed off with X-Accel-Redirect
+# to an `internal` location that aliases the Run_Space folder (see README).
+app.config['BEHIND_NGINX'] = os.getenv('BEHIND_NGINX', '').lower() in ('1', 'true', 'yes')
+app.config['ACCEL_REDIRECT_PREFIX'] = os.getenv('ACCEL_REDIRECT_PREFIX', '/_run_space/')
 
-print(f"[CONFIG] Upload folder set to: {app.config['UPLOAD_FOLDER']}")
+log.info("[CONFIG] Upload folder set to: %s", app.config['UPLOAD_FOLDER'])
 
 tasks = {}
-approval_events = {}
-# Thread-local to keep track of the currently active task for print capture
+_tasks_get = tasks.get  # bound once for the per-record log path
+# Thread-local to keep track of the currently active task for log capture
 current_task = threading.local()
 
-# Save original print and override it to capture terminal output into task system logs
-_original_print = builtins.print
-def _attach_system_log(task_id, message):
-    try:
-        if task_id in tasks:
-            tasks[task_id].setdefault('system_logs', []).append({
-                'time': datetime.now(timezone.utc).isoformat(),
-                'text': message
-            })
-    except Exception:
-        # avoid raising from logging helpers
-        pass
-
-def _custom_print(*args, **kwargs):
-    # Write to original stdout
-    _original_print(*args, **kwargs)
+# Background work runs on bounded pools instead of a thread per request; extra work queues
+# until a worker frees up. New runs (generation, fetch) and follow-ups on a run the user is
+# already reviewing (continue after approval, corrections) queue separately, so a burst of
+# new uploads cannot hold a review response behind them.
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '16'))
+PIPELINE_POOL = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+REVIEW_WORKERS = int(os.getenv('REVIEW_WORKERS', '4'))
+REVIEW_POOL = ThreadPoolExecutor(max_workers=REVIEW_WORKERS, thread_name_prefix="review")
+
+# Independent LLM calls inside one pipeline run are overlapped on this pool (see _call_in_task)
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', '8'))
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+def _call_in_task(task_id, fn, *args, **kwargs):
+    """Run fn on a pool thread with its log output attributed to `task_id`."""
+    current_task.task_id = task_id
     try:
-        msg = ' '.join(str(a) for a in args)
-        task_id = getattr(current_task, 'task_id', None)
-        if task_id and task_id in tasks:
-            _attach_system_log(task_id, msg)
-    except Exception:
-        pass
+        return fn(*args, **kwargs)
+    finally:
+        del current_task.task_id
+
+# Log records are queued here and attached to task state by a single listener
+# thread, so emitting threads never format or touch `tasks`.
+_log_queue = queue.SimpleQueue()
+
+# Oldest system log lines are dropped past this many per task
+SYSTEM_LOG_MAXLEN = 10_000
+
+# A parked approval step is dropped if nobody approves it within this many seconds
+APPROVAL_TIMEOUT_S = int(os.getenv('APPROVAL_TIMEOUT_S', '3600'))
+
+# Oldest chat log entries are dropped past this many per task
+LOG_MAXLEN = 2_000
+
+def _new_system_log():
+    return deque(maxlen=SYSTEM_LOG_MAXLEN)
+
+def _new_log():
+    return deque(maxlen=LOG_MAXLEN)
+
+@dataclass(frozen=True, slots=True)
+class TaskPaths:
+    """Absolute paths of the artifacts every task reads or writes, resolved once when the task is registered."""
+    metadata: str
+    dim_model: str
+    user_query: str
+    puml: str
+    png: str
+    errors: str
+    testcases: str
+    feedback: str
+    create_script: str
+    create_sql: str
+    table_converter: str
+
+    @classmethod
+    def for_task(cls, task_dir):
+        prefix = task_dir.rstrip(os.sep) + os.sep
+        return cls(
+            metadata=prefix + "metadata.json",
+            dim_model=prefix + "dimensional_model.json",
+            user_query=prefix + "refined_User_Query.txt",
+            puml=prefix + "relationship_schema.puml",
+            png=prefix + "relationship_schema.png",
+            errors=prefix + "errors.json",
+            testcases=prefix + "testcases_prompt.json",
+            feedback=prefix + "user_feedback.txt",
+            create_script=prefix + "create_Database_Script.py",
+            create_sql=prefix + "create_schema.sql",
+            table_converter=prefix + "generated_table_converter.py",
+        )
 
-# Monkeypatch builtins.print to capture prints. Keep idempotent check.
-if builtins.print is not _custom_print:
-    builtins.print = _custom_print
+@dataclass(slots=True)
+class TaskRecord:
+    """State of one pipeline run. Containers are created up front so hot paths just append."""
+    context: str
+    task_dir: str = ""
+    # canonical artifact paths, see TaskPaths.for_task()
+    paths: Optional[TaskPaths] = field(default=None, repr=False)
+    status: str = "Starting..."
+    # chat log shown in the UI: (epoch, role, text, extra fields or None), bounded
+    logs: deque = field(default_factory=_new_log)
+    # system terminal logs captured for debugging and display: (epoch, level, text), bounded
+    system_logs: deque = field(default_factory=_new_system_log)
+    # images are registered as they are generated; keep list for history
+    images: list = field(default_factory=list)
+    schema_image_url: str = ""
+    awaiting_approval: Optional[str] = None
+    table_preview: Optional[dict] = None
+    # next continue-pipeline step, set while awaiting approval
+    resume: Optional[Callable] = None
+    awaiting_since: float = 0.0  # time.monotonic() when the step was parked
+    # latest PIPELINE_POOL submission for this task, for /cancel
+    future: Optional[Future] = field(default=None, repr=False)
+    cancelled: bool = False
+    # guards mutations made from pipeline threads against /status snapshots; reentrant so
+    # helpers that take it can call each other
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    # (key, body) of the last /status response, see status_json()
+    status_cache: Optional[tuple] = field(default=None, repr=False)
+
+    def path(self, filename):
+        """Absolute path of `filename` in the task folder (canonical artifacts are on `paths`)."""
+        return self.task_dir.rstrip(os.sep) + os.sep + filename
+
+    def await_approval(self, phase, step):
+        """Park the pipeline until `phase` ('create' / 'insert') is approved; `step` runs on approval."""
+        with self.lock:
+            if self.cancelled:
+                return
+            self.resume = step
+            self.awaiting_approval = phase
+            self.awaiting_since = time.monotonic()
+
+    def submit(self, fn, *args, pool=None):
+        """Run `fn(*args)` on `pool` (default PIPELINE_POOL) and remember the future for /cancel."""
+        with self.lock:
+            if self.cancelled:
+                return None
+            self.future = (pool or PIPELINE_POOL).submit(fn, *args)
+            return self.future
+
+    def cancel(self):
+        """Stop the task: a queued run never starts, parked steps are dropped and later
+        pipeline stages are skipped. A stage already running finishes its current call.
+        Returns True if a queued run was prevented from starting."""
+        with self.lock:
+            self.cancelled = True
+            self.resume, self.awaiting_approval = None, None
+            self.status = "Cancelled"
+            return self.future.cancel() if self.future is not None else False
+
+    def expire_approval(self):
+        """Drop a parked step that has waited longer than APPROVAL_TIMEOUT_S; True if one was dropped."""
+        with self.lock:
+            if self.resume is None or time.monotonic() - self.awaiting_since < APPROVAL_TIMEOUT_S:
+                return False
+            phase = self.awaiting_approval
+            self.resume, self.awaiting_approval = None, None
+            self.status = f"Approval expired: {phase}"
+        return True
+
+    def take_resume(self, phase):
+        """Atomically claim the step parked for `phase`.
+
+        Returns None if nothing is parked, it was already claimed, or the pipeline is waiting
+        on a different phase; in that last case the parked step is left in place.
+        """
+        with self.lock:
+            if self.resume is None or self.awaiting_approval != phase:
+                return None
+            step, self.resume, self.awaiting_approval = self.resume, None, None
+        return step
+
+    def to_dict(self):
+        """JSON-ready view for /status; timestamps become ISO strings here. Call with `lock` held."""
+        return {
+            "status": self.status,
+            "logs": [_log_entry_dict(entry) for entry in list(self.logs)],
+            "system_logs": [
+                {'time': _iso(ts), 'level': level, 'text': text}
+                for ts, level, text in list(self.system_logs)
+            ],
+            "images": list(self.images),
+            "schema_image_url": self.schema_image_url,
+            "awaiting_approval": self.awaiting_approval,
+            "table_preview": self.table_preview,
+            "context": self.context,
+        }
 
-# Logging handler to capture logging module output and attach it to the current task
+    def status_json(self):
+        """Encoded to_dict(), rebuilt only when something it shows has changed since the last poll."""
+        logs, system_logs = self.logs, self.system_logs
+        # snapshot under the lock, encode after releasing it so writers are not held up
+        with self.lock:
+            key = (
+                # bounded deques stop growing once full, so their newest entries stand in for their lengths
+                len(logs), logs[-1] if logs else None,
+                len(system_logs), system_logs[-1] if system_logs else None,
+                self.status, self.awaiting_approval, len(self.images), self.schema_image_url,
+                id(self.table_preview), self.context,
+            )
+            cached = self.status_cache
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            snapshot = self.to_dict()
+        body = _json_bytes(snapshot)
+        self.status_cache = (key, body)
+        return body
+
+_UTC = timezone.utc
+
+def _log_entry_dict(entry):
+    ts, role, text, extra = entry
+    d = {"role": role, "text": text, "time": _iso(ts)}
+    if extra:
+        d.update(extra)
+    return d
+
+@functools.lru_cache(maxsize=4096)
+def _iso(ts):
+    """Epoch seconds -> ISO-8601 UTC string (cached; /status re-serializes the same entries on every poll)."""
+    return datetime.fromtimestamp(ts, _UTC).isoformat(timespec='milliseconds')
+
+class _TaskContextFilter(logging.Filter):
+    """Stamp records with the emitting thread's task id before they are queued.
+
+    Records from threads with no live task are rejected here, so they are never
+    queued, buffered or formatted only to be discarded by TaskLogHandler.
+    """
+    def filter(self, record):
+        try:
+            tid = current_task.task_id
+        except AttributeError:
+            return False
+        if tid not in tasks:
+            return False
+        record.task_id = tid
+        return True
+
+class _TaskQueueHandler(logging.handlers.QueueHandler):
+    # Records stay in-process (task capture and console listeners), so skip QueueHandler's eager format()/copy on the caller thread.
+    def prepare(self, record):
+        return record
+
+# Logging handler to capture logging module output and attach it to the owning task.
+# Runs on the QueueListener thread.
 class TaskLogHandler(logging.Handler):
     def __init__(self):
         super().__init__()
         self.setLevel(logging.INFO)
-        self.formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        # time and level are stored alongside the text, so only the message is formatted
+        self.formatter = logging.Formatter('%(message)s')
+        # set while this thread is inside emit(), so anything logged during capture is not captured again
+        self._capturing = threading.local()
 
     def emit(self, record):
+        state = self._capturing
+        if getattr(state, 'active', False):
+            return
+        state.active = True
         try:
-            msg = self.format(record)
-            task_id = getattr(current_task, 'task_id', None)
-            if task_id and task_id in tasks:
-                # Use record.created (epoch) converted to ISO to preserve original time
-                ts = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
-                tasks[task_id].setdefault('system_logs', []).append({
-                    'time': ts,
-                    'text': msg
-                })
+            # the filter only queues records for known tasks; re-check in case one was dropped since
+            task = _tasks_get(record.task_id)
+            if task is not None:
+                # raw epoch (record.created); converted to ISO only when /status serializes the task
+                task.system_logs.append((record.created, record.levelname, self.format(record)))
         except Exception:
             # Never let logging capture raise
             pass
-
-# Attach our handler to the root logger so library logs (and Flask/werkzeug) are captured.
+        finally:
+            state.active = False
+
+class _TimedMemoryHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that also flushes once `interval` seconds have passed since the last flush."""
+    def __init__(self, capacity, flushLevel, target, interval=0.1):
+        super().__init__(capacity, flushLevel=flushLevel, target=target)
+        self.interval = interval
+        self._last_flush = time.monotonic()
+
+    def shouldFlush(self, record):
+        return super().shouldFlush(record) or (time.monotonic() - self._last_flush) >= self.interval
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+# Console output: move basicConfig's stream handler behind a queue so the stderr
+# write (and the formatting) happens on a listener thread, not in request handlers.
+_root_logger = logging.getLogger()
+_console_handlers = list(_root_logger.handlers)
+for _h in _console_handlers:
+    _root_logger.removeHandler(_h)
+_console_queue = queue.SimpleQueue()
+_root_logger.addHandler(_TaskQueueHandler(_console_queue))
+_console_listener = logging.handlers.QueueListener(_console_queue, *_console_handlers, respect_handler_level=True)
+_console_listener.start()
+atexit.register(_console_listener.stop)
+
+# Attach a queue handler to the root logger so library logs (and Flask/werkzeug) are captured.
 _task_log_handler = TaskLogHandler()
-logging.getLogger().addHandler(_task_log_handler)
-
+# Batch records in front of TaskLogHandler; /status flushes it so polls never lag.
+_task_log_buffer = _TimedMemoryHandler(256, flushLevel=logging.ERROR, target=_task_log_handler)
+_task_log_buffer.setLevel(logging.INFO)
+_queue_handler = _TaskQueueHandler(_log_queue)
+# match the buffer's level so DEBUG records are dropped before they reach the queue
+_queue_handler.setLevel(logging.INFO)
+_queue_handler.addFilter(_TaskContextFilter())
+logging.getLogger().addHandler(_queue_handler)
+_log_listener = logging.handlers.QueueListener(_log_queue, _task_log_buffer, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+def _link_replace(src, dst):
+    """Point `dst` at `src`'s bytes: a hard link swapped in atomically, or a copy across filesystems."""
+    tmp = dst + ".tmp"
+    try:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.link(src, tmp)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP):
+            raise
+        shutil.copy2(src, tmp)
+    # readers of dst see either the old image or the new one, never a missing file
+    os.replace(tmp, dst)
 
 def generate_and_register_schema(task_id, schema_context, reasoning=None):
     """Generate a schema PUML + PNG and register the PNG in the task record.
 
     This creates a timestamped PNG (so previous images are preserved) and
-    updates tasks[task_id]["schema_image_url"] and tasks[task_id]["images"].
+    updates the task record's schema_image_url and images.
     """
     task = tasks.get(task_id)
     if task is None:
         raise RuntimeError(f"Unknown task: {task_id}")
 
-    base = app.config['UPLOAD_FOLDER']
-    task_dir = os.path.join(base, task_id)
+    task_dir = task.task_dir
+    paths = task.paths
 
-    def get_path(filename):
-        return os.path.join(task_dir, filename)
-
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
-    png_name = f"relationship_schema.png"
-    puml_name = "relationship_schema.puml"  # keep canonical PUML filename
+    now = time.time()
+    timestamp = time.strftime('%Y%m%d%H%M%S', time.gmtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    png_name = f"relationship_schema_{timestamp}.png"
 
     # Ensure output dir exists
     os.makedirs(task_dir, exist_ok=True)
 
-    print(f"[SCHEMA] Generating schema image: {png_name} (task {task_id[:8]})")
+    log.info("[SCHEMA] Generating schema image: %s (task %s)", png_name, task_id[:8])
     # If reasoning is not passed in, generate it. Otherwise, use the provided reasoning.
     png_path, generated_reasoning = generate_schema(
-        dimensional_model_path=get_path("dimensional_model.json"),
-        output_puml_path=get_path(puml_name),
-        output_png_path=get_path(png_name),
+        dimensional_model_path=paths.dim_model,
+        output_puml_path=paths.puml,  # canonical PUML filename
+        output_png_path=task.path(png_name),
         schema_context=schema_context,
     )
     final_reasoning = reasoning if reasoning is not None else generated_reasoning
 
-    # Also keep a canonical filename 'relationship_schema.png' for UI preview
-    canonical_png = get_path("relationship_schema.png")
-    try:
-        # Copy timestamped PNG to canonical path (overwrite existing)
-        shutil.copy2(get_path(png_name), canonical_png)
-    except Exception as e:
-        print(f"[WARN] Failed to copy generated PNG to canonical path: {e}")
+    # Also keep a canonical filename 'relationship_schema.png' for UI preview; it is a hard
+    # link to the timestamped file, so each round writes the image bytes only once
+    canonical_png = paths.png
+    generated_png = task.path(png_name)
+    if os.path.abspath(generated_png) != os.path.abspath(canonical_png):
+        try:
+            _link_replace(generated_png, canonical_png)
+        except Exception as e:
+            log.warning("[WARN] Failed to link generated PNG to canonical path: %s", e)
 
     # Register image in task state: keep history (timestamped) but expose canonical URL
     ts_url = f"/{app.config['UPLOAD_FOLDER']}/{task_id}/{png_name}"
     canonical_url = f"/{app.config['UPLOAD_FOLDER']}/{task_id}/relationship_schema.png"
-    task.setdefault("images", []).append(ts_url)
-    task["schema_image_url"] = canonical_url  # Use canonical URL for UI
+    with task.lock:
+        task.images.append(ts_url)
+        task.schema_image_url = canonical_url  # Use canonical URL for UI
     add_log(task_id, f"✅ Schema image generated: {png_name}", reasoning=final_reasoning)
     return canonical_url
 
 # -------------------- LOGGING UTILITIES --------------------
 def add_log(task_id, text, role="assistant", **kwargs):
-    print(f"[LOG] ({role}) Task {task_id[:8]}: {text}")
-    if task_id in tasks:
-        log_entry = {
-            "role": role,
-            "text": text,
-            "time": datetime.now(timezone.utc).isoformat()
-        }
-        log_entry.update(kwargs)
-        tasks[task_id]["logs"].append(log_entry)
+    log.info("[LOG] (%s) Task %s: %s", role, task_id[:8], text)
+    task = _tasks_get(task_id)
+    if task is not None:
+        # one tuple per entry; the dict the UI reads is only built when /status serializes the task.
+        # deque.append is atomic, so like TaskLogHandler this skips task.lock; readers copy with list().
+        task.logs.append((time.time(), role, text, kwargs or None))
 
 def set_task_status(task_id, status):
-    print(f"[STATUS] Task {task_id[:8]}: {status}")
-    if task_id in tasks:
-        tasks[task_id]["status"] = status
+    log.info("[STATUS] Task %s: %s", task_id[:8], status)
+    task = _tasks_get(task_id)
+    if task is not None:
+        with task.lock:
+            # keep "Cancelled" visible while an in-flight stage winds down
+            if not task.cancelled:
+                task.status = status
+        if _is_terminal_status(status):
+            _finish_task(task_id, task)
+        elif task_id in _finished_tasks:
+            # picked up again (e.g. a retry after an error): keep it resident
+            with _finished_tasks_lock:
+                _finished_tasks.pop(task_id, None)
+
+# -------------------- FINISHED TASKS --------------------
+# A finished task's /status body is saved in TaskStore, and the task is dropped from
+# `tasks` once it has been finished for this many seconds; /status then answers from the
+# store, which also survives a server restart. Stored tasks are purged after TASK_STORE_TTL_S.
+TASK_RETENTION_S = int(os.getenv('TASK_RETENTION_S', '1800'))
+TASK_STORE_TTL_S = int(os.getenv('TASK_STORE_TTL_S', str(24 * 3600)))
+# folders streamed through /upload_stream but never claimed by /start_generation are removed after this long
+STAGED_UPLOAD_TTL_S = int(os.getenv('STAGED_UPLOAD_TTL_S', '3600'))
+# hidden file upload_stream keeps in a folder until start_generation claims it
+STAGED_MARKER = '.staged'
+
+class TaskStore:
+    """SQLite (WAL) tables of finished tasks' encoded /status bodies, keyed by task id,
+    and of the generated model artifacts, keyed by a digest of the inputs they came from."""
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, status TEXT, body BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_updated ON tasks(updated)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS models ("
+            "digest TEXT PRIMARY KEY, context TEXT NOT NULL, metadata BLOB NOT NULL, "
+            "dim_model BLOB NOT NULL, reasoning BLOB, updated REAL NOT NULL)"
+        )
+
+    def put(self, task_id, status, body):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, status, body, updated) VALUES (?, ?, ?, ?)",
+                (task_id, status, body, time.time()),
+            )
+
+    def get(self, task_id):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def put_model(self, digest, context, metadata, dim_model, reasoning):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO models (digest, context, metadata, dim_model, reasoning, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, context, metadata, dim_model, reasoning, time.time()),
+            )
+
+    def get_model(self, digest):
+        """(cleaned context, metadata.json bytes, dimensional model bytes, encoded reasoning) or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT context, metadata, dim_model, reasoning FROM models WHERE digest = ?", (digest,)
+            ).fetchone()
+
+    def purge(self, older_than_s):
+        """Delete tasks and models last saved more than `older_than_s` seconds ago; returns how many tasks."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            self._conn.execute("DELETE FROM models WHERE updated < ?", (cutoff,))
+            return self._conn.execute("DELETE FROM tasks WHERE updated < ?", (cutoff,)).rowcount
+
+# kept outside Run_Space, which is served over HTTP
+task_store = TaskStore(os.getenv('TASK_DB_PATH', os.path.join(project_root, 'tasks.db')))
+
+# task id -> time.monotonic() when it reached a terminal status, oldest first
+_finished_tasks = OrderedDict()
+_finished_tasks_lock = threading.Lock()
+
+def _is_terminal_status(status):
+    return status == "Completed" or status.startswith(("Error", "Cancelled", "Approval expired"))
+
+def _write_task_snapshot(task_id, task):
+    """Save the task's current /status body in task_store."""
+    _task_log_buffer.flush()
+    try:
+        task_store.put(task_id, task.status, task.status_json())
+    except sqlite3.Error as e:
+        log.warning("[TASK] Could not persist state of task %s: %s", task_id[:8], e)
+
+def _read_task_snapshot(task_id):
+    """Persisted /status body of an evicted (or pre-restart) task, or None."""
+    try:
+        return task_store.get(task_id)
+    except sqlite3.Error:
+        return None
+
+def _is_known_task(task_id):
+    """True for a live task or one evicted from memory whose snapshot is still in task_store."""
+    return task_id in tasks or _read_task_snapshot(task_id) is not None
+
+def _expired_task_response(task_id):
+    """410 for an evicted task that can no longer be driven, 404 for an unknown id."""
+    if _read_task_snapshot(task_id) is not None:
+        return _json_response({"error": "This task has expired; its results are still available from /status."}, 410)
+    return _json_response({"error": "Task not found."}, 404)
+
+def _finish_task(task_id, task):
+    """Snapshot a task that reached a terminal status and schedule its eviction."""
+    with _finished_tasks_lock:
+        if task_id in _finished_tasks:
+            return
+        _finished_tasks[task_id] = time.monotonic()
+    _write_task_snapshot(task_id, task)
+    _evict_finished_tasks()
+
+def _evict_finished_tasks():
+    """Drop tasks finished more than TASK_RETENTION_S ago, re-snapshotting them first."""
+    deadline = time.monotonic() - TASK_RETENTION_S
+    expired = []
+    with _finished_tasks_lock:
+        while _finished_tasks:
+            tid, finished_at = next(iter(_finished_tasks.items()))
+            if finished_at > deadline:
+                break
+            _finished_tasks.popitem(last=False)
+            expired.append(tid)
+    for tid in expired:
+        task = _tasks_get(tid)
+        if task is not None:
+            # logs may have been added since the first snapshot
+            _write_task_snapshot(tid, task)
+            tasks.pop(tid, None)
+        _created_task_dirs.discard(tid)
+    if expired:
+        log.info("[TASK] Evicted %d finished task(s) from memory", len(expired))
+    _purge_stale_uploads()
+    try:
+        purged = task_store.purge(TASK_STORE_TTL_S)
+    except sqlite3.Error as e:
+        log.warning("[TASK] Could not purge stored tasks: %s", e)
+    else:
+        if purged:
+            log.info("[TASK] Purged %d stored task(s) older than %ss", purged, TASK_STORE_TTL_S)
+
+def _purge_stale_uploads():
+    """Remove staged upload folders whose last /upload_stream write is older than STAGED_UPLOAD_TTL_S."""
+    base = app.config['UPLOAD_FOLDER']
+    cutoff = time.time() - STAGED_UPLOAD_TTL_S
+    try:
+        with os.scandir(base) as it:
+            folders = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+    purged = 0
+    for folder in folders:
+        try:
+            if os.stat(os.path.join(folder, STAGED_MARKER)).st_mtime >= cutoff:
+                continue
+        except OSError:
+            # no marker: a started task's folder, or one already claimed
+            continue
+        shutil.rmtree(folder, ignore_errors=True)
+        _created_task_dirs.discard(os.path.basename(folder))
+        purged += 1
+    if purged:
+        log.info("[UPLOAD] Removed %d staged upload(s) older than %ss", purged, STAGED_UPLOAD_TTL_S)
+
+# task ids whose directory has already been created and seeded
+_created_task_dirs = set()
+_created_task_dirs_lock = threading.Lock()
 
 def create_task_dir(task_id):
-    """Create task directory under UPLOAD_FOLDER and copy db_utils.py into it if present."""
+    """Create task directory under UPLOAD_FOLDER.
+
+    Generated scripts find db_utils.py through the PYTHONPATH set by script_Runner,
+    so nothing is seeded into the folder. Idempotent: later calls for the same task return the path without touching the disk.
+    """
     base = app.config['UPLOAD_FOLDER']
     task_dir = os.path.join(base, task_id)
-    os.makedirs(task_dir, exist_ok=True)
+    if task_id in _created_task_dirs:
+        return task_dir
 
-    # Copy db_utils.py from project root into task folder for convenience
-    src = os.path.join(project_root, 'db_utils.py')
-    dst = os.path.join(task_dir, 'db_utils.py')
-    try:
-        if os.path.exists(src):
-            shutil.copy2(src, dst)
-            print(f"[INIT] Copied db_utils.py to: {dst}")
-        else:
-            print(f"[WARN] db_utils.py not found at {src}; skipping copy")
-    except Exception as e:
-        print(f"[WARN] Failed to copy db_utils.py to {dst}: {e}")
+    with _created_task_dirs_lock:
+        if task_id in _created_task_dirs:
+            return task_dir
+        os.makedirs(task_dir, exist_ok=True)
+        invalidate_csv_cache(task_dir)
+        _created_task_dirs.add(task_id)
 
     return task_dir
 
 # -------------------- FILE HANDLING --------------------
-def handle_user_upload(files, task_id):
-    """Save uploaded files into the task-specific Run_Space subfolder."""
-    base = app.config['UPLOAD_FOLDER']
-    task_dir = os.path.join(base, task_id)
-    print(f"[UPLOAD] Saving files to: {task_dir}")
-    # ensure task dir exists and helper files are seeded
-    create_task_dir(task_id)
+def _list_task_files(task_dir):
+    """Names of the non-hidden entries in a task folder, for error reporting."""
+    try:
+        with os.scandir(task_dir) as it:
+            return [e.name for e in it if not e.name.startswith('.')]
+    except OSError:
+        return []
+
+def _has_task_files(task_dir):
+    """True once the task folder holds any non-hidden entry (stops at the first)."""
+    try:
+        with os.scandir(task_dir) as it:
+            return any(not e.name.startswith('.') for e in it)
+    except OSError:
+        return False
+
+def _save_upload(file, file_path):
+    """Write an uploaded file to disk.
 
+    Large uploads are spooled by Werkzeug to a real temp file; those are copied
+    in-kernel with copy_file_range. In-memory uploads (and any copy_file_range
+    failure, e.g. EXDEV on older kernels) use copyfileobj with a 1 MiB buffer.
+    """
+    stream = file.stream
+    try:
+        src_fd = stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        src_fd = None
+    if src_fd is not None and hasattr(os, 'copy_file_range'):
+        dst_fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            offset = 0
+            while True:
+                copied = os.copy_file_range(src_fd, dst_fd, 1 << 24, offset_src=offset)
+                if not copied:
+                    return
+                offset += copied
+        except OSError as e:
+            log.debug("[UPLOAD] copy_file_range failed for %s (%s); falling back to buffered copy", file_path, e)
+        finally:
+            os.close(dst_fd)
+    stream.seek(0)
+    with open(file_path, 'wb') as dst:
+        shutil.copyfileobj(stream, dst, 1 << 20)
+
+def handle_user_upload(files, task_dir):
+    """Save uploaded files into the task-specific Run_Space subfolder (already created by the caller).
+
+    Returns the CSV paths now in the task folder: uploaded CSVs plus anything
+    process_uploaded_files() converted.
+    """
+    log.info("[UPLOAD] Saving files to: %s", task_dir)
+
+    targets = []
     for file in files:
-        file_path = os.path.join(task_dir, file.filename)
-        print(f"[UPLOAD] Saving file: {file.filename}")
-        file.save(file_path)
+        log.info("[UPLOAD] Saving file: %s", file.filename)
+        targets.append((file, os.path.join(task_dir, file.filename)))
+    if len(targets) > 1:
+        # each save is independent I/O; overlap them
+        with ThreadPoolExecutor(max_workers=min(4, len(targets)), thread_name_prefix="upload-save") as pool:
+            list(pool.map(lambda t: _save_upload(*t), targets))
+    else:
+        for file, file_path in targets:
+            _save_upload(file, file_path)
+    return _convert_uploads(task_dir, [file.filename for file, _ in targets])
 
-    print("[UPLOAD] Running process_uploaded_files()...")
-    process_uploaded_files(task_dir)
-    print("[UPLOAD] File processing complete.")
-    return task_dir
+def _convert_uploads(task_dir, names):
+    """CSV paths for uploaded file `names` in task_dir, after converting any non-CSV ones."""
+    csv_files = [os.path.join(task_dir, name) for name in names if name.lower().endswith('.csv')]
+
+    if not any(is_convertible(name) for name in names):
+        # all-CSV upload: nothing to convert, so skip the directory walk
+        log.info("[UPLOAD] No convertible files uploaded; skipping conversion.")
+        return csv_files
+
+    log.info("[UPLOAD] Running process_uploaded_files()...")
+    csv_files.extend(process_uploaded_files(task_dir))
+    invalidate_csv_cache(task_dir)
+    log.info("[UPLOAD] File processing complete.")
+    return csv_files
+
+def _claim_staged_upload(upload_id):
+    """True if `upload_id` names a folder filled through /upload_stream that no task owns yet.
+
+    Removing the folder's STAGED_MARKER is the claim, so only one request can take a given upload.
+    """
+    if not upload_id:
+        return False
+    try:
+        if str(uuid.UUID(upload_id)) != upload_id:
+            return False
+    except ValueError:
+        return False
+    if upload_id in tasks or _read_task_snapshot(upload_id) is not None:
+        return False
+    try:
+        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], upload_id, STAGED_MARKER))
+    except OSError:
+        return False
+    return True
 
 # -------------------- CORRECTION LOOP --------------------
 def run_correction_loop(task_id, feedback):
-    print(f"[CORRECTION] Starting correction loop for task {task_id[:8]}")
+    log.info("[CORRECTION] Starting correction loop for task %s", task_id[:8])
     # mark current thread prints as belonging to this task
     current_task.task_id = task_id
-    task_dir = create_task_dir(task_id)
-
-    def get_path(filename):
-        return os.path.join(task_dir, filename)
+    # the folder was created when the task was registered in start_generation
+    paths = tasks[task_id].paths
 
     try:
         set_task_status(task_id, "Applying user feedback...")
         add_log(task_id, f"User Feedback: {feedback}", role="user")
 
-        feedback_path = get_path("user_feedback.txt")
-        print(f"[CORRECTION] Writing feedback to: {feedback_path}")
-        with open(feedback_path, "w", encoding="utf-8") as f:
-            f.write(feedback)
+        feedback_path = paths.feedback
+        log.info("[CORRECTION] Writing feedback to: %s", feedback_path)
+        Path(feedback_path).write_text(feedback, encoding="utf-8")
 
-        print("[CORRECTION] Running schema_correction() based on user feedback...")
+        log.info("[CORRECTION] Running schema_correction() based on user feedback...")
         # Use schema_correction for direct user feedback, not the automated one.
         schema_correction(
             user_input=feedback,
-            puml_path=get_path("relationship_schema.puml"),
-            png_path=get_path("relationship_schema.png")
+            puml_path=paths.puml,
+            png_path=paths.png
         )
         add_log(task_id, "✅ Corrections applied based on user feedback. Re-running tests...")
-        run_testing_and_review(task_id, context=tasks[task_id]['context'])
-        print("[CORRECTION] Completed successfully.")
+        run_testing_and_review(task_id, context=tasks[task_id].context)
+        log.info("[CORRECTION] Completed successfully.")
 
     except Exception as e:
-        print(f"[ERROR] Correction loop failed: {e}")
+        log.error("[ERROR] Correction loop failed: %s", e)
         set_task_status(task_id, f"Error: {e}")
         add_log(task_id, f"❌ Error during correction loop: {e}")
         app.logger.error(f"Error in task {task_id}: {e}", exc_info=True)
@@ -262,42 +793,107 @@ def run_correction_loop(task_id, feedback):
             pass
 
 # -------------------- MAIN PIPELINE --------------------
-def run_processing_pipeline(task_id, source_path, context):
-    print(f"[PIPELINE] Starting processing pipeline for Task {task_id[:8]}")
-    context = clean_text(context)
+def _input_digest(source_dir, csv_files, context):
+    """BLAKE2b digest of the CSVs (relative name and bytes, in name order) plus the raw user context."""
+    h = hashlib.blake2b()
+    for rel, path in sorted((os.path.relpath(p, source_dir), p) for p in csv_files):
+        with open(path, 'rb') as f:
+            file_hash = hashlib.file_digest(f, 'blake2b').digest()
+        h.update(rel.encode('utf-8') + b'\0' + file_hash)
+    h.update(context.encode('utf-8'))
+    return h.hexdigest()
+
+def _find_model(digest):
+    """Stored (cleaned context, metadata, dimensional model, reasoning) of an earlier run on the same inputs, or None."""
+    try:
+        return task_store.get_model(digest)
+    except sqlite3.Error as e:
+        log.warning("[TASK] Could not look up earlier model runs: %s", e)
+        return None
+
+def _restore_model(task_id, found):
+    """Write an earlier run's artifacts into this task's folder in place of steps 1 and 2."""
+    context, metadata, dim_model, reasoning = found
+    paths = tasks[task_id].paths
+    Path(paths.metadata).write_bytes(metadata)
+    Path(paths.dim_model).write_bytes(dim_model)
+    Path(paths.user_query).write_text(context, encoding="utf-8")
+    add_log(task_id, "✅ Reused metadata and dimensional model from an earlier run on identical files and context.",
+            reasoning=json.loads(reasoning) if reasoning else None)
+
+def _remember_model(digest, task_id, context, reasoning):
+    paths = tasks[task_id].paths
+    try:
+        task_store.put_model(
+            digest, context, Path(paths.metadata).read_bytes(), Path(paths.dim_model).read_bytes(),
+            _json_bytes(reasoning) if reasoning is not None else None,
+        )
+    except (OSError, sqlite3.Error) as e:
+        log.warning("[TASK] Could not store model of task %s for reuse: %s", task_id[:8], e)
+
+def run_processing_pipeline(task_id, source_path, context, csv_files=None):
+    log.info("[PIPELINE] Starting processing pipeline for Task %s", task_id[:8])
     # ensure prints inside this background thread are attributed to this task
     current_task.task_id = task_id
-    base_run_space = app.config['UPLOAD_FOLDER']
-    task_dir = create_task_dir(task_id)
-
-    def get_path(filename):
-        return os.path.join(task_dir, filename)
+    # the folder was created when the task was registered in start_generation
+    paths = tasks[task_id].paths
+
+    # Local CSVs are hashed with the raw context so a re-run on identical inputs skips the
+    # query cleaning, metadata and dimensional model steps. A SharePoint URL may change
+    # behind the same link, so it always runs in full.
+    digest = found = None
+    if os.path.isdir(source_path):
+        try:
+            files = csv_files if csv_files is not None else get_csv_files_from_directory(source_path)
+            digest = _input_digest(source_path, files, context)
+        except OSError as e:
+            log.warning("[TASK] Could not hash inputs of task %s: %s", task_id[:8], e)
+        else:
+            found = _find_model(digest)
 
     try:
-        set_task_status(task_id, "Extracting metadata...")
-        print(f"[STEP 1] Running generate_metadata() with source: {source_path}")
-        generate_metadata(source_path, output_path=get_path("metadata.json"))
-        add_log(task_id, "✅ Metadata extracted from uploaded files.")
-
-        set_task_status(task_id, "Generating dimensional model...")
-        print("[STEP 2] Generating dimensional model...")
-        user_context_path = get_path("refined_User_Query.txt")
-        with open(user_context_path, "w", encoding="utf-8") as f:
-            f.write(context)
-
-        reasoning  = generate_dimensional_model(
-            metadata_file=get_path("metadata.json"),
-            user_context_file=user_context_path,
-            output_json=get_path("dimensional_model.json")
-        )
-        print(reasoning)
-        add_log(task_id, "✅ Dimensional model generated successfully.", reasoning=reasoning)
+        if found:
+            log.info("[PIPELINE] Task %s reuses the model stored for inputs %s", task_id[:8], digest[:12])
+            context = found[0]
+            # downstream steps (phase 1, correction) read the refined query from here, not from disk
+            tasks[task_id].context = context
+            _restore_model(task_id, found)
+        else:
+            # query cleaning is an LLM round-trip that does not need the metadata: run it while the CSVs are parsed
+            cleaned_future = _llm_executor.submit(_call_in_task, task_id, clean_text, context)
+            set_task_status(task_id, "Extracting metadata...")
+            log.info("[STEP 1] Running generate_metadata() with source: %s", source_path)
+            try:
+                generate_metadata(source_path, output_path=paths.metadata, csv_files=csv_files)
+            except BaseException:
+                cleaned_future.cancel()
+                raise
+            add_log(task_id, "✅ Metadata extracted from uploaded files.")
+            context = cleaned_future.result()
+            tasks[task_id].context = context
+
+            set_task_status(task_id, "Generating dimensional model...")
+            log.info("[STEP 2] Generating dimensional model...")
+            # still written as a task artifact, but passed in memory to the model steps
+            user_context_path = paths.user_query
+            Path(user_context_path).write_text(context, encoding="utf-8")
+
+            reasoning  = generate_dimensional_model(
+                metadata_file=paths.metadata,
+                user_context_file=user_context_path,
+                output_json=paths.dim_model,
+                user_context=context
+            )
+            log.debug("[STEP 2] Dimensional model reasoning: %s", reasoning)
+            add_log(task_id, "✅ Dimensional model generated successfully.", reasoning=reasoning)
+            if digest is not None:
+                _remember_model(digest, task_id, context, reasoning)
 
-        print("[STEP 3] Moving to testing and review phase...")
+        log.info("[STEP 3] Moving to testing and review phase...")
         run_testing_and_review(task_id, context)
 
     except Exception as e:
-        print(f"[ERROR] Pipeline failed: {e}")
+        log.error("[ERROR] Pipeline failed: %s", e)
         set_task_status(task_id, f"Error: {e}")
         add_log(task_id, f"❌ Error during generation: {e}")
         app.logger.error(f"Error in task {task_id}: {e}", exc_info=True)
@@ -308,32 +904,78 @@ def run_processing_pipeline(task_id, source_path, context):
         except Exception:
             pass
 
+def run_fetch_pipeline(task_id, source, fetch, context):
+    """Pull remote data into the task folder off the request thread, then run the pipeline.
+
+    `fetch(task_dir)` writes the source data into the folder and returns a log line;
+    `source` names the data source in status and error messages.
+    """
+    current_task.task_id = task_id
+    task_dir = tasks[task_id].task_dir
+    try:
+        add_log(task_id, fetch(task_dir))
+        if not _has_task_files(task_dir):
+            raise RuntimeError("no files were written into the task Run_Space directory; check credentials, table/object names, and network access")
+
+        # The rest of the pipeline expects CSVs, so run conversion (this may convert JSON -> CSV etc.)
+        set_task_status(task_id, "Converting fetched data...")
+        converted = process_uploaded_files(task_dir)
+        invalidate_csv_cache(task_dir)
+        if not has_csv_files(task_dir):
+            # full listing only for the error message
+            raise RuntimeError(f"no CSV files were produced (saved: {_list_task_files(task_dir)}; converted: {converted})")
+    except Exception as e:
+        log.error("[ERROR] %s fetch failed: %s", source, e)
+        set_task_status(task_id, f"Error: {source} fetch failed: {e}")
+        add_log(task_id, f"❌ {source} fetch failed: {e}")
+        return
+    finally:
+        try:
+            del current_task.task_id
+        except AttributeError:
+            pass
+
+    if not tasks[task_id].cancelled:
+        run_processing_pipeline(task_id, task_dir, context)
+
 # -------------------- TESTING AND REVIEW --------------------
 def run_testing_and_review(task_id, context, correction_reasoning=None):
-    print(f"[TESTING] Running schema testing and review for Task {task_id[:8]}")
-    # attribute prints to this task while running tests
+    if tasks[task_id].cancelled:
+        return
+    log.info("[TESTING] Running schema testing and review for Task %s", task_id[:8])
+    # attribute prints to this task while running tests; the callers (run_processing_pipeline,
+    # run_correction_loop) clear it in their finally blocks once their own logging is done
     current_task.task_id = task_id
-    base_run_space = app.config['UPLOAD_FOLDER']
-    task_dir = os.path.join(base_run_space, task_id)
-
-    def get_path(filename):
-        return os.path.join(task_dir, filename)
+    task = tasks[task_id]
+    task_dir = task.task_dir
+    paths = task.paths
+
+    # Phase 1 only needs the refined query, so its LLM round-trip runs while the schema is generated
+    log.info("[TESTING] Running run_phase1()...")
+    phase1_future = _llm_executor.submit(
+        _call_in_task, task_id, run_phase1,
+        user_query_path=paths.user_query,
+        output_path=paths.testcases,
+        user_query=context
+    )
 
     set_task_status(task_id, "Generating visual schema diagram...")
-    print("[TESTING] Running generate_schema()...")
+    log.info("[TESTING] Running generate_schema()...")
     try:
         img_url = generate_and_register_schema(task_id, context, reasoning=correction_reasoning)
     except Exception as e:
+        if not phase1_future.cancel():
+            # already running: let it finish here so its failure is not lost
+            try:
+                phase1_future.result()
+            except Exception as e_phase1:
+                log.warning("[TESTING] Phase 1 also failed: %s", e_phase1)
         add_log(task_id, f"❌ Schema generation failed: {e}")
         set_task_status(task_id, f"Error: Schema generation failed: {e}")
         return
 
     set_task_status(task_id, "Running Phase 1 tests...")
-    print("[TESTING] Running run_phase1()...")
-    phase1_ok, phase_1_reasoning = run_phase1(
-        user_query_path=get_path("refined_User_Query.txt"),
-        output_path=get_path("testcases_prompt.json")
-    )
+    phase1_ok, phase_1_reasoning = phase1_future.result()
     if not phase1_ok:
         set_task_status(task_id, "Error: Phase 1 test generation failed")
         add_log(task_id, "❌ Phase 1 failed — testcases_prompt.json was not created or is invalid. Check model output in logs.")
@@ -341,10 +983,10 @@ def run_testing_and_review(task_id, context, correction_reasoning=None):
     add_log(task_id, "✅ Phase 1 complete.", reasoning=phase_1_reasoning)
 
     set_task_status(task_id, "Running Phase 2 validation...")
-    print("[TESTING] Running run_phase2()...")
+    log.info("[TESTING] Running run_phase2()...")
     phase2_ok, phase2_reasoning = run_phase2(
-        plantuml_code_path=get_path("relationship_schema.puml"),
-        testcases_path=get_path("testcases_prompt.json"),
+        plantuml_code_path=paths.puml,
+        testcases_path=paths.testcases,
         output_dir=task_dir
     )
     if not phase2_ok:
@@ -354,11 +996,12 @@ def run_testing_and_review(task_id, context, correction_reasoning=None):
     add_log(task_id, "✅ Phase 2 validation complete.", reasoning=phase2_reasoning)
 
     set_task_status(task_id, "Applying automated corrections...")
-    print("[TESTING] Running correction() for auto-fix...")
+    log.info("[TESTING] Running correction() for auto-fix...")
     correction_reasoning = correction(
-        errors_path=get_path("errors.json"),
-        puml_path=get_path("relationship_schema.puml"),
-        query_path=get_path("refined_User_Query.txt")
+        errors_path=paths.errors,
+        puml_path=paths.puml,
+        query_path=paths.user_query,
+        query_text=context
     )
 
     # After automated corrections, regenerate the schema image so the
@@ -370,172 +1013,239 @@ def run_testing_and_review(task_id, context, correction_reasoning=None):
         add_log(task_id, f"❌ Failed to generate corrected schema image: {e}")
 
     set_task_status(task_id, "Awaiting user review")
-    print("[TESTING] Awaiting user feedback...")
+    log.info("[TESTING] Awaiting user feedback...")
     add_log(task_id, "Please review the schema: type 'yes' to continue, or 'no' + corrections.")
+
+# -------------------- CONTINUE PIPELINE --------------------
+# Approval pauses do not hold a thread: each step records the next one in
+# the task record's `resume` and returns; /approve_action submits it here.
+_step_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pipeline-step")
+
+def _run_pipeline_step(step, task_id):
+    """Run one continue-pipeline step with task log attribution and error reporting."""
+    if tasks[task_id].cancelled:
+        return
+    current_task.task_id = task_id
     try:
-        pass
+        step(task_id)
+    except Exception as e:
+        log.error("[ERROR] Continue pipeline failed: %s", e)
+        set_task_status(task_id, f"Error: {e}")
+        add_log(task_id, f"❌ Error: {e}")
+        app.logger.error(f"Error in task {task_id}: {e}", exc_info=True)
     finally:
         try:
             del current_task.task_id
         except Exception:
             pass
 
-# -------------------- CONTINUE PIPELINE --------------------
 def continue_pipeline(task_id):
-    print(f"[CONTINUE] Continuing pipeline for Task {task_id[:8]}")
-    # attribute prints in this thread to the task
-    current_task.task_id = task_id
-    task_dir = "Run_Space" + f"/{task_id}/"
+    log.info("[CONTINUE] Continuing pipeline for Task %s", task_id[:8])
+    _run_pipeline_step(_step_generate_create, task_id)
+
+def _step_generate_create(task_id):
+    task = tasks[task_id]
+    task_dir, paths = task.task_dir, task.paths
+
+    set_task_status(task_id, "Generating CREATE script...")
+    log.info("[STEP 8] Generating CREATE script...")
+    generate_create_sql_writer_script(
+        metadata_file=paths.metadata,
+        plantuml_file=paths.puml,
+        output_file=paths.create_script
+    )
 
-    def get_path(filename):
-        return os.path.join(task_dir, filename)
+    add_log(task_id, "✅ CREATE script generated.")
 
-    try:
-        set_task_status(task_id, "Generating CREATE script...")
-        print("[STEP 8] Generating CREATE script...")
+    # Execute the saved script in place (it should write create_schema.sql in the same run space)
+    result = run_python_file(paths.create_script, run_space_dir=task_dir)
+    if result.get('returncode', 1) != 0:
+        # the reply is cached, so re-running would replay the same broken script: drop it and ask once more
+        log.warning("[STEP 8] CREATE script failed; regenerating it without the LLM cache: %s", result.get('stderr'))
+        evict_create_sql_writer_script(paths.metadata, paths.puml)
         generate_create_sql_writer_script(
-            metadata_file=get_path("metadata.json"),
-            plantuml_file=get_path("relationship_schema.puml"),
-            output_file=get_path("create_Database_Script.py")
+            metadata_file=paths.metadata,
+            plantuml_file=paths.puml,
+            output_file=paths.create_script,
+            use_cache=False
         )
+        result = run_python_file(paths.create_script, run_space_dir=task_dir)
+        if result.get('returncode', 1) != 0:
+            raise Exception(result['stderr'])
 
-        add_log(task_id, "✅ CREATE script generated.")
-
-        output_path = "Run_Space" + f"/{task_id}" + "/create_Database_Script.py"
-        with open(output_path, "r", encoding="utf-8") as f:
-            python_code = f.read()
-
-        # Execute the script (it should write create_schema.sql in the same run space)
-        result = run_python_code(python_code, run_space_dir=task_dir)
-        
-        time.sleep(0.15)
-        reorder_create_sql_file(get_path("create_schema.sql"),get_path("create_schema.sql"))
-        time.sleep(0.05)
-        add_log(task_id, "CREATE script generated and ready for execution. Awaiting user approval to create tables.", role="assistant")
-        # mark awaiting approval in task state (this will be visible to frontend via /status)
-        tasks[task_id]['awaiting_approval'] = 'create'
-        set_task_status(task_id, "Awaiting approval: create_tables")
-        evt = threading.Event()
-        approval_events[task_id] = evt
-        print('Before: ', tasks[task_id])
-        # Wait until the front-end calls /approve_action/<task_id> and sets the event
-        evt.wait()  # indefinite wait — user must approve to continue
-       
-        # cleanup awaiting flag and continue
-        tasks[task_id].pop('awaiting_approval', None)
-        # approval_events.pop(task_id, None)
-        approval_events.pop(task_id, None)
-        print('After: ', tasks[task_id])
-        
-        set_task_status(task_id, "Creating tables...")
-        print("[STEP 9] User approved. Executing CREATE script now...")
-
-        # Now execute SQL immediately (no approval step)
-        try:
-            set_task_status(task_id, "Creating tables...")
-            print("[STEP 9] Executing CREATE script now...")
-
-            # Construct the expected path for the generated SQL file
-            sql_path = os.path.join("Run_Space", task_id, "create_schema.sql")
-            print(f"[EXEC] sql_path = {sql_path}, exists = {os.path.exists(sql_path)}")
-
-            if not os.path.exists(sql_path):
-                add_log(task_id, f"❌ SQL file not found: {sql_path}")
-                set_task_status(task_id, "Failed: create_tables")
-            else:
-                try:
-                    execute_sql_from_file(sql_path)
-                    add_log(task_id, "✅ Tables created.")
-                    set_task_status(task_id, "Completed: create_tables")
-                except Exception as e_exec:
-                    add_log(task_id, f"❌ Error executing SQL: {e_exec}")
-                    add_log(task_id, traceback.format_exc())
-                    set_task_status(task_id, "Failed: create_tables")
-        except Exception as e:
-            # Catch any unexpected exception in the flow
-            add_log(task_id, f"❌ Unexpected error in create flow: {e}")
-            add_log(task_id, traceback.format_exc())
-            set_task_status(task_id, "Failed: create_tables")
-
-        print("[STEP 9] CREATE script generated and executed.")
-        add_log(task_id, "CREATE script generated and ready for execution. Awaiting user approval to create tables.", role="assistant")
+    # run_python_file returns after the script has exited, so create_schema.sql is complete; no settle delay
+    reorder_create_sql_file(paths.create_sql, paths.create_sql)
+    add_log(task_id, "CREATE script generated and ready for execution. Awaiting user approval to create tables.", role="assistant")
+    # mark awaiting approval in task state (this will be visible to frontend via /status);
+    # /approve_action claims the parked step and runs it on the step executor
+    task.await_approval('create', _step_execute_create_and_generate_insert)
+    set_task_status(task_id, "Awaiting approval: create_tables")
 
-        # mark awaiting approval in task state (this will be visible to frontend via /status)
-        tasks[task_id]['awaiting_approval'] = 'create'
-        set_task_status(task_id, "Awaiting approval: create_tables")   
+def _step_execute_create_and_generate_insert(task_id):
+    task = tasks[task_id]
+    task_dir, paths = task.task_dir, task.paths
 
-        set_task_status(task_id, "Splitting Files into required Tables...")
-        print("[STEP 10] Generating Splitting Files into required Tables script...")
+    set_task_status(task_id, "Creating tables...")
+    log.info("[STEP 9] User approved. Executing CREATE script now...")
 
-        output_path = table_converter(
-            files_path=task_dir,
-            metadata_path=get_path("metadata.json"),
-            plantUML_path=get_path("relationship_schema.puml"),
-            output_path=get_path("generated_table_converter.py")
-        )
+    try:
+        # Construct the expected path for the generated SQL file
+        sql_path = paths.create_sql
+        log.info("[EXEC] sql_path = %s, exists = %s", sql_path, os.path.exists(sql_path))
 
-        output_path = os.path.join(app.config['UPLOAD_FOLDER'], task_id, "generated_table_converter.py")
+        if not os.path.exists(sql_path):
+            add_log(task_id, f"❌ SQL file not found: {sql_path}")
+            set_task_status(task_id, "Failed: create_tables")
+        else:
+            try:
+                execute_sql_from_file(sql_path)
+                add_log(task_id, "✅ Tables created.")
+                set_task_status(task_id, "Completed: create_tables")
+            except Exception as e_exec:
+                # keep later runs on the same inputs from reusing the script that wrote this SQL
+                evict_create_sql_writer_script(paths.metadata, paths.puml)
+                add_log(task_id, f"❌ Error executing SQL: {e_exec}")
+                add_log(task_id, traceback.format_exc())
+                set_task_status(task_id, "Failed: create_tables")
+    except Exception as e:
+        # Catch any unexpected exception in the flow
+        add_log(task_id, f"❌ Unexpected error in create flow: {e}")
+        add_log(task_id, traceback.format_exc())
+        set_task_status(task_id, "Failed: create_tables")
 
-        add_log(task_id, "✅ INSERT script generated.")
+    log.info("[STEP 9] CREATE script generated and executed.")
 
-        print("[STEP 11] INSERT script generated. Executing immediately (approval skipped).")
-        add_log(task_id, "INSERT script generated and automatically executing insert data.", role="assistant")
+    set_task_status(task_id, "Splitting Files into required Tables...")
+    log.info("[STEP 10] Generating Splitting Files into required Tables script...")
 
-        set_task_status(task_id, "Inserting data...")
-#---> Smoked some BS here (need to check and change back later)
-        with open(output_path, "r", encoding="utf-8") as f:
-            python_code = f.read()
+    table_converter(
+        files_path=task_dir,
+        metadata_path=paths.metadata,
+        plantUML_path=paths.puml,
+        output_path=paths.table_converter
+    )
 
-        # Execute the script, ensuring it runs within its own directory
-        result = run_python_code(python_code, run_space_dir=task_dir)
-        
-        if result and result.get('returncode', 1) != 0:
-            raise Exception(result['stderr'])
-        add_log(task_id, "✅ Data Splitting Complete.")
-        set_task_status(task_id, "Inserting data into tables...")
-        print("[STEP 12] Inserting data into tables now...")
-        load_csvs_into_db(task_dir)
-        add_log(task_id, "✅ Data inserted.")
-        # Provide a preview of DB tables and insert statistics for UI display
-        try:
-            add_log(task_id, "Generating table previews and insert statistics...")
-            table_preview = _fetch_stats(task_id, runspace_base=app.config['UPLOAD_FOLDER'], preview_limit=5)
-                # Store structured preview in task state for frontend rendering
-            tasks[task_id]['table_preview'] = table_preview
-            add_log(task_id, "✅ Table preview and insert stats available.")
-        except Exception:
-            # Never let preview-generation crash the pipeline
-            app.logger.exception('Unexpected error while generating table preview')
-        set_task_status(task_id, "Completed")
-        print(f"[COMPLETE] Task {task_id[:8]} finished successfully.")
-        add_log(task_id, "🎉 Pipeline completed successfully!")
+    add_log(task_id, "✅ INSERT script generated.")
+
+    # Insert approval is skipped: continue straight into the insert step
+    log.info("[STEP 11] INSERT script generated. Executing immediately (approval skipped).")
+    add_log(task_id, "INSERT script generated and automatically executing insert data.", role="assistant")
+    _step_execute_insert(task_id)
+
+def _step_execute_insert(task_id):
+    task = tasks[task_id]
+    task_dir, paths = task.task_dir, task.paths
+
+    set_task_status(task_id, "Inserting data...")
+    # Execute the saved script in place, ensuring it runs within its own directory
+    result = run_python_file(paths.table_converter, run_space_dir=task_dir)
+
+    if result and result.get('returncode', 1) != 0:
+        raise Exception(result['stderr'])
+    add_log(task_id, "✅ Data Splitting Complete.")
+    set_task_status(task_id, "Inserting data into tables...")
+    log.info("[STEP 12] Inserting data into tables now...")
+    load_csvs_into_db(task_dir)
+    add_log(task_id, "✅ Data inserted.")
+    # Provide a preview of DB tables and insert statistics for UI display
+    try:
+        add_log(task_id, "Generating table previews and insert statistics...")
+        table_preview = _fetch_stats(task_id, runspace_base=app.config['UPLOAD_FOLDER'], preview_limit=5)
+        # Store structured preview in task state for frontend rendering
+        with task.lock:
+            task.table_preview = table_preview
+        add_log(task_id, "✅ Table preview and insert stats available.")
+    except Exception:
+        # Never let preview-generation crash the pipeline
+        app.logger.exception('Unexpected error while generating table preview')
+    set_task_status(task_id, "Completed")
+    log.info("[COMPLETE] Task %s finished successfully.", task_id[:8])
+    add_log(task_id, "🎉 Pipeline completed successfully!")
 
-    except Exception as e:
-        print(f"[ERROR] Continue pipeline failed: {e}")
-        set_task_status(task_id, f"Error: {e}")
-        add_log(task_id, f"❌ Error: {e}")
-        app.logger.error(f"Error in task {task_id}: {e}", exc_info=True)
-    finally:
+# -------------------- ROUTES --------------------
+def _json_bytes(obj):
+    """Encode a response body with orjson when installed, else the stdlib encoder."""
+    if _HAS_ORJSON:
         try:
-            del current_task.task_id
-        except Exception:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC)
+        except TypeError:
+            # e.g. integers wider than 64 bits
             pass
+    return json.dumps(obj, default=str).encode('utf-8')
+
+def _json_response(obj, status=200):
+    """Drop-in for jsonify() backed by _json_bytes (orjson when installed)."""
+    return Response(_json_bytes(obj), status=status, mimetype='application/json')
 
-# -------------------- ROUTES --------------------
 @app.route('/')
 def upload():
-    print("[ROUTE] GET / - Upload page requested.")
+    log.info("[ROUTE] GET / - Upload page requested.")
     return render_template('upload.html', active_page='upload')
 
 @app.route('/dashboard')
 def dashboard():
-    print("[ROUTE] GET /dashboard")
+    log.info("[ROUTE] GET /dashboard")
     return render_template('dashboard.html', active_page='dashboard')
 
+def _accel_redirect(relpath, download_name=None):
+    """Empty response telling nginx to serve Run_Space/<relpath> itself (see README)."""
+    resp = Response()
+    resp.headers['X-Accel-Redirect'] = app.config['ACCEL_REDIRECT_PREFIX'] + quote(relpath)
+    if download_name is not None:
+        resp.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return resp
+
 @app.route('/Run_Space/<path:filename>')
 def run_space_files(filename):
-    print(f"[ROUTE] Serving file from Run_Space: {filename}")
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    log.info("[ROUTE] Serving file from Run_Space: %s", filename)
+    if app.config['BEHIND_NGINX']:
+        # nginx streams the file itself with sendfile(2) and answers conditional/Range requests
+        full_path = safe_join(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']), filename)
+        if full_path is None or not os.path.isfile(full_path):
+            abort(404)
+        resp = _accel_redirect(filename)
+    else:
+        # conditional: honour Range / If-None-Match / If-Modified-Since so polling the UI re-uses cached images
+        resp = send_from_directory(app.config['UPLOAD_FOLDER'], filename, conditional=True, etag=True)
+    # Let the browser reuse the image between status polls for a moment without even revalidating;
+    # schema regeneration swaps in a new file, so the ETag changes and the next revalidation picks it up.
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 2
+    return resp
+
+@app.route('/upload_stream/<upload_id>/<filename>', methods=['POST'])
+def upload_stream(upload_id, filename):
+    """
+    Write a raw request body (Content-Type: application/octet-stream) straight to disk,
+    skipping multipart parsing. `upload_id` is a client-generated UUID; pass it as the
+    `upload_id` form field of /start_generation to use the streamed files.
+    """
+    log.info("[ROUTE] POST /upload_stream/%s/%s", upload_id[:8], filename)
+    try:
+        if str(uuid.UUID(upload_id)) != upload_id:
+            raise ValueError(upload_id)
+    except ValueError:
+        return _json_response({"error": "upload_id must be a lowercase hyphenated UUID."}, 400)
+    if upload_id in tasks or _read_task_snapshot(upload_id) is not None:
+        return _json_response({"error": "This upload_id already belongs to a started task."}, 409)
+    name = secure_filename(filename)
+    if not name:
+        return _json_response({"error": "Invalid filename."}, 400)
+
+    task_dir = create_task_dir(upload_id)
+    marker = os.path.join(task_dir, STAGED_MARKER)
+    if not os.path.exists(marker) and _has_task_files(task_dir):
+        # folder of a task started since (or before a restart): never reopen it for staging
+        return _json_response({"error": "This upload_id already belongs to a started task."}, 409)
+    # (re)touching the marker also resets the stale-upload clock
+    Path(marker).touch()
+    file_path = os.path.join(task_dir, name)
+    tmp = file_path + ".part"
+    with open(tmp, 'wb') as out:
+        shutil.copyfileobj(request.stream, out, 1 << 20)
+        size = out.tell()
+    os.replace(tmp, file_path)
+    return _json_response({"ok": True, "upload_id": upload_id, "filename": name, "bytes": size})
 
 @app.route('/download_raw/<task_id>/<path:filename>')
 def download_raw(task_id, filename):
@@ -543,11 +1253,11 @@ def download_raw(task_id, filename):
     Securely serve a file from Run_Space/<task_id> as an attachment (download).
     Prevents path-traversal and only serves files that exist inside the task directory.
     """
-    print(f"[ROUTE] GET /download_raw/{task_id[:8]}/{filename}")
+    log.info("[ROUTE] GET /download_raw/%s/%s", task_id[:8], filename)
 
-    # Ensure task exists (optional — makes errors clearer)
-    if task_id not in tasks:
-        print("[ERROR] download_raw: Task not found")
+    # Ensure task exists (optional — makes errors clearer); evicted tasks keep their folder
+    if not _is_known_task(task_id):
+        log.error("[ERROR] download_raw: Task not found")
         abort(404, description="Task not found")
 
     upload_folder = app.config.get('UPLOAD_FOLDER', os.path.join(os.getcwd(), "Run_Space"))
@@ -562,12 +1272,17 @@ def download_raw(task_id, filename):
 
     # Ensure the file actually exists under the task dir
     if not os.path.isfile(full_path):
-        print(f"[ERROR] download_raw: file not found: {full_path}")
+        log.error("[ERROR] download_raw: file not found: %s", full_path)
         abort(404, description="File not found")
 
+    if app.config['BEHIND_NGINX']:
+        resp = _accel_redirect(f"{task_id}/{filename}", download_name=os.path.basename(full_path))
+        resp.cache_control.no_cache = True
+        return resp
+
     # send_from_directory will stream the file as an attachment
     try:
-        return send_from_directory(task_dir, filename, as_attachment=True)
+        return send_from_directory(task_dir, filename, as_attachment=True, conditional=True, etag=True, max_age=0)
     except Exception as e:
         app.logger.exception("download_raw: failed to send file")
         abort(500, description=str(e))
@@ -578,10 +1293,10 @@ def view_script(task_id, which):
     View generated script content in a readable web page.
     which: 'create' or 'insert'
     """
-    print(f"[ROUTE] GET /view_script/{task_id[:8]}/{which}")
+    log.info("[ROUTE] GET /view_script/%s/%s", task_id[:8], which)
 
-    # Validate task exists
-    if task_id not in tasks:
+    # Validate task exists; evicted tasks keep their folder
+    if not _is_known_task(task_id):
         return "Task not found", 404
 
     # Only allow the two script types
@@ -620,8 +1335,7 @@ def view_script(task_id, which):
         )
 
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = Path(path).read_bytes().decode('utf-8')
     except Exception as e:
         app.logger.exception("Failed to read script file")
         return f"Failed to read script: {e}", 500
@@ -639,9 +1353,13 @@ def view_script(task_id, which):
 
 @app.route('/start_generation', methods=['POST'])
 def start_generation():
-    print("[ROUTE] POST /start_generation")
-    task_id = str(uuid.uuid4())
-    print(f"[TASK] New task created: {task_id}")
+    log.info("[ROUTE] POST /start_generation")
+    # files streamed beforehand through /upload_stream/<upload_id>/... become this task's uploads
+    upload_id = request.form.get('upload_id')
+    staged = _claim_staged_upload(upload_id)
+    task_id = upload_id if staged else str(uuid.uuid4())
+    log.info("[TASK] New task created: %s", task_id)
+    _evict_finished_tasks()
     # attribute prints during this request to the created task
     current_task.task_id = task_id
 
@@ -649,234 +1367,147 @@ def start_generation():
     files = request.files.getlist('csv_files')
     context = request.form['schema_context']
     #context = clean_text(context)
-    print(f"[CONTEXT] Received schema context ({len(context)} chars).")
-    base = app.config['UPLOAD_FOLDER']
-    os.makedirs(base, exist_ok=True)
+    log.info("[CONTEXT] Received schema context (%s chars).", len(context))
+    # background stages reuse tasks[task_id].task_dir instead of re-running create_task_dir
     task_dir = create_task_dir(task_id)
 
     files_uploaded = False
-    fetch_attempted = False
-    if data_medium == 'direct_file_drop' and files:
-        print(f"[UPLOAD] Handling {len(files)} uploaded files.")
-        handle_user_upload(files, task_id)
+    if data_medium == 'direct_file_drop' and (files or staged):
+        if files:
+            log.info("[UPLOAD] Handling %s uploaded files.", len(files))
+            csv_files = handle_user_upload(files, task_dir)
+        else:
+            log.info("[UPLOAD] Using files streamed to upload %s.", task_id[:8])
+            csv_files = _convert_uploads(task_dir, _list_task_files(task_dir))
         files_uploaded = True
-
-        csv_files = get_csv_files_from_directory(task_dir)
-        print(f"[CHECK] Found CSV files: {csv_files}")
-        if not csv_files:
-            process_uploaded_files(task_dir)
-            csv_files = get_csv_files_from_directory(task_dir)
-            print(f"[CHECK] Rechecked CSV files: {csv_files}")
+        log.info("[CHECK] Found CSV files: %s", csv_files)
 
         if not csv_files:
-            saved_files = os.listdir(task_dir)
-            print(f"[ERROR] No CSV files found after upload. Saved files: {saved_files}")
-            return jsonify({
+            saved_files = _list_task_files(task_dir)
+            log.error("[ERROR] No CSV files found after upload. Saved files: %s", saved_files)
+            return _json_response({
                 "error": "No CSV files found after upload.",
                 "saved_files": saved_files,
                 "hint": "Upload CSV files or JSON files that can be converted to CSV."
-            }), 400
+            }, 400)
 
-    task_data_path = None
+    # Remote sources only validate their inputs here; `fetch` does the transfer on a background
+    # thread (see run_fetch_pipeline) so a slow source never pins this request worker.
+    fetch = None
     if data_medium in ('dynamodb', 'aws_dynamodb'):
-        print("[FETCH] Data source: DynamoDB")
-        try:
-            # Support two forms: either individual fields (preferred) or a
-            # combined connection string in 'aws_dynamodb_connection' like
-            # "region=us-east-1,table=my_table,access_key=...,secret_key=...".
-            # Require explicit structured DynamoDB inputs from the client form
-            access_key = request.form.get('dynamodb_access_key')
-            secret_key = request.form.get('dynamodb_secret_key')
-            region = request.form.get('dynamodb_region')
-            table_name = request.form.get('dynamodb_table_name')
-
-            if not table_name:
-                return jsonify({"error": "Missing DynamoDB table name (provide 'dynamodb_table_name' in the form)."}), 400
-
-            fetch_attempted = True
-            items = fetch_from_dynamodb(
+        log.info("[FETCH] Data source: DynamoDB")
+        source = "DynamoDB"
+        # Require explicit structured DynamoDB inputs from the client form
+        access_key = request.form.get('dynamodb_access_key')
+        secret_key = request.form.get('dynamodb_secret_key')
+        region = request.form.get('dynamodb_region')
+        table_name = request.form.get('dynamodb_table_name')
+
+        if not table_name:
+            return _json_response({"error": "Missing DynamoDB table name (provide 'dynamodb_table_name' in the form)."}, 400)
+
+        def fetch(task_dir):
+            # scan pages are written as they arrive instead of collecting the whole table first
+            items = iter_dynamodb_items(
                 access_key=access_key,
                 secret_key=secret_key,
                 region=region,
                 table_name=table_name
             )
-            # use resolved table_name (may have come from parsed connection)
-            task_data_path = os.path.join(task_dir, f"{table_name}.json")
-            with open(task_data_path, 'w', encoding='utf-8') as f:
-                json.dump(items, f, indent=2)
-            # mark that we've placed files into the task folder
-            files_uploaded = True
-            add_log(task_id, f"✅ Fetched {len(items)} items from DynamoDB table '{table_name}'.")
-        except Exception as e:
-            return jsonify({"error": f"DynamoDB fetch failed: {e}"}), 500
+            count = write_json_records(items, os.path.join(task_dir, f"{table_name}.json"))
+            return f"✅ Fetched {count} items from DynamoDB table '{table_name}'."
 
     elif data_medium in ('s3', 's3_bucket'):
-        print("[FETCH] Data source: S3")
-        try:
-            # Support either separate fields or a single s3_bucket_path like
-            # s3://bucket/key/to/object.ext
-            # Require explicit structured S3 inputs from the client form
-            if 's3_object_key' in request.form and 's3_bucket_name' in request.form:
-                bucket = request.form['s3_bucket_name']
-                object_key = request.form['s3_object_key']
-            else:
-                return jsonify({"error": "Missing S3 bucket name or object key (provide 's3_bucket_name' and 's3_object_key')."}), 400
+        log.info("[FETCH] Data source: S3")
+        source = "S3"
+        # Require explicit structured S3 inputs from the client form
+        if 's3_object_key' in request.form and 's3_bucket_name' in request.form:
+            bucket = request.form['s3_bucket_name']
+            object_key = request.form['s3_object_key']
+        else:
+            return _json_response({"error": "Missing S3 bucket name or object key (provide 's3_bucket_name' and 's3_object_key')."}, 400)
+        access_key = request.form.get('s3_access_key')
+        secret_key = request.form.get('s3_secret_key')
+        region = request.form.get('s3_region')
 
+        def fetch(task_dir):
             local_filename = os.path.join(task_dir, os.path.basename(object_key) or 's3_object')
-            fetch_attempted = True
             fetch_from_s3(
-                access_key=request.form.get('s3_access_key'),
-                secret_key=request.form.get('s3_secret_key'),
-                region=request.form.get('s3_region'),
+                access_key=access_key,
+                secret_key=secret_key,
+                region=region,
                 bucket_name=bucket,
                 object_key=object_key,
                 local_filename=local_filename
             )
-            # mark that we've placed files into the task folder
-            files_uploaded = True
-            add_log(task_id, f"✅ Fetched file from S3 bucket '{bucket}' to '{local_filename}'.")
-        except Exception as e:
-            return jsonify({"error": f"S3 fetch failed: {e}"}), 500
+            return f"✅ Fetched file from S3 bucket '{bucket}' to '{local_filename}'."
 
     elif data_medium in ('azure_cosmosdb', 'cosmosdb'):
-        print("[FETCH] Data source: Azure Cosmos DB")
-        try:
-            # Expect either separate fields: cosmos_uri, cosmos_db, cosmos_collection
-            # or a combined connection string in 'azure_cosmosdb_connection' (less preferred)
-            # Require explicit structured Cosmos inputs from the client form
-            uri = request.form.get('cosmos_uri')
-            db_name = request.form.get('cosmos_db')
-            collection = request.form.get('cosmos_collection')
-
-            if not (uri and db_name and collection):
-                return jsonify({"error": "Missing CosmosDB connection details. Provide cosmos_uri, cosmos_db, and cosmos_collection."}), 400
-
-            fetch_attempted = True
-            docs = fetch_from_cosmosdb(uri=uri, db_name=db_name, collection_name=collection)
-            task_data_path = os.path.join(task_dir, f"{db_name}__{collection}.json")
-            with open(task_data_path, 'w', encoding='utf-8') as f:
-                json.dump(docs, f, indent=2)
-            add_log(task_id, f"✅ Fetched {len(docs)} documents from CosmosDB {db_name}/{collection}.")
-        except Exception as e:
-            return jsonify({"error": f"CosmosDB fetch failed: {e}"}), 500
+        log.info("[FETCH] Data source: Azure Cosmos DB")
+        source = "CosmosDB"
+        # Require explicit structured Cosmos inputs from the client form
+        uri = request.form.get('cosmos_uri')
+        db_name = request.form.get('cosmos_db')
+        collection = request.form.get('cosmos_collection')
+
+        if not (uri and db_name and collection):
+            return _json_response({"error": "Missing CosmosDB connection details. Provide cosmos_uri, cosmos_db, and cosmos_collection."}, 400)
+
+        def fetch(task_dir):
+            docs = iter_cosmosdb_docs(uri=uri, db_name=db_name, collection_name=collection)
+            count = write_json_records(docs, os.path.join(task_dir, f"{db_name}__{collection}.json"))
+            return f"✅ Fetched {count} documents from CosmosDB {db_name}/{collection}."
 
     elif data_medium in ('website', 'Website/HTML', 'website_html'):
-        print("[FETCH] Data source: Website/HTML")
-        try:
-            website_url = request.form.get('website_link') or request.form.get('website_url')
-            if not website_url:
-                return jsonify({"error": "Missing website URL (provide 'website_link')."}), 400
+        log.info("[FETCH] Data source: Website/HTML")
+        source = "Website conversion"
+        website_url = request.form.get('website_link') or request.form.get('website_url')
+        if not website_url:
+            return _json_response({"error": "Missing website URL (provide 'website_link')."}, 400)
 
-            fetch_attempted = True
+        def fetch(task_dir):
             add_log(task_id, f"Fetching and converting website: {website_url}")
-            # Ask converter to write directly into the task folder and return absolute paths
+            # convert_html_to_csv writes and closes every CSV before returning their absolute paths,
+            # so its return value is authoritative; no need to poll the folder.
             written_files = convert_html_to_csv(website_url, output_dir=task_dir)
-
-            # Ensure the returned files actually exist and record basenames.
-            # Some converters may have small write delays; poll briefly for files to appear.
             moved = [os.path.basename(p) for p in written_files if os.path.exists(p)]
-            files_uploaded = bool(moved)
-            task_data_path = task_dir
-            add_log(task_id, f"✅ Website conversion initial result: {moved}")
-
             if not moved:
-                # Poll for a short time to allow converter to finish writing files to disk.
-                max_wait = 12.0  # seconds
-                interval = 0.5
-                waited = 0.0
-                add_log(task_id, f"Waiting up to {max_wait}s for converter to write files...")
-                while waited < max_wait and not moved:
-                    time.sleep(interval)
-                    waited += interval
-                    # re-check for any CSV files in the task folder
-                    try:
-                        current_csvs = [f for f in os.listdir(task_dir) if f.lower().endswith('.csv') and not f.startswith('.')]
-                    except Exception:
-                        current_csvs = []
-                    if current_csvs:
-                        moved = current_csvs
-                        files_uploaded = True
-                        add_log(task_id, f"Detected CSVs after waiting: {moved}")
-                        break
+                raise RuntimeError(f"no CSVs were produced (written: {written_files}); check the target URL and page access")
+            return f"✅ Website conversion result: {moved}"
 
-            if not moved:
-                # Conversion completed (or returned) but produced no files; return clear error to client
-                try:
-                    saved = [f for f in os.listdir(task_dir) if not f.startswith('.')]
-                except Exception:
-                    saved = []
-                app.logger.error(f"Website conversion produced no files. Written: {written_files}; Saved in task dir: {saved}")
-                return jsonify({
-                    "error": "Website conversion completed but no CSVs were produced.",
-                    "written_files": written_files,
-                    "saved_files": saved,
-                    "hint": "Check the target URL, page access, converter logs on the server, or increase the wait timeout."
-                }), 500
-        except Exception as e:
-            app.logger.error(f"Website conversion failed: {e}", exc_info=True)
-            return jsonify({"error": f"Website conversion failed: {e}"}), 500
+    if fetch is not None:
+        if not context:
+            return _json_response({"error": "Please provide a data source and context."}, 400)
+        tasks[task_id] = TaskRecord(context=context, task_dir=task_dir, paths=TaskPaths.for_task(task_dir), status=f"Fetching data ({source})...")
+        add_log(task_id, f"User Context: {context}", role="user")
+        log.info("[THREAD] Queueing background fetch for task %s...", task_id[:8])
+        tasks[task_id].submit(run_fetch_pipeline, task_id, source, fetch, context)
+        return _json_response({"task_id": task_id, "status": "fetching"})
 
-    # After fetching, all data (from any source) should be a local file in the task folder.
-    # If a fetch was attempted but nothing was written into the task folder, report an error.
-    try:
-        saved_files = [f for f in os.listdir(task_dir) if not f.startswith('.')]
-    except Exception:
-        saved_files = []
-
-    # Exclude the seeded helper file db_utils.py from the check
-    visible_files = [f for f in saved_files if f != 'db_utils.py']
-    if fetch_attempted and not visible_files:
-        print(f"[ERROR] Fetch attempted but no files were written to {task_dir}. Saved files: {saved_files}")
-        return jsonify({
-            "error": "Data fetch attempted but no files were written into the task Run_Space directory.",
-            "saved_files": saved_files,
-            "hint": "Check credentials, table/object names, and network access."
-        }), 500
-
-    # The rest of the pipeline expects CSVs, so run conversion (this may convert JSON -> CSV etc.)
-    converted = process_uploaded_files(task_dir)
-    add_log(task_id, "Running file conversion to ensure all data is in CSV format.")
-
-    # After conversion, ensure there are CSV files. If a fetch was attempted but conversion produced none,
-    # return an explicit error so the client can surface the fetch failure.
-    csv_files = get_csv_files_from_directory(task_dir)
-    if fetch_attempted and not csv_files:
-        saved_files = [f for f in os.listdir(task_dir) if not f.startswith('.')]
-        print(f"[ERROR] Fetch/convert attempted but no CSV files found in {task_dir}. Saved files: {saved_files}; Converted: {converted}")
-        return jsonify({
-            "error": "Data fetch/convert completed but no CSV files were produced.",
-            "saved_files": saved_files,
-            "converted_files": converted
-        }), 500
+    # Uploads were already converted to CSV by handle_user_upload (which returned the CSV list
+    # checked above), and a SharePoint link is read directly by generate_metadata; nothing to re-scan.
 
     if not (files_uploaded or data_medium != 'direct_file_drop') or not context:
-        print("[ERROR] Invalid input: missing data source or context.")
-        return jsonify({"error": "Please provide a data source and context."}), 400
+        log.error("[ERROR] Invalid input: missing data source or context.")
+        return _json_response({"error": "Please provide a data source and context."}, 400)
 
     if files_uploaded:
         source_path = task_dir
+        # the upload step already knows every CSV it saved or converted; don't list the folder again
+        csv_files = list(dict.fromkeys(csv_files))
     else:
         sharepoint_link = request.form.get('sharepoint_link')
         source_path = sharepoint_link if sharepoint_link else task_dir
+        csv_files = None
 
-    tasks[task_id] = {
-        "status": "Starting...",
-        "logs": [],
-        # system terminal logs captured for debugging and display
-        "system_logs": [],
-        # images will be registered as they are generated; keep list for history
-        "images": [],
-        "schema_image_url": "",
-        "context": context
-    }
+    tasks[task_id] = TaskRecord(context=context, task_dir=task_dir, paths=TaskPaths.for_task(task_dir))
 
     add_log(task_id, f"User Context: {context}", role="user")
-    print(f"[THREAD] Launching background thread for task {task_id[:8]}...")
-    thread = threading.Thread(target=run_processing_pipeline, args=(task_id, source_path, context))
-    thread.start()
+    log.info("[THREAD] Queueing pipeline for task %s...", task_id[:8])
+    tasks[task_id].submit(run_processing_pipeline, task_id, source_path, context, csv_files)
 
-    # leave request; thread will capture subsequent background prints
-    return jsonify({"task_id": task_id})
+    # leave request; the pool worker will capture subsequent background logs
+    return _json_response({"task_id": task_id})
 
 @app.route('/approve_action/<task_id>', methods=['POST'])
 def approve_action(task_id):
@@ -884,61 +1515,84 @@ def approve_action(task_id):
     Called by the frontend to approve a paused action (create / insert).
     Expected JSON body: { "action": "create" } OR { "action": "insert" }
     """
-    print(f"[ROUTE] POST /approve_action/{task_id[:8]}")
+    log.info("[ROUTE] POST /approve_action/%s", task_id[:8])
     data = request.get_json() or {}
     action = data.get('action')
 
     if not action or action not in ('create', 'insert'):
-        return jsonify({"error": "Invalid action. Use 'create' or 'insert'."}), 400
+        return _json_response({"error": "Invalid action. Use 'create' or 'insert'."}, 400)
 
     # Ensure task exists
     if task_id not in tasks:
-        return jsonify({"error": "Task not found."}), 404
+        return _expired_task_response(task_id)
+
+    if tasks[task_id].expire_approval():
+        add_log(task_id, f"❌ Approval for {action} arrived after the {APPROVAL_TIMEOUT_S}s approval window; start a new run.", role="assistant")
+        return _json_response({"ok": False, "message": "Approval window expired for this task."}, 410)
 
     # If task exists, check what it's actually awaiting (if present) so we can warn if mismatched
-    awaited = tasks.get(task_id, {}).get('awaiting_approval')
+    awaited = tasks[task_id].awaiting_approval
     if awaited is None:
         # No awaiting_approval flag — still allow the approve to proceed in case of a race,
         # but inform in logs so it's obvious in the UI/server logs.
         add_log(task_id, f"❌ Approve called for {action}, but pipeline was not awaiting approval.", role="assistant")
-        return jsonify({"ok": False, "message": "No approval awaited for this task."}), 409
+        return _json_response({"ok": False, "message": "No approval awaited for this task."}, 409)
 
     if awaited != action:
-        # warn but allow approval — sometimes frontend state can get out of sync.
-        add_log(task_id, f"⚠️ Approval action mismatch. Task expected '{awaited}', but got '{action}'. Proceeding anyway.", role="assistant")
-
-    # Signal the waiting background thread by setting the event
-    evt = approval_events.get(task_id)
-    if not evt:
-        # No event means either it's already approved or not currently awaiting approval
+        # Approving the wrong phase would run the wrong step; make the frontend resync instead.
+        add_log(task_id, f"⚠️ Approval action mismatch. Task expected '{awaited}', but got '{action}'.", role="assistant")
+        return _json_response({"ok": False, "message": f"Task is awaiting '{awaited}', not '{action}'."}, 409)
+
+    # Claim the parked step; claiming clears it, so a duplicate approve is a no-op
+    resume = tasks[task_id].take_resume(action)
+    if resume is None:
+        # No pending step means either it's already approved or not currently awaiting approval
         add_log(task_id, f"❌ Approve called for {action}, but pipeline was not awaiting approval.", role="assistant")
-        return jsonify({"ok": False, "message": "No approval awaited for this task."}), 409
+        return _json_response({"ok": False, "message": "No approval awaited for this task."}, 409)
 
     try:
         # keep your original add_log message (role=user)
         add_log(task_id, f"User approved: {action}.", role="user")
         set_task_status(task_id, f"User approved: {action}. Resuming...")
 
-        # Set the event to resume the background thread. Do NOT pop here; leave cleanup to the background thread
-        # to avoid races where both this route and the thread try to remove the event entry.
-        evt.set()
+        # Run the next step on the step executor; no thread was parked waiting for this
+        tasks[task_id].submit(_run_pipeline_step, resume, task_id, pool=_step_executor)
 
-        # Return success immediately; background thread will do the work and update logs/status.
-        return jsonify({"ok": True, "message": f"Approved {action}."})
+        # Return success immediately; the worker will do the work and update logs/status.
+        return _json_response({"ok": True, "message": f"Approved {action}."})
     except Exception as e:
         app.logger.exception("Error in approve_action")
-        return jsonify({"ok": False, "error": str(e)}), 500
+        return _json_response({"ok": False, "error": str(e)}, 500)
 
 @app.route('/status/<task_id>')
 def task_status(task_id):
-    print(f"[ROUTE] GET /status/{task_id[:8]}")
+    log.info("[ROUTE] GET /status/%s", task_id[:8])
     task = tasks.get(task_id)
     if task:
-        print('Task awaiting_approval: ', task.get('awaiting_approval'), ' Status: ',task.get('status'))
+        log.debug("Task awaiting_approval: %s Status: %s", task.awaiting_approval, task.status)
     if not task:
-        print("[ERROR] Task not found.")
-        return jsonify({"error": "Task not found"}), 404
-    return jsonify(task)
+        snapshot = _read_task_snapshot(task_id)
+        if snapshot is not None:
+            return Response(snapshot, mimetype='application/json')
+        log.error("[ERROR] Task not found.")
+        return _json_response({"error": "Task not found"}, 404)
+    if task.expire_approval():
+        _finish_task(task_id, task)
+    # push any buffered log records into the task before serializing it
+    _task_log_buffer.flush()
+    return Response(task.status_json(), mimetype='application/json')
+
+@app.route('/cancel/<task_id>', methods=['POST'])
+def cancel_task(task_id):
+    """Cancel a task's queued or running pipeline (see TaskRecord.cancel)."""
+    log.info("[ROUTE] POST /cancel/%s", task_id[:8])
+    task = tasks.get(task_id)
+    if task is None:
+        return _json_response({"error": "Task not found."}, 404)
+    stopped_before_start = task.cancel()
+    add_log(task_id, "Task cancelled by user.", role="user")
+    _finish_task(task_id, task)
+    return _json_response({"ok": True, "stopped_before_start": stopped_before_start})
 
 @app.route('/submit_review/<task_id>', methods=['POST'])
 def submit_review(task_id):
@@ -951,7 +1605,7 @@ def submit_review(task_id):
 
     Replaces the previous text-classification-based endpoint.
     """
-    print(f"[ROUTE] POST /submit_review for Task {task_id[:8]}")
+    log.info("[ROUTE] POST /submit_review for Task %s", task_id[:8])
     data = request.get_json() or {}
 
     action = data.get('action')
@@ -959,51 +1613,49 @@ def submit_review(task_id):
 
     # Basic validation
     if not action or not isinstance(action, str):
-        print("[ERROR] Missing or invalid 'action' in request.")
-        return jsonify({"error": "Missing or invalid 'action' field. Use 'approve' or 'correct'."}), 400
+        log.error("[ERROR] Missing or invalid 'action' in request.")
+        return _json_response({"error": "Missing or invalid 'action' field. Use 'approve' or 'correct'."}, 400)
 
     action = action.strip().lower()
 
     # Ensure task exists
     if task_id not in tasks:
-        print(f"[ERROR] Task {task_id[:8]} not found.")
-        return jsonify({"error": "Task not found."}), 404
+        log.error("[ERROR] Task %s not found.", task_id[:8])
+        return _expired_task_response(task_id)
 
     try:
         if action == 'approve':
             # User approved the schema — continue pipeline
-            print("[REVIEW] User approved schema (via action='approve').")
+            log.info("[REVIEW] User approved schema (via action='approve').")
             add_log(task_id, "User approved schema.", role="user")
             # Fire-and-forget: continue pipeline in background
-            thread = threading.Thread(target=continue_pipeline, args=(task_id,), daemon=True)
-            thread.start()
-            return jsonify({"message": "Approval received. Continuing pipeline."}), 200
+            tasks[task_id].submit(continue_pipeline, task_id, pool=REVIEW_POOL)
+            return _json_response({"message": "Approval received. Continuing pipeline."})
 
         elif action == 'correct':
             # User submitted corrections; 'details' must contain the corrections text
             if not isinstance(details, str) or not details.strip():
-                print("[ERROR] Correction requested but no details supplied.")
-                return jsonify({"error": "Please provide correction details in the 'details' field."}), 400
+                log.error("[ERROR] Correction requested but no details supplied.")
+                return _json_response({"error": "Please provide correction details in the 'details' field."}, 400)
 
             correction_details = details.strip()
-            print(f"[REVIEW] User requested corrections: {correction_details}")
+            log.info("[REVIEW] User requested corrections: %s", correction_details)
             add_log(task_id, f"User requested corrections: {correction_details}", role="user")
-            thread = threading.Thread(target=run_correction_loop, args=(task_id, correction_details), daemon=True)
-            thread.start()
-            return jsonify({"message": "Corrections received. Applying corrections."}), 200
+            tasks[task_id].submit(run_correction_loop, task_id, correction_details, pool=REVIEW_POOL)
+            return _json_response({"message": "Corrections received. Applying corrections."})
 
         else:
-            print(f"[ERROR] Invalid action value: {action}")
-            return jsonify({"error": "Invalid action. Use 'approve' or 'correct'."}), 400
+            log.error("[ERROR] Invalid action value: %s", action)
+            return _json_response({"error": "Invalid action. Use 'approve' or 'correct'."}, 400)
 
     except Exception as e:
         # Defensive: log exception and return 500
         app.logger.exception("Error handling submit_review")
-        return jsonify({"error": str(e)}), 500
+        return _json_response({"error": str(e)}, 500)
     
 
 # -------------------- APP START --------------------
 if __name__ == '__main__':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    print(f"[STARTUP] Flask app running on port 5001...")
+    log.info("[STARTUP] Flask app running on port 5001...")
     app.run(debug=True, port=5001)
@@ -1,4 +1,9 @@
 import os
+import time
+import random
+import hashlib
+import tempfile
+import functools
 from dotenv import load_dotenv
 import google.generativeai as genai
 
@@ -26,26 +31,158 @@ DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME")
 
 try:
     from google import genai
+    from google.genai import errors as genai_errors
     _HAS_GENAI = True
 except Exception:
     _HAS_GENAI = False
 
+# Transient failures (timeouts, 429, 5xx) are retried with jittered exponential backoff:
+# by the openai SDK itself for Azure, by _gemini_generate for Gemini.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "300"))
+
+# Deterministic (temperature 0) responses are cached on disk by prompt hash, so re-runs
+# on the same inputs (e.g. during correction loops) skip the round-trip.
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".llm_cache"))
+LLM_CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 86400)))
+# Entries are LRU: a hit refreshes the file's mtime, and the least recently used files
+# beyond this count are removed when a new response is stored.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
 #Imports Complete
 
-def gemini_api_call(prompt , model=MODEL, temperature=0.0) -> str:
+def _cache_key(provider, model, temperature, prompt):
+    return hashlib.sha256(f"{provider}|{model}|{temperature}|{prompt}".encode("utf-8")).hexdigest()
+
+def _cache_get(key):
+    path = os.path.join(LLM_CACHE_DIR, key + ".txt")
+    try:
+        if time.time() - os.path.getmtime(path) > LLM_CACHE_TTL_S:
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path)
+        return text
+    except OSError:
+        return None
+
+def _cache_prune():
+    """Remove the least recently used entries beyond LLM_CACHE_MAX_ENTRIES."""
+    try:
+        with os.scandir(LLM_CACHE_DIR) as it:
+            entries = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith(".txt")]
+    except OSError:
+        return
+    excess = len(entries) - LLM_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    for _, path in sorted(entries)[:excess]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _cache_put(key, text):
+    if not isinstance(text, str) or not text.strip():
+        return
+    path = os.path.join(LLM_CACHE_DIR, key + ".txt")
+    tmp = None
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        # a temp file of its own: threads of one process may store the same key at once
+        fd, tmp = tempfile.mkstemp(dir=LLM_CACHE_DIR, suffix=".tmp")
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        return
+    _cache_prune()
+
+def _cache_drop(key):
+    try:
+        os.remove(os.path.join(LLM_CACHE_DIR, key + ".txt"))
+    except OSError:
+        pass
+
+def _azure_cache_key(deployment, temperature, prompt, system):
+    return _cache_key("azure", deployment, temperature, prompt if system is None else f"{system}\0{prompt}")
+
+def evict_cached(prompt, model=None, system=None, provider="azure"):
+    """Forget the cached reply to a temperature-0 call with these arguments.
+
+    Responses are cached before the caller sees them, so a caller that rejects one
+    (unparseable JSON, a script that fails) must evict it or every re-run replays it.
+    `provider` is "azure" for api_call and "gemini" for gemini_api_call.
+    """
+    if provider == "gemini":
+        _cache_drop(_cache_key("gemini", model or MODEL, 0.0, prompt))
+    else:
+        _cache_drop(_azure_cache_key(model if model else DEPLOYMENT_NAME, 0.0, prompt, system))
+
+# Clients are built once and shared: each holds an HTTP connection pool, so later calls
+# skip the TLS handshake and auth setup. Both SDKs' sync clients are thread-safe.
+@functools.lru_cache(maxsize=None)
+def _gemini_client():
+    return genai.Client(api_key=API_KEY)
+
+@functools.lru_cache(maxsize=None)
+def _azure_client():
+    return AzureOpenAI(
+        api_key=GPT_KEY,
+        api_version="2024-02-01",
+        azure_endpoint=GPT_ENDPOINT,
+        max_retries=LLM_MAX_RETRIES,
+        timeout=LLM_TIMEOUT_S,
+    )
+
+def _gemini_generate(model, prompt):
+    """generate_content, retrying rate limits and server errors up to LLM_MAX_RETRIES times."""
+    client = _gemini_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return client.models.generate_content(model=model, contents=prompt)
+        except genai_errors.APIError as e:
+            if attempt == LLM_MAX_RETRIES or not (e.code == 429 or isinstance(e, genai_errors.ServerError)):
+                raise
+            delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"⏳ Gemini call failed ({e.code}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def gemini_api_call(prompt , model=MODEL, temperature=0.0, use_cache=True) -> str:
     if not _HAS_GENAI:
         raise RuntimeError(
             "google.genai client not available. Install `google-genai` or adapt call_llm_with_genai()."
         )
 
-    genai_client = genai.Client(api_key=API_KEY)
+    use_cache = use_cache and temperature == 0.0
+    if use_cache:
+        key = _cache_key("gemini", model, temperature, prompt)
+        cached = _cache_get(key)
+        if cached is not None:
+            print("📦 Gemini response served from cache.")
+            return cached
 
     print("📡 Sending prompt to Gemini model (via google.genai client)...")
-    response = genai_client.models.generate_content(model=model, contents=prompt)
+    response = _gemini_generate(model, prompt)
+    if use_cache:
+        _cache_put(key, response.text)
     return response.text
 
-def api_call(prompt, model=None, temperature=0.0) -> str:
-    """Makes an API call to an Azure OpenAI endpoint."""
+def api_call(prompt, model=None, temperature=0.0, use_cache=True, system=None) -> str:
+    """Makes an API call to an Azure OpenAI endpoint.
+
+    With temperature 0.0 the response is cached on disk by prompt hash (see LLM_CACHE_DIR);
+    pass use_cache=False to force a fresh call, and evict_cached() to drop a reply the
+    caller rejected. A `system` text is sent as a separate
+    system message ahead of the prompt; keep it identical across calls so the endpoint's
+    prompt cache can reuse that prefix.
+    """
     if not all([GPT_KEY, GPT_ENDPOINT, DEPLOYMENT_NAME]):
         raise RuntimeError(
             "Azure OpenAI credentials (GPT_KEY, GPT_ENDPOINT, DEPLOYMENT_NAME) not found in .env file."
@@ -53,17 +190,31 @@ def api_call(prompt, model=None, temperature=0.0) -> str:
 
     deployment = model if model else DEPLOYMENT_NAME
 
+    if use_cache and temperature == 0.0:
+        key = _azure_cache_key(deployment, temperature, prompt, system)
+        cached = _cache_get(key)
+        if cached is not None:
+            print(f"📦 Azure OpenAI response served from cache (deployment: {deployment}).")
+            return cached
+        text = _azure_call(prompt, deployment, temperature, system)
+        _cache_put(key, text)
+        return text
+    return _azure_call(prompt, deployment, temperature, system)
+
+def _messages(prompt, system):
+    if system is None:
+        return [{"role": "user", "content": prompt}]
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+def _azure_call(prompt, deployment, temperature, system=None):
+    """Uncached Azure OpenAI chat completion."""
     if _HAS_V1_OPENAI:
         # Modern (v1.x) client
         print(f"📡 Sending prompt to Azure OpenAI model (v1.x client, deployment: {deployment})...")
-        client = AzureOpenAI(
-            api_key=GPT_KEY,
-            api_version="2024-02-01",
-            azure_endpoint=GPT_ENDPOINT
-        )
+        client = _azure_client()
         response = client.chat.completions.create(
             model=deployment,
-            messages=[{"role": "user", "content": prompt}],
+            messages=_messages(prompt, system),
             temperature=temperature,
         )
         return response.choices[0].message.content
@@ -77,7 +228,7 @@ def api_call(prompt, model=None, temperature=0.0) -> str:
 
         response = openai.ChatCompletion.create(
             engine=deployment,
-            messages=[{"role": "user", "content": prompt}],
+            messages=_messages(prompt, system),
             temperature=temperature,
         )
         return response['choices'][0]['message']['content']
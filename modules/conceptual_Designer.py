@@ -1,42 +1,57 @@
 import os
+import re
 import json
 import logging
-from dotenv import load_dotenv
-import google as genai
-from .api_Call import api_call
+from pathlib import Path
+from .api_Call import api_call, evict_cached
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
 
 # ========== PATH CONFIG ==========
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # ========== LOGGING ==========
-logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+def _configure_logging():
+    """Console logging for running this module as a script; importers (flask_app) configure their own."""
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+
+
+# A reply wrapped in a ``` or ```json fence, with any surrounding whitespace
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.S)
+
+# Metadata files larger than this go into the prompt as the file's own text instead of
+# being parsed and re-serialized (see load_metadata_for_prompt).
+METADATA_INLINE_BYTES = int(os.getenv("METADATA_INLINE_BYTES", "2000000"))
 
 # ========== CORE FUNCTIONS ==========
 
+def _read_bytes(path):
+    try:
+        return Path(path).read_bytes()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"❌ File not found at {path}") from None
+
+def _parse_json(data):
+    return orjson.loads(data) if _HAS_ORJSON else json.loads(data)
+
 def load_json_file(path):
     """Load a JSON file."""
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"❌ File not found at {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _parse_json(_read_bytes(path))
 
 def load_text_file(path):
     """Load a text file."""
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"❌ File not found at {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+    return _read_bytes(path).decode("utf-8")
 
-def build_prompt(metadata, user_context):
-    """
-    Builds a GPT-4o-optimized prompt for creating a 3NF conceptual model
-    and classifying Fact and Dimension tables from transactional metadata.
-    """
-
-    system_instructions = (
-        """You are a senior database architect specializing in data warehousing and normalization.
+# Sent as the system message of every call. The endpoint caches a long prompt prefix it
+# has seen recently, so this must stay byte-identical across calls: keep per-call data out.
+SYSTEM_INSTRUCTIONS = """You are a senior database architect specializing in data warehousing and normalization.
 Your task is to design a **3NF conceptual model** from provided source metadata,
 and classify each resulting entity as either a **Fact** or **Dimension** table.
 
@@ -86,59 +101,130 @@ Do NOT include markdown, explanations, or any text outside the JSON.
   }
 }
 """
-    )
 
+def load_metadata_for_prompt(path):
+    """Metadata for build_user_payload: the parsed object, or for a large file its JSON text as-is.
+
+    metadata.json is already JSON written by generate_metadata, so a large file is
+    used verbatim rather than materialized as Python objects only to be dumped again.
+    """
+    data = _read_bytes(path)
+    if len(data) > METADATA_INLINE_BYTES:
+        return data.decode("utf-8")
+    return _parse_json(data)
+
+def _metadata_text(metadata):
+    """Metadata as the prompt's compact JSON block; text is passed through unchanged.
+
+    Indentation only adds tokens, so the object is written without whitespace.
+    """
+    if isinstance(metadata, str):
+        return metadata
+    if _HAS_ORJSON:
+        # same bytes as json.dumps(separators=(",", ":")), non-ASCII names kept as UTF-8
+        return orjson.dumps(metadata).decode("utf-8")
+    return json.dumps(metadata, separators=(",", ":"))
+
+def build_user_payload(metadata, user_context):
+    """Per-call part of the prompt. `metadata` is a parsed object or already serialized JSON text."""
     user_payload = (
         "Here is the source metadata to analyze:\n"
-        + json.dumps(metadata, indent=2)
+        + _metadata_text(metadata)
         + "\n\nBusiness context to guide modeling decisions:\n"
         + user_context
         + "\n\nPlease generate the dimensional model strictly following the JSON structure above."
     )
 
-    return system_instructions + "\n\n" + user_payload
+    return user_payload
 
-
-def generate_dimensional_model(metadata_file=None, user_context_file=None, output_json=None):
-    """Main function to generate and save the dimensional model."""
-    if not all([metadata_file, user_context_file, output_json]):
+def build_prompt(metadata, user_context):
+    """
+    Builds a GPT-4o-optimized prompt for creating a 3NF conceptual model
+    and classifying Fact and Dimension tables from transactional metadata.
+    As one string; generate_dimensional_model sends the two parts as separate messages.
+    """
+    return f"{SYSTEM_INSTRUCTIONS}\n\n{build_user_payload(metadata, user_context)}"
+
+
+def _check_conceptual_data(response_data):
+    """Return the reply's conceptual_data, or raise ValueError naming the first part that
+    does not match the OUTPUT FORMAT in SYSTEM_INSTRUCTIONS."""
+    if not isinstance(response_data, dict):
+        raise ValueError("LLM response is not a JSON object.")
+    conceptual_data = response_data.get("conceptual_data")
+    if not conceptual_data:
+        raise ValueError("'conceptual_data' key missing from LLM response.")
+    tables = conceptual_data.get("tables") if isinstance(conceptual_data, dict) else None
+    if not isinstance(tables, list) or not tables:
+        raise ValueError("'conceptual_data.tables' must be a non-empty list.")
+    for i, table in enumerate(tables):
+        if not isinstance(table, dict) or not isinstance(table.get("table_name"), str) or not table["table_name"]:
+            raise ValueError(f"tables[{i}] has no table_name.")
+        if str(table.get("table_type", "")).strip().lower() not in ("fact", "dimension"):
+            raise ValueError(f"tables[{i}] ({table['table_name']}): table_type must be 'Fact' or 'Dimension'.")
+        columns = table.get("columns")
+        if not isinstance(columns, list) or not columns:
+            raise ValueError(f"tables[{i}] ({table['table_name']}): 'columns' must be a non-empty list.")
+        for j, column in enumerate(columns):
+            if not (isinstance(column, dict) and isinstance(column.get("column_name"), str)
+                    and isinstance(column.get("data_type"), str)):
+                raise ValueError(f"tables[{i}].columns[{j}] needs string column_name and data_type.")
+    return conceptual_data
+
+def generate_dimensional_model(metadata_file=None, user_context_file=None, output_json=None, user_context=None):
+    """Main function to generate and save the dimensional model.
+
+    If `user_context` is given it is used as-is and `user_context_file` is not read.
+    """
+    if not all([metadata_file, user_context_file or user_context is not None, output_json]):
         raise ValueError("All file paths (metadata, context, output) must be provided.")
 
     logger.info("🔍 Loading source metadata and user context...")
-    metadata_obj = load_json_file(metadata_file)
-    user_context = load_text_file(user_context_file)
+    metadata_obj = load_metadata_for_prompt(metadata_file)
+    if user_context is None:
+        user_context = load_text_file(user_context_file)
 
     logger.info("✍️ Building prompt for dimensional modeling...")
-    # Pass the Python object directly to build_prompt, which will handle serialization.
-    prompt = build_prompt(metadata_obj, user_context)
+    # build_user_payload serializes a parsed object itself and inlines JSON text unchanged.
+    user_payload = build_user_payload(metadata_obj, user_context)
 
     logger.info("🤖 Calling openai to generate the dimensional model...")
-    result_text = api_call(prompt)
+    result_text = api_call(user_payload, system=SYSTEM_INSTRUCTIONS)
     # Clean the response to get only the JSON
-    if result_text.startswith("```json"):
-        result_text = result_text[7:-3].strip()
+    fenced = _FENCE_RE.match(result_text)
+    if fenced:
+        result_text = fenced.group(1)
 
     try:
-        response_data = json.loads(result_text)
-        conceptual_data = response_data.get("conceptual_data")
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handler below covers both
+        response_data = orjson.loads(result_text) if _HAS_ORJSON else json.loads(result_text)
+        conceptual_data = _check_conceptual_data(response_data)
         reasoning = response_data.get("reasoning")
 
-        if not conceptual_data:
-            logger.error("❌ 'conceptual_data' not found in the openai response.")
-            raise ValueError("'conceptual_data' key missing from LLM response.")
-
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(conceptual_data, f, indent=4)
+        if _HAS_ORJSON:
+            with open(output_json, "wb") as f:
+                f.write(orjson.dumps(conceptual_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(conceptual_data, f, indent=4)
         logger.info(f"✅ Dimensional model saved to: {output_json}")
 
         return reasoning
     except json.JSONDecodeError:
         logger.error("❌ Failed to parse JSON from openai response. Saving raw output for debugging.")
+        evict_cached(user_payload, system=SYSTEM_INSTRUCTIONS)
+        with open(output_json + ".error.txt", "w", encoding="utf-8") as f:
+            f.write(result_text)
+        raise
+    except ValueError as e:
+        logger.error(f"❌ Unexpected dimensional model in the openai response ({e}). Saving raw output for debugging.")
+        evict_cached(user_payload, system=SYSTEM_INSTRUCTIONS)
         with open(output_json + ".error.txt", "w", encoding="utf-8") as f:
             f.write(result_text)
         raise
 
 if __name__ == "__main__":
+    _configure_logging()
     # Note: Before running, ensure 'Run_Space/metadata.json' and 'Run_Space/user_context.txt' exist.
     run_space = os.path.join(BASE_DIR, "Run_Space")
     generate_dimensional_model(
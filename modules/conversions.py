@@ -19,6 +19,25 @@ from markdownify import markdownify as md
 from dotenv import load_dotenv
 import argparse
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
+
+try:
+    # Rust .xls/.xlsx reader behind pandas' engine="calamine" (pandas >= 2.2); optional
+    import python_calamine  # noqa: F401
+    _HAS_CALAMINE = True
+except ImportError:
+    _HAS_CALAMINE = False
 
 # Optional openai client
 try:
@@ -84,18 +103,22 @@ def convert_html_to_csv(url: str, output_dir: str = None) -> List[str]:
         # ---------------- Helper functions ----------------
         def paragraph_chunker(text: str, approx_chars: int = CHUNK_APPROX_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
             paras = [p for p in re.split(r"\n{2,}", text) if p.strip()]
-            chunks, current = [], ""
+            # collect parts and join once per chunk instead of re-concatenating on every paragraph
+            chunks, parts, size = [], [], 0
             for p in paras:
-                if not current:
-                    current = p
-                elif len(current) + 2 + len(p) <= approx_chars:
-                    current = current + "\n\n" + p
+                if not parts:
+                    parts, size = [p], len(p)
+                elif size + 2 + len(p) <= approx_chars:
+                    parts.append(p)
+                    size += 2 + len(p)
                 else:
+                    current = "\n\n".join(parts)
                     chunks.append(current.strip())
                     overlap_text = current[-overlap:] if overlap and len(current) > overlap else current
                     current = (overlap_text + "\n\n" + p).strip()
-            if current:
-                chunks.append(current.strip())
+                    parts, size = [current], len(current)
+            if parts:
+                chunks.append("\n\n".join(parts).strip())
             return chunks
 
         def sanitize_filename(s: str) -> str:
@@ -205,6 +228,67 @@ def convert_html_to_csv(url: str, output_dir: str = None) -> List[str]:
         logging.error(f"Failed to convert HTML to CSV: {e}", exc_info=True)
         raise
 
+@contextmanager
+def _atomic_output(csv_file_path: str):
+    """Yield a temporary path that replaces `csv_file_path` only once fully written.
+
+    An error mid-write never leaves a truncated CSV behind, and converters only delete
+    their source file after the rename.
+    """
+    tmp = f"{csv_file_path}.{os.getpid()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, csv_file_path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _write_dataframe_csv(df: pd.DataFrame, csv_file_path: str) -> None:
+    """df.to_csv(index=False), written atomically.
+
+    Deliberately not pyarrow's CSV writer: it quotes every string and writes datetimes
+    and whole floats differently from to_csv, which changes the converted files.
+    """
+    with _atomic_output(csv_file_path) as tmp:
+        df.to_csv(tmp, index=False, encoding='utf-8')
+
+def _flatten_record(record: Dict[str, Any], prefix: str = ""):
+    """Yield (column, value) pairs of a JSON object, nested objects joined with '.' like pd.json_normalize."""
+    for key, value in record.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten_record(value, column + ".")
+        else:
+            yield column, value
+
+def _write_records_csv(records: List[Dict[str, Any]], csv_file_path: str) -> None:
+    """Write a list of JSON objects as CSV without building a DataFrame.
+
+    A first pass collects the union of flattened columns in first-seen order (records
+    may have different keys, e.g. DynamoDB items); the second streams rows out. When no
+    record has a nested object, rows are read straight from the records, unflattened.
+    """
+    columns = {}
+    nested = False
+    for record in records:
+        if not nested and any(isinstance(v, dict) for v in record.values()):
+            nested = True
+        if nested:
+            for column, _ in _flatten_record(record):
+                columns.setdefault(column, None)
+        else:
+            columns.update(dict.fromkeys(record))
+    fieldnames = list(columns)
+    with _atomic_output(csv_file_path) as tmp, open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        for record in records:
+            row = dict(_flatten_record(record)) if nested else record
+            writer.writerow([row.get(name, '') for name in fieldnames])
+
 def convert_json_to_csv(json_file_path: str) -> str:
     """
     Converts a single JSON file to a CSV file.
@@ -218,18 +302,24 @@ def convert_json_to_csv(json_file_path: str) -> str:
         str: The path to the newly created CSV file.
     """
     try:
-        # Read and flatten the JSON data using pandas' json_normalize
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        df = pd.json_normalize(data)
+        # Read the JSON data; it is flattened below
+        if _HAS_ORJSON:
+            # fetched payloads can be large; orjson parses the raw bytes directly
+            data = orjson.loads(Path(json_file_path).read_bytes())
+        else:
+            with open(json_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
 
         # Create the new CSV file path with the same base name
         base_name = os.path.splitext(json_file_path)[0]
         csv_file_path = base_name + ".csv"
 
-        # Save the DataFrame to a CSV file
-        df.to_csv(csv_file_path, index=False, encoding='utf-8')
+        if isinstance(data, list) and data and all(isinstance(r, dict) for r in data):
+            # the common shape (an array of records) is written row by row
+            _write_records_csv(data, csv_file_path)
+        else:
+            df = pd.json_normalize(data)
+            _write_dataframe_csv(df, csv_file_path)
         logging.info(f"Successfully converted '{os.path.basename(json_file_path)}' to '{os.path.basename(csv_file_path)}'.")
 
         # Remove the original JSON file
@@ -241,6 +331,56 @@ def convert_json_to_csv(json_file_path: str) -> str:
         logging.error(f"Failed to convert JSON file '{json_file_path}': {e}")
         raise
 
+# .xlsx workbooks at least this large are streamed row by row (see _stream_xlsx_to_csv)
+# instead of being loaded into a DataFrame.
+EXCEL_STREAM_BYTES = int(os.getenv("EXCEL_STREAM_BYTES", str(50_000_000)))
+
+def _dedup_header(names: list) -> list:
+    """Rename repeated column names the way pandas' readers do: a, a.1, a.2, ..."""
+    names = list(names)
+    counts = Counter()
+    for i, name in enumerate(names):
+        count = counts[name]
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _stream_xlsx_to_csv(excel_file_path: str, csv_file_path: str) -> None:
+    """Copy the first sheet's rows into a CSV with openpyxl in read-only mode (constant memory)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        with _atomic_output(csv_file_path) as tmp, open(tmp, 'w', newline='', encoding='utf-8') as f:
+            # to_csv's line ending, not the csv module's \r\n
+            writer = csv.writer(f, lineterminator=os.linesep)
+            header = next(rows, None)
+            if header is not None:
+                # same placeholder and duplicate renaming read_excel applies, so the column
+                # names do not depend on whether the workbook was streamed
+                writer.writerow(_dedup_header(f"Unnamed: {i}" if h is None else h for i, h in enumerate(header)))
+            for row in rows:
+                # like read_excel, drop rows with no values
+                if any(v is not None for v in row):
+                    writer.writerow(row)
+    finally:
+        wb.close()
+
+def _read_first_sheet(excel_file_path: str) -> pd.DataFrame:
+    """First sheet of a workbook, with the calamine engine when available."""
+    if _HAS_CALAMINE:
+        try:
+            return pd.read_excel(excel_file_path, sheet_name=0, engine="calamine")
+        except (ImportError, ValueError) as e:
+            # e.g. a pandas release without the calamine engine
+            logging.debug(f"calamine could not read '{excel_file_path}', using the default engine: {e}")
+    return pd.read_excel(excel_file_path, sheet_name=0)
+
 def convert_excel_to_csv(excel_file_path: str) -> str:
     """
     Converts a single Excel file (.xls/.xlsx) to a CSV file.
@@ -249,13 +389,15 @@ def convert_excel_to_csv(excel_file_path: str) -> str:
     Returns the path to the created CSV file.
     """
     try:
-        # Read Excel (first sheet)
-        df = pd.read_excel(excel_file_path, sheet_name=0)
-
         base_name = os.path.splitext(excel_file_path)[0]
         csv_file_path = base_name + ".csv"
 
-        df.to_csv(csv_file_path, index=False, encoding='utf-8')
+        if excel_file_path.lower().endswith('.xlsx') and os.path.getsize(excel_file_path) >= EXCEL_STREAM_BYTES:
+            _stream_xlsx_to_csv(excel_file_path, csv_file_path)
+        else:
+            # Read Excel (first sheet)
+            df = _read_first_sheet(excel_file_path)
+            _write_dataframe_csv(df, csv_file_path)
         logging.info(f"Successfully converted '{os.path.basename(excel_file_path)}' to '{os.path.basename(csv_file_path)}'.")
 
         os.remove(excel_file_path)
@@ -426,6 +568,114 @@ def convert_file_to_csv(file_path: str, csv_path: str = None) -> str:
         logging.error(f"Failed to convert file '{file_path}' to CSV: {e}", exc_info=True)
         raise
 
+# Extensions process_uploaded_files() knows how to turn into CSV.
+# extension -> converter used by process_uploaded_files()
+_CONVERTERS = {
+    '.json': convert_json_to_csv,
+    '.xls': convert_excel_to_csv,
+    '.xlsx': convert_excel_to_csv,
+    '.xml': convert_xml_to_csv,
+    '.pdf': convert_file_to_csv,
+    '.docx': convert_file_to_csv,
+    '.doc': convert_file_to_csv
+}
+CONVERTIBLE_EXTENSIONS = frozenset(_CONVERTERS)
+
+
+def is_convertible(filename: str) -> bool:
+    """True if process_uploaded_files() would convert a file with this name."""
+    return os.path.splitext(filename)[1].lower() in CONVERTIBLE_EXTENSIONS
+
+
+def _iter_files(directory):
+    """Files under `directory`, recursively; scandir entries carry their type, so no extra stat."""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file():
+                yield entry
+
+
+@lru_cache(maxsize=None)
+def _conversion_pool() -> ProcessPoolExecutor:
+    """Worker processes shared by every process_uploaded_files call, started on first use.
+
+    Keeping them alive means later uploads skip process start-up and re-importing
+    pandas / pdfplumber. Never plain fork: the caller is usually a threaded web server.
+    """
+    ctx = multiprocessing.get_context(
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    )
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=ctx)
+
+class _LogCollector(logging.Handler):
+    """Keeps the records a converter logs in a pool worker, made picklable for the trip back."""
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.getMessage(), None, None
+        self.records.append(record)
+
+def _convert_in_worker(converter, filepath, level):
+    """Pool-worker entry point: (csv path or the exception raised, log records emitted meanwhile).
+
+    Worker processes have none of the web app's handlers, so the records travel back with the
+    result and _pool_result logs them on the calling thread, where they reach the task's logs.
+    `level` is the parent's root level, so the worker keeps what the parent would.
+    """
+    root = logging.getLogger()
+    collector = _LogCollector()
+    saved_handlers, root.handlers = root.handlers, [collector]
+    saved_level = root.level
+    root.setLevel(level)
+    try:
+        return converter(filepath), collector.records
+    except Exception as e:
+        return e, collector.records
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+
+def _submit_conversions(jobs):
+    """Submit every (filepath, converter) job to the conversion pool as (filepath, future) pairs.
+
+    A worker that died (e.g. killed for memory) leaves the cached pool broken for good, so a
+    broken pool is dropped and replaced once. Returns [] if no working pool can be had.
+    """
+    for _ in range(2):
+        try:
+            pool = _conversion_pool()
+            level = logging.getLogger().getEffectiveLevel()
+            return [(filepath, pool.submit(_convert_in_worker, converter, str(filepath), level))
+                    for filepath, converter in jobs]
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            logging.warning(f"Conversion pool unusable ({e}); starting a new one.")
+            _conversion_pool.cache_clear()
+    return []
+
+def _pool_result(future):
+    """The converted CSV path of a _convert_in_worker job, replaying the worker's log records here.
+
+    Drops the cached pool if its worker died, so the next call gets a fresh one.
+    """
+    try:
+        result, records = future.result()
+    except BrokenProcessPool:
+        _conversion_pool.cache_clear()
+        raise
+    for record in records:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+    if isinstance(result, Exception):
+        raise result
+    return result
+
 def process_uploaded_files(directory_path: str) -> List[str]:
     """
     Iterates over files in a directory and converts supported file types to CSV.
@@ -439,16 +689,6 @@ def process_uploaded_files(directory_path: str) -> List[str]:
     Returns:
         List[str]: List of paths to the successfully converted CSV files.
     """
-    supported_extensions = {
-        '.json': convert_json_to_csv,
-        '.xls': convert_excel_to_csv,
-        '.xlsx': convert_excel_to_csv,
-        '.xml': convert_xml_to_csv,
-        '.pdf': convert_file_to_csv,
-        '.docx': convert_file_to_csv,
-        '.doc': convert_file_to_csv
-    }
-
     converted_files = []
     directory_path = Path(directory_path)
 
@@ -458,50 +698,43 @@ def process_uploaded_files(directory_path: str) -> List[str]:
 
     logging.info(f"🚀 Starting file conversion in: {directory_path}")
 
-    for root, _, files in os.walk(directory_path):
-        for filename in files:
-            filepath = Path(root) / filename
-            ext = filepath.suffix.lower()
-
-            converter = supported_extensions.get(ext)
-            if not converter:
-                logging.debug(f"Skipping unsupported file type: {filename}")
-                continue
-
-            try:
-                logging.info(f"Processing file: {filename}")
-                csv_path = converter(str(filepath))
-                converted_files.append(csv_path)
-                logging.info(f"✅ Converted {filename} → {Path(csv_path).name}")
-            except Exception as e:
-                logging.error(f"❌ Failed to convert {filename}: {e}", exc_info=True)
-                # continue to next file
+    jobs = []
+    for entry in _iter_files(directory_path):
+        converter = _CONVERTERS.get(os.path.splitext(entry.name)[1].lower())
+        if not converter:
+            logging.debug(f"Skipping unsupported file type: {entry.name}")
+            continue
+        logging.info(f"Processing file: {entry.name}")
+        jobs.append((Path(entry.path), converter))
+
+    def _record(filepath, run):
+        try:
+            csv_path = run()
+            converted_files.append(csv_path)
+            logging.info(f"✅ Converted {filepath.name} → {Path(csv_path).name}")
+        except Exception as e:
+            logging.error(f"❌ Failed to convert {filepath.name}: {e}", exc_info=True)
+            # continue to next file
+
+    if len(jobs) > 1:
+        # Conversions are CPU-bound (pandas / pdfplumber) and independent, so spread them over
+        # worker processes. Results are collected in submission order so the CSV list (and the
+        # metadata built from it) does not depend on which file finished first.
+        futures = _submit_conversions(jobs)
+        for filepath, future in futures:
+            # a crashed worker fails only the files it had in flight; _record logs them
+            _record(filepath, partial(_pool_result, future))
+        if not futures:
+            logging.warning("No conversion pool available; converting in-process.")
+            for filepath, converter in jobs:
+                _record(filepath, partial(converter, str(filepath)))
+    else:
+        for filepath, converter in jobs:
+            _record(filepath, partial(converter, str(filepath)))
 
     logging.info(f"🏁 Conversion completed. Total converted files: {len(converted_files)}")
     return converted_files
 
-    """
-    Iterates over files in a directory and converts any JSON files to CSV.
-    """
-    converted = []
-    for root, _, files in os.walk(directory_path):
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            lower = filename.lower()
-            try:
-                if lower.endswith('.json'):
-                    csvp = convert_json_to_csv(filepath)
-                    converted.append(csvp)
-                elif lower.endswith('.xls') or lower.endswith('.xlsx'):
-                    csvp = convert_excel_to_csv(filepath)
-                    converted.append(csvp)
-            except Exception:
-                # continue converting other files even if one fails
-                logging.exception(f"Conversion failed for {filepath}")
-
-    logging.info(f"File conversion process completed for directory: {directory_path}. Converted {len(converted)} files.")
-    return converted
-
 
 def _cli_main():
     """Simple CLI entrypoint to test convert_html_to_csv manually.
@@ -1,9 +1,18 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from pymongo import MongoClient
 import argparse
 import os
 import uuid
 import decimal
+import json
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
 
 
 def _convert_decimals(obj):
@@ -22,7 +31,8 @@ def _convert_decimals(obj):
             return float(obj)
     return obj
 
-def fetch_from_dynamodb(access_key, secret_key, region, table_name):
+def iter_dynamodb_items(access_key, secret_key, region, table_name):
+    """Yield every item of a DynamoDB table, one scan page (<= 1MB) in memory at a time."""
     session = boto3.Session(
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
@@ -31,25 +41,37 @@ def fetch_from_dynamodb(access_key, secret_key, region, table_name):
     dynamodb = session.resource('dynamodb')
     table = dynamodb.Table(table_name)
     # Use pagination to retrieve the entire table (scan can be limited to 1MB per call)
-    items = []
-    try:
-        response = table.scan()
-        items.extend(response.get('Items', []))
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
-    except Exception as e:
-        # Re-raise so callers can handle HTTP responses
-        raise
+    response = table.scan()
+    while True:
+        # Convert Decimal instances to native Python numbers for JSON serialization
+        for item in response.get('Items', []):
+            yield _convert_decimals(item)
+        if 'LastEvaluatedKey' not in response:
+            break
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
 
-    # Convert Decimal instances to native Python numbers for JSON serialization
-    return _convert_decimals(items)
+def fetch_from_dynamodb(access_key, secret_key, region, table_name):
+    return list(iter_dynamodb_items(access_key, secret_key, region, table_name))
 
-def fetch_from_cosmosdb(uri, db_name, collection_name):
+def iter_cosmosdb_docs(uri, db_name, collection_name):
+    """Yield every document of a Cosmos (Mongo API) collection as the cursor fetches batches."""
     client = MongoClient(uri)
-    db = client[db_name]
-    collection = db[collection_name]
-    return list(collection.find())
+    try:
+        yield from client[db_name][collection_name].find()
+    finally:
+        client.close()
+
+def fetch_from_cosmosdb(uri, db_name, collection_name):
+    return list(iter_cosmosdb_docs(uri, db_name, collection_name))
+
+# Objects above the threshold are downloaded as parallel ranged GETs
+_S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
 
 def fetch_from_s3(access_key, secret_key, region, bucket_name, object_key, local_filename):
     session = boto3.Session(
@@ -58,12 +80,29 @@ def fetch_from_s3(access_key, secret_key, region, bucket_name, object_key, local
         region_name=region
     )
     s3 = session.client('s3')
-    s3.download_file(bucket_name, object_key, local_filename)
+    s3.download_file(bucket_name, object_key, local_filename, Config=_S3_TRANSFER_CONFIG)
     return local_filename
 
 
-def _write_json_safe(obj, path):
-    import json
+def write_json_file(obj, path):
+    """
+    Write fetched records to `path` as indented JSON.
+    Uses orjson (C encoder, bytes straight to disk) when installed; non-JSON types
+    such as Mongo ObjectIds or Decimals are stringified.
+    """
+    if _HAS_ORJSON:
+        try:
+            data = orjson.dumps(
+                obj,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+            with open(path, 'wb') as f:
+                f.write(data)
+            return
+        except TypeError:
+            # e.g. integers wider than 64 bits; let the stdlib encoder handle it
+            pass
     try:
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(obj, f, indent=2, ensure_ascii=False, default=str)
@@ -79,6 +118,35 @@ def _write_json_safe(obj, path):
             json.dump(safe, f, indent=2, ensure_ascii=False)
 
 
+def write_json_records(records, path):
+    """
+    Stream an iterable of records to `path` as a JSON array, one record per line,
+    so only the record being encoded is held in memory. Returns the record count.
+    Non-JSON types such as Mongo ObjectIds are stringified, as in write_json_file.
+    """
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b'[')
+        for record in records:
+            if _HAS_ORJSON:
+                try:
+                    data = orjson.dumps(
+                        record,
+                        default=str,
+                        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                    )
+                except TypeError:
+                    # e.g. integers wider than 64 bits; let the stdlib encoder handle it
+                    data = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')
+            else:
+                data = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')
+            f.write(b'\n' if count == 0 else b',\n')
+            f.write(data)
+            count += 1
+        f.write(b'\n]\n')
+    return count
+
+
 def main():
     """Simple CLI for testing fetch helpers. Writes results to Run_Space/test_fetch/"""
     
@@ -117,7 +185,7 @@ def main():
             print(f"[TEST] Fetching DynamoDB table {args.table} (region={args.region})")
             items = fetch_from_dynamodb(args.access_key, args.secret_key, args.region, args.table)
             out = os.path.join(base, f"{args.table}.json")
-            _write_json_safe(items, out)
+            write_json_file(items, out)
             print(f"Wrote {len(items) if items is not None else 0} items to {out}")
 
         elif args.cmd == 's3':
@@ -130,7 +198,7 @@ def main():
             print(f"[TEST] Fetching CosmosDB {args.db}/{args.collection}")
             docs = fetch_from_cosmosdb(args.uri, args.db, args.collection)
             out = os.path.join(base, f"{args.db}__{args.collection}.json")
-            _write_json_safe(docs, out)
+            write_json_file(docs, out)
             print(f"Wrote {len(docs) if docs is not None else 0} documents to {out}")
 
     except Exception as e:
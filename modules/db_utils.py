@@ -8,32 +8,31 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path='../.env')
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Check if environment variables are loaded correctly
-from dotenv import load_dotenv
-import os
-import mysql.connector
-import logging
+# Connection settings are read once at import instead of re-parsing .env on every call
+_DB_HOST = os.getenv("DB_HOST")
+_DB_PORT = os.getenv("DB_PORT")
+_DB_USER = os.getenv("DB_USER")
+_DB_PASS = os.getenv("DB_PASS")
+_DB_NAME = os.getenv("DB_NAME")
 
 def get_db_connection():
     """
     Establishes and returns a database connection.
     """
-    load_dotenv(dotenv_path='../.env')  # Load the environment variables from the .env file
-    
     # Log the values to check if they are loaded
-    print("DB_HOST:", os.getenv("DB_HOST"))
-    print("DB_USER:", os.getenv("DB_USER"))
-    print("DB_PASS:", os.getenv("DB_PASS"))
-    print("DB_NAME:", os.getenv("DB_NAME"))
-    print("DB_PORT:", os.getenv("DB_PORT"))
+    print("DB_HOST:", _DB_HOST)
+    print("DB_USER:", _DB_USER)
+    print("DB_PASS:", _DB_PASS)
+    print("DB_NAME:", _DB_NAME)
+    print("DB_PORT:", _DB_PORT)
 
     try:
         conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASS"),
-            port=int(os.getenv("DB_PORT", 3306))  # Ensure DB_PORT is an integer
+            host=_DB_HOST,
+            database=_DB_NAME,
+            user=_DB_USER,
+            password=_DB_PASS,
+            port=int(_DB_PORT or 3306)  # Ensure DB_PORT is an integer
         )
         if conn.is_connected():
             logging.info("Successfully connected to the database.")
@@ -44,18 +43,24 @@ def get_db_connection():
         logging.error(f"Error while connecting to MySQL: {e}")
         raise
 
-def execute_with_retry(conn, sql_query, params=None, retries=3, initial_delay=0.1):
+def execute_with_retry(conn, sql_query, params=None, retries=3, initial_delay=0.1, cursor=None):
     """
     Executes a given SQL query with retry mechanism on failure.
     Retries the execution in case of errors like deadlocks or connection issues.
+    Pass a long-lived `cursor` (e.g. conn.cursor(prepared=True) for a statement that is
+    executed many times with different params) to avoid opening a cursor per call;
+    the caller owns and closes it.
     """
-    load_dotenv(dotenv_path='../.env')
     delay = initial_delay
     for i in range(retries):
         try:
-            with conn.cursor() as cur:
-                cur.execute(sql_query, params)
-                conn.commit()  # Make sure changes are committed
+            if cursor is not None:
+                cursor.execute(sql_query, params)
+                conn.commit()
+            else:
+                with conn.cursor() as cur:
+                    cur.execute(sql_query, params)
+                    conn.commit()  # Make sure changes are committed
             return
         except (Error) as e:
             conn.rollback()
@@ -74,43 +79,42 @@ def create_and_populate_table(conn, table_name, table_schema, data_to_insert=Non
     Creates and populates a table with data.
     Drops the table if it exists, creates a new one, and inserts the provided data.
     """
-    load_dotenv(dotenv_path='../.env')
-    drop_table_sql = f"DROP TABLE IF EXISTS {table_name};"
-    execute_with_retry(conn, drop_table_sql)
-    logging.info(f"Dropped table {table_name}.")
+    # one cursor for DROP, CREATE and every insert batch
+    with conn.cursor() as cur:
+        drop_table_sql = f"DROP TABLE IF EXISTS {table_name};"
+        execute_with_retry(conn, drop_table_sql, cursor=cur)
+        logging.info(f"Dropped table {table_name}.")
 
-    create_table_sql = table_schema["ddl"]
-    execute_with_retry(conn, create_table_sql)
-    logging.info(f"Created table {table_name}.")
+        create_table_sql = table_schema["ddl"]
+        execute_with_retry(conn, create_table_sql, cursor=cur)
+        logging.info(f"Created table {table_name}.")
+
+        if not data_to_insert:
+            return []
 
-    if data_to_insert:
         columns = table_schema["columns"]
         insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
-        
-        if returning_col:
-            # MySQL doesn't support RETURNING like PostgreSQL; handle this differently.
-            insert_sql += f" RETURNING {returning_col}"
 
         batch_size = 1000
         total_inserted = 0
         returned_ids = []
 
-        with conn.cursor() as cur:
-            for i in range(0, len(data_to_insert), batch_size):
-                batch = data_to_insert[i:i + batch_size]
-                if not batch:
-                    continue
-
-                cur.executemany(insert_sql, batch)
-                if returning_col:
-                    cur.execute(insert_sql, batch)
-                    returned_ids.extend([row[0] for row in cur.fetchall()])
-                else:
-                    conn.commit()  # Commit the batch insertion
-
-                total_inserted += len(batch)
-                logging.info(f"Inserted {total_inserted}/{len(data_to_insert)} rows into {table_name}.")
-        
+        for i in range(0, len(data_to_insert), batch_size):
+            batch = data_to_insert[i:i + batch_size]
+            if not batch:
+                continue
+
+            cur.executemany(insert_sql, batch)
+            if returning_col:
+                # MySQL has no RETURNING; executemany sends the batch as one multi-row
+                # INSERT, so LAST_INSERT_ID() is the first AUTO_INCREMENT id of the batch.
+                first_id = cur.lastrowid
+                if first_id:
+                    returned_ids.extend(range(first_id, first_id + cur.rowcount))
+            conn.commit()  # Commit the batch insertion
+
+            total_inserted += len(batch)
+            logging.info(f"Inserted {total_inserted}/{len(data_to_insert)} rows into {table_name}.")
+
         return returned_ids
-    return []
 
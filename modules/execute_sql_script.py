@@ -9,6 +9,7 @@ load_dotenv()
 
 # Use the get_db_connection from the shared db_utils module (attempted first)
 from db_utils import get_db_connection
+from .sql_Parser import split_sql_statements
 
 import mysql.connector
 from mysql.connector import Error
@@ -84,7 +85,9 @@ def execute_sql_from_file(filepath: str, max_retries: int = 1):
         logging.error(traceback.format_exc())
         return
 
-    sql_commands = [cmd.strip() for cmd in sql_full_script.split(';') if cmd.strip()]
+    # quote-aware split so ';' inside string literals does not break a statement
+    sql_commands = [cmd.rstrip(';').strip() for cmd in split_sql_statements(sql_full_script)]
+    sql_commands = [cmd for cmd in sql_commands if cmd]
     conn = None
     cursor = None
 
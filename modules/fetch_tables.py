@@ -4,7 +4,7 @@ import re
 import datetime
 import decimal
 from typing import Optional, Any, Dict, List
-from db_utils import get_db_connection
+from db_utils import get_pooled_connection
 from mysql.connector import Error
  
 SAFE_NAME_RE = re.compile(r"^[A-Za-z0-9_]+$")
@@ -19,6 +19,9 @@ def _serialize_value(v):
         return v.isoformat()
     if isinstance(v, decimal.Decimal):
         return float(v)
+    if isinstance(v, (bytes, bytearray)):
+        # prepared (binary protocol) cursors may hand text columns back as bytes
+        return v.decode("utf-8", errors="replace")
     return str(v)
  
 def _safe_table_name(name: str) -> str:
@@ -26,6 +29,24 @@ def _safe_table_name(name: str) -> str:
         raise ValueError(f"Unsafe table name: {name!r}")
     return name
  
+def _count_table_rows(cursor, tables: List[str]) -> Dict[str, Optional[int]]:
+    """Row counts for `tables` in one UNION ALL round-trip; per-table queries if that fails."""
+    if not tables:
+        return {}
+    sql = " UNION ALL ".join(f"SELECT %s AS tbl, COUNT(*) AS cnt FROM `{t}`" for t in tables)
+    try:
+        cursor.execute(sql, tuple(tables))
+        return {r["tbl"]: r["cnt"] for r in cursor.fetchall()}
+    except Exception:
+        counts: Dict[str, Optional[int]] = {}
+        for t in tables:
+            try:
+                cursor.execute(f"SELECT COUNT(*) AS cnt FROM `{t}`;")
+                counts[t] = cursor.fetchone()["cnt"]
+            except Exception:
+                counts[t] = None
+        return counts
+ 
 def _count_csv_rows(path: str, has_header: bool = True) -> int:
     """Count non-empty CSV rows. Skip first row if has_header=True."""
     count = 0
@@ -57,6 +78,7 @@ def fetch_tables_with_insert_stats(task_id: str,
     result: Dict[str, Dict[str, Any]] = {}
     close_conn = False
     cursor = None
+    prep_cursor = None
  
     # Prepare runspace folder
     task_dir = os.path.join(runspace_base, task_id)
@@ -64,7 +86,8 @@ def fetch_tables_with_insert_stats(task_id: str,
         return {"_error": f"Run folder not found: {task_dir}"}
  
     # Count CSV rows
-    csv_files = [f for f in os.listdir(task_dir) if f.lower().endswith(".csv")]
+    with os.scandir(task_dir) as it:
+        csv_files = [e.name for e in it if e.name.lower().endswith(".csv") and e.is_file()]
     insert_info: Dict[str, Dict[str, Optional[int]]] = {}
     for f in csv_files:
         table = os.path.splitext(f)[0]
@@ -78,13 +101,23 @@ def fetch_tables_with_insert_stats(task_id: str,
     try:
         # Connect to DB if not provided
         if conn is None:
-            conn = get_db_connection()
+            conn = get_pooled_connection()
             close_conn = True
         cursor = conn.cursor(dictionary=True)
+        # Server-side prepared statements for the table listing and the per-table
+        # previews: the LIMIT is bound rather than re-parsed for every table
+        prep_cursor = conn.cursor(prepared=True)
  
         # Get all tables
-        cursor.execute("SHOW TABLES;")
-        db_tables = [list(r.values())[0] for r in cursor.fetchall()]
+        prep_cursor.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() ORDER BY table_name"
+        )
+        db_tables = [_serialize_value(r[0]) for r in prep_cursor.fetchall()]
+        safe_tables = [t for t in db_tables if SAFE_NAME_RE.match(t)]
+ 
+        # All row counts in a single round-trip instead of one COUNT(*) per table
+        db_counts = _count_table_rows(cursor, safe_tables)
  
         for tbl in db_tables:
             table_entry: Dict[str, Any] = {}
@@ -92,10 +125,10 @@ def fetch_tables_with_insert_stats(task_id: str,
             # --- Table Preview ---
             try:
                 table_name = _safe_table_name(tbl)
-                cursor.execute(f"SELECT * FROM `{table_name}` LIMIT %s;", (preview_limit,))
-                rows = cursor.fetchall()
-                columns = list(rows[0].keys()) if rows else [desc[0] for desc in cursor.description]
-                serialized_rows = [[_serialize_value(r.get(c)) for c in columns] for r in rows]
+                prep_cursor.execute(f"SELECT * FROM `{table_name}` LIMIT %s", (int(preview_limit),))
+                rows = prep_cursor.fetchall()
+                columns = list(prep_cursor.column_names)
+                serialized_rows = [[_serialize_value(v) for v in r] for r in rows]
                 table_entry["preview"] = {
                     "columns": columns,
                     "rows": serialized_rows,
@@ -106,11 +139,7 @@ def fetch_tables_with_insert_stats(task_id: str,
  
             # --- Insert Stats ---
             csv_count = insert_info.get(tbl, {}).get("csv_rows")
-            try:
-                cursor.execute(f"SELECT COUNT(*) AS cnt FROM `{table_name}`;")
-                db_count = cursor.fetchone()["cnt"]
-            except Exception:
-                db_count = None
+            db_count = db_counts.get(tbl)
  
             if csv_count is None:
                 inserted_summary = "CSV missing/unreadable"
@@ -129,6 +158,8 @@ def fetch_tables_with_insert_stats(task_id: str,
             result[tbl] = table_entry
  
     finally:
+        if prep_cursor:
+            prep_cursor.close()
         if cursor:
             cursor.close()
         if close_conn and conn:
@@ -61,7 +61,6 @@ def write_text_safely(output_path: str, content: str) -> str:
     except Exception as e:
         logging.debug(f"[WRITE] chmod failed for {output_path}: {e}")
 
-    time.sleep(0.05)
     logging.info(f"[WRITE] Successfully wrote file to {output_path}")
     return output_path
 
@@ -91,7 +90,8 @@ def table_converter(files_path, plantUML_path, metadata_path, output_path, max_e
     os.makedirs(output_path, exist_ok=True)
 
     # collect CSV filenames
-    csv_files = sorted([f for f in os.listdir(files_path) if f.lower().endswith('.csv')])
+    with os.scandir(files_path) as it:
+        csv_files = sorted(e.name for e in it if e.name.lower().endswith('.csv') and e.is_file())
 
     # read raw PlantUML text (minimal processing — just load)
     plantuml_text = None
@@ -181,7 +181,9 @@ Important guidance for the LLM:
 
     # Call the api to generate the script
     try:
-        llm_response = api_call(prompt)
+        # uncached: the script is only checked once it has run (see flask_app._step_execute_insert),
+        # by when the split CSVs it wrote have changed this prompt, so a bad reply could not be evicted
+        llm_response = api_call(prompt, use_cache=False)
         # strip wrapping triple backticks or ```python fences if present
         if isinstance(llm_response, str):
             llm_response = re.sub(r'^\s*```(?:python)?\s*', '', llm_response, flags=re.IGNORECASE)
@@ -27,6 +27,7 @@ import traceback
 import re
 from typing import List, Tuple, Set, Dict, Any, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import mysql.connector
@@ -37,6 +38,9 @@ from db_utils import get_db_connection
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Number of CSVs parsed ahead of the (serial) insert loop.
+READ_AHEAD_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
 # -------------------------
 # Schema helpers
 # -------------------------
@@ -260,12 +264,12 @@ def find_schema_file(default_dir: str) -> Optional[str]:
 
     candidates = []
     # search one level deep for create_schema.sql
-    for entry in sorted(os.listdir(default_dir)):
-        p = os.path.join(default_dir, entry)
-        if os.path.isdir(p):
-            candidate = os.path.join(p, "create_schema.sql")
-            if os.path.isfile(candidate):
-                candidates.append(candidate)
+    with os.scandir(default_dir) as it:
+        subdirs = sorted(e.path for e in it if e.is_dir())
+    for p in subdirs:
+        candidate = os.path.join(p, "create_schema.sql")
+        if os.path.isfile(candidate):
+            candidates.append(candidate)
     # also check the directory itself for create_schema.sql
     top_level = os.path.join(default_dir, "create_schema.sql")
     if os.path.isfile(top_level):
@@ -279,35 +283,55 @@ def find_schema_file(default_dir: str) -> Optional[str]:
     candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
     return os.path.abspath(candidates[0])
 
+_CREATE_TABLE_RE = re.compile(
+    r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?([A-Za-z0-9_]+)`?\s*\(',
+    re.IGNORECASE
+)
+
+# abspath -> (st_mtime_ns, st_size, table_order); reused while the file is unchanged
+_SCHEMA_CACHE: Dict[str, Tuple[int, int, List[str]]] = {}
+
 def parse_create_schema(schema_path: str) -> List[str]:
     """
     Parse the create_schema.sql and return a list of table names in the order of CREATE TABLE statements.
     This is intentionally simple and robust for common MySQL CREATE TABLE lines.
+    Results are memoized per file and invalidated when its mtime/size changes.
     """
     if not schema_path or not os.path.isfile(schema_path):
         return []
-    create_re = re.compile(
-        r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?([A-Za-z0-9_]+)`?\s*\(',
-        re.IGNORECASE
-    )
+    key = os.path.abspath(schema_path)
+    try:
+        st = os.stat(key)
+    except OSError:
+        return []
+    cached = _SCHEMA_CACHE.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return list(cached[2])
+
     table_order = []
     try:
-        with open(schema_path, "r", encoding="utf-8") as f:
+        with open(key, "r", encoding="utf-8") as f:
             for line in f:
                 # strip single-line comments and leading spaces
                 s = line.strip()
                 # skip lines that begin with DROP TABLE ... CASCADE; or comments
-                m = create_re.search(s)
+                m = _CREATE_TABLE_RE.search(s)
                 if m:
                     name = m.group(1)
                     table_order.append(name)
     except Exception:
         logging.debug("Failed to parse schema file %s: %s", schema_path, traceback.format_exc())
-    return table_order
+        return table_order
+    _SCHEMA_CACHE[key] = (st.st_mtime_ns, st.st_size, table_order)
+    return list(table_order)
 
 # -------------------------
 # CSV loading core
 # -------------------------
+def _read_csv_frame(csv_path: str) -> pd.DataFrame:
+    """Read a CSV as strings; runs on the read-ahead pool."""
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=True, na_values=["", "NA", "N/A", "nan", "NaN"])
+
 def _resolve_directory_arg(directory: str) -> str:
     """
     Resolve directory arg robustly: absolute, cwd-relative, project-root-relative.
@@ -351,7 +375,8 @@ def load_csvs_into_db(directory: str,
     logging.info("Resolved target directory: %s", directory)
 
     # discover CSV files
-    csv_files = sorted([f for f in os.listdir(directory) if f.lower().endswith(".csv")])
+    with os.scandir(directory) as it:
+        csv_files = sorted(e.name for e in it if e.name.lower().endswith(".csv") and e.is_file())
     if not csv_files:
         logging.warning("No CSV files found in %s", directory)
         return {}
@@ -434,113 +459,155 @@ def load_csvs_into_db(directory: str,
     except Exception:
         logging.debug("FK checks block error ignored.")
 
-    for csv_file in ordered_files:
-        csv_path = os.path.join(directory, csv_file)
-        table_name = os.path.splitext(csv_file)[0]
-        logging.info("Processing file '%s' -> table '%s'", csv_file, table_name)
-        summary_entry = {"inserted": 0, "skipped": 0, "error": None}
-        skipped_rows_details = []
+    # Parse upcoming CSVs on worker threads (pandas' C parser releases the GIL) while
+    # this thread owns the connection and inserts tables one by one in schema order.
+    read_workers = min(READ_AHEAD_WORKERS, len(ordered_files))
+    reader = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="csv-read")
+    # keyed by position in ordered_files, which can list a file more than once
+    pending_reads = {}
+    next_read = 0
 
-        # read csv into dataframe (all as string first)
-        try:
-            df = pd.read_csv(csv_path, dtype=str, keep_default_na=True, na_values=["", "NA", "N/A", "nan", "NaN"])
-            logging.info("Read CSV '%s' shape=%s", csv_file, df.shape)
-        except pd.errors.EmptyDataError:
-            logging.warning("CSV is empty: %s. Skipping.", csv_file)
-            summary[csv_file] = summary_entry
-            continue
-        except Exception as e:
-            logging.exception("Failed to read CSV '%s': %s", csv_file, e)
-            summary_entry["error"] = f"read_error: {e}"
-            summary[csv_file] = summary_entry
-            continue
+    try:
+        for pos, csv_file in enumerate(ordered_files):
+            # keep at most read_workers + 1 frames in flight
+            while next_read < len(ordered_files) and next_read <= pos + read_workers:
+                name = ordered_files[next_read]
+                pending_reads[next_read] = reader.submit(_read_csv_frame, os.path.join(directory, name))
+                next_read += 1
+            csv_path = os.path.join(directory, csv_file)
+            table_name = os.path.splitext(csv_file)[0]
+            logging.info("Processing file '%s' -> table '%s'", csv_file, table_name)
+            summary_entry = {"inserted": 0, "skipped": 0, "error": None}
+            skipped_rows_details = []
+
+            # read csv into dataframe (all as string first)
+            try:
+                df = pending_reads.pop(pos).result()
+                logging.info("Read CSV '%s' shape=%s", csv_file, df.shape)
+            except pd.errors.EmptyDataError:
+                logging.warning("CSV is empty: %s. Skipping.", csv_file)
+                summary[csv_file] = summary_entry
+                continue
+            except Exception as e:
+                logging.exception("Failed to read CSV '%s': %s", csv_file, e)
+                summary_entry["error"] = f"read_error: {e}"
+                summary[csv_file] = summary_entry
+                continue
 
-        # normalize column names
-        df.columns = [c.strip() for c in df.columns]
+            # normalize column names
+            df.columns = [c.strip() for c in df.columns]
 
-        # fetch table schema
-        try:
-            table_columns, non_nullable_cols, type_map = get_table_columns_info(cursor, table_name)
-            if not table_columns:
-                msg = f"No columns found for table '{table_name}'."
-                logging.warning(msg)
-                if skip_missing_table:
-                    summary_entry["error"] = msg
-                    summary[csv_file] = summary_entry
-                    continue
+            # fetch table schema
+            try:
+                table_columns, non_nullable_cols, type_map = get_table_columns_info(cursor, table_name)
+                if not table_columns:
+                    msg = f"No columns found for table '{table_name}'."
+                    logging.warning(msg)
+                    if skip_missing_table:
+                        summary_entry["error"] = msg
+                        summary[csv_file] = summary_entry
+                        continue
+                    else:
+                        # fallback: assume CSV columns are target
+                        table_columns = list(df.columns)
+                        non_nullable_cols = set()
+                        type_map = {c: "" for c in table_columns}
+                        logging.info("Fallback to CSV columns for table '%s': %s", table_name, table_columns)
                 else:
-                    # fallback: assume CSV columns are target
-                    table_columns = list(df.columns)
-                    non_nullable_cols = set()
-                    type_map = {c: "" for c in table_columns}
-                    logging.info("Fallback to CSV columns for table '%s': %s", table_name, table_columns)
-            else:
-                logging.info("Table '%s' columns: %s", table_name, table_columns)
-                if non_nullable_cols:
-                    logging.info("Non-nullable columns for '%s': %s", table_name, sorted(list(non_nullable_cols)))
-        except Exception as e:
-            logging.exception("Failed to fetch columns for table '%s': %s", table_name, e)
-            summary_entry["error"] = f"schema_fetch_error: {e}"
-            summary[csv_file] = summary_entry
-            continue
+                    logging.info("Table '%s' columns: %s", table_name, table_columns)
+                    if non_nullable_cols:
+                        logging.info("Non-nullable columns for '%s': %s", table_name, sorted(list(non_nullable_cols)))
+            except Exception as e:
+                logging.exception("Failed to fetch columns for table '%s': %s", table_name, e)
+                summary_entry["error"] = f"schema_fetch_error: {e}"
+                summary[csv_file] = summary_entry
+                continue
 
-        # primary keys for dedupe
-        try:
-            pk_cols = get_table_primary_key_columns(cursor, table_name)
-            logging.debug("Primary key columns for %s: %s", table_name, pk_cols)
-        except Exception:
-            pk_cols = []
-
-        # align CSV columns to table columns and prepare rows (tuples)
-        rows_to_insert: List[Tuple[Any, ...]] = []
-        skipped_count = 0
-
-        for idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
-            row_map = dict(zip(df.columns, row))
-            row_vals = []
-            violated = []
-            for col in table_columns:
-                if col in df.columns:
-                    v = row_map.get(col)
-                    # treat pandas NA's
-                    if pd.isna(v):
-                        val = None
+            # primary keys for dedupe
+            try:
+                pk_cols = get_table_primary_key_columns(cursor, table_name)
+                logging.debug("Primary key columns for %s: %s", table_name, pk_cols)
+            except Exception:
+                pk_cols = []
+
+            # align CSV columns to table columns and prepare rows (tuples)
+            rows_to_insert: List[Tuple[Any, ...]] = []
+            skipped_count = 0
+
+            for idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+                row_map = dict(zip(df.columns, row))
+                row_vals = []
+                violated = []
+                for col in table_columns:
+                    if col in df.columns:
+                        v = row_map.get(col)
+                        # treat pandas NA's
+                        if pd.isna(v):
+                            val = None
+                        else:
+                            val = v
+                            # strip strings
+                            if isinstance(val, str):
+                                val = val.strip()
+                                if val == "":
+                                    val = None
+                        # if missing and fill_defaults requested and non-nullable -> fill
+                        if val is None and fill_defaults and col in non_nullable_cols:
+                            val = default_for_column(col, type_map.get(col, ""))
                     else:
-                        val = v
-                        # strip strings
-                        if isinstance(val, str):
-                            val = val.strip()
-                            if val == "":
-                                val = None
-                    # if missing and fill_defaults requested and non-nullable -> fill
-                    if val is None and fill_defaults and col in non_nullable_cols:
-                        val = default_for_column(col, type_map.get(col, ""))
-                else:
-                    # column not present in CSV
-                    val = None
-                    if fill_defaults and col in non_nullable_cols:
-                        val = default_for_column(col, type_map.get(col, ""))
-
-                if val is None and col in non_nullable_cols:
-                    violated.append(col)
-                row_vals.append(val)
-
-            if violated:
-                skipped_count += 1
-                preview = {c: (row_map.get(c) if c in row_map else None) for c in table_columns[:6]}
-                logging.warning("Skipping row #%s from file '%s' because non-nullable columns would be NULL: %s. Preview: %s",
-                                idx, csv_file, violated, preview)
-                skipped_rows_details.append({"row_index": idx, "violated": violated, "preview": preview})
+                        # column not present in CSV
+                        val = None
+                        if fill_defaults and col in non_nullable_cols:
+                            val = default_for_column(col, type_map.get(col, ""))
+
+                    if val is None and col in non_nullable_cols:
+                        violated.append(col)
+                    row_vals.append(val)
+
+                if violated:
+                    skipped_count += 1
+                    preview = {c: (row_map.get(c) if c in row_map else None) for c in table_columns[:6]}
+                    logging.warning("Skipping row #%s from file '%s' because non-nullable columns would be NULL: %s. Preview: %s",
+                                    idx, csv_file, violated, preview)
+                    skipped_rows_details.append({"row_index": idx, "violated": violated, "preview": preview})
+                    continue
+
+                rows_to_insert.append(tuple(row_vals))
+
+            # if nothing to insert, continue
+            if not rows_to_insert:
+                logging.info("No rows to insert for %s (all skipped or empty). Skipped_count=%s", csv_file, skipped_count)
+                summary_entry["inserted"] = 0
+                summary_entry["skipped"] = skipped_count
+                # write skipped rows file if any
+                if skipped_rows_details:
+                    skipped_path = os.path.join(directory, f"{csv_file}.skipped.csv")
+                    try:
+                        pd.DataFrame(skipped_rows_details).to_csv(skipped_path, index=False)
+                        logging.info("Wrote skipped-row details to %s", skipped_path)
+                    except Exception:
+                        logging.debug("Failed to write skipped rows: %s", traceback.format_exc())
+                summary[csv_file] = summary_entry
                 continue
 
-            rows_to_insert.append(tuple(row_vals))
+            # call insert_rows
+            insert_result = insert_rows(conn, cursor, table_name, table_columns, rows_to_insert,
+                                        pk_cols=pk_cols, col_type_map=type_map, batch_size=batch_size)
+            # insert_result contains inserted/skipped/error
+            inserted = insert_result.get("inserted", 0)
+            inserted_skipped = insert_result.get("skipped", 0)
+            err = insert_result.get("error")
+
+            total_skipped = skipped_count + inserted_skipped
 
-        # if nothing to insert, continue
-        if not rows_to_insert:
-            logging.info("No rows to insert for %s (all skipped or empty). Skipped_count=%s", csv_file, skipped_count)
-            summary_entry["inserted"] = 0
-            summary_entry["skipped"] = skipped_count
-            # write skipped rows file if any
+            logging.info("Inserted %d rows into table '%s'. Skipped %d rows (non-nullable or integrity failures).",
+                         inserted, table_name, total_skipped)
+
+            summary_entry["inserted"] = inserted
+            summary_entry["skipped"] = total_skipped
+            summary_entry["error"] = err
+
+            # write skipped rows details file if any
             if skipped_rows_details:
                 skipped_path = os.path.join(directory, f"{csv_file}.skipped.csv")
                 try:
@@ -548,36 +615,11 @@ def load_csvs_into_db(directory: str,
                     logging.info("Wrote skipped-row details to %s", skipped_path)
                 except Exception:
                     logging.debug("Failed to write skipped rows: %s", traceback.format_exc())
-            summary[csv_file] = summary_entry
-            continue
-
-        # call insert_rows
-        insert_result = insert_rows(conn, cursor, table_name, table_columns, rows_to_insert,
-                                    pk_cols=pk_cols, col_type_map=type_map, batch_size=batch_size)
-        # insert_result contains inserted/skipped/error
-        inserted = insert_result.get("inserted", 0)
-        inserted_skipped = insert_result.get("skipped", 0)
-        err = insert_result.get("error")
-
-        total_skipped = skipped_count + inserted_skipped
 
-        logging.info("Inserted %d rows into table '%s'. Skipped %d rows (non-nullable or integrity failures).",
-                     inserted, table_name, total_skipped)
-
-        summary_entry["inserted"] = inserted
-        summary_entry["skipped"] = total_skipped
-        summary_entry["error"] = err
-
-        # write skipped rows details file if any
-        if skipped_rows_details:
-            skipped_path = os.path.join(directory, f"{csv_file}.skipped.csv")
-            try:
-                pd.DataFrame(skipped_rows_details).to_csv(skipped_path, index=False)
-                logging.info("Wrote skipped-row details to %s", skipped_path)
-            except Exception:
-                logging.debug("Failed to write skipped rows: %s", traceback.format_exc())
-
-        summary[csv_file] = summary_entry
+            summary[csv_file] = summary_entry
+    finally:
+        # also on an exception mid-load, so no read-ahead thread keeps parsing files
+        reader.shutdown(wait=False, cancel_futures=True)
 
     # restore FK checks if disabled
     try:
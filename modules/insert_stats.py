@@ -25,7 +25,8 @@ def get_insert_counts(task_id, runspace_base="Run_Space"):
         return {"error": f"Run folder not found: {folder}"}
 
     # build list of csv files -> table names
-    csv_files = [f for f in os.listdir(folder) if f.lower().endswith(".csv")]
+    with os.scandir(folder) as it:
+        csv_files = [e.name for e in it if e.name.lower().endswith(".csv") and e.is_file()]
 
     # first compute csv counts (fast)
     for csv_file in csv_files:
@@ -133,10 +134,11 @@ def get_insert_counts(task_id: str,
     try:
         files = []
         if os.path.isdir(task_dir):
-            for name in os.listdir(task_dir):
-                # consider only .csv files (case-insensitive)
-                if name.lower().endswith(".csv"):
-                    files.append(name)
+            with os.scandir(task_dir) as it:
+                for entry in it:
+                    # consider only .csv files (case-insensitive)
+                    if entry.name.lower().endswith(".csv") and entry.is_file():
+                        files.append(entry.name)
         else:
             # task dir missing
             return [{"error": f"Run space directory not found: {task_dir}"}]
@@ -1,16 +1,66 @@
 import os
 import json
+import hashlib
 import pandas as pd
 from urllib.parse import urlparse
 
+try:
+    # pandas' pyarrow CSV engine parses in parallel blocks; optional
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+# directory -> ({scanned dir: st_mtime_ns}, csv paths)
+_csv_cache = {}
+
+# Column metadata of every CSV parsed so far, keyed by a hash of its bytes and shared
+# across tasks, so a re-run only parses the files that changed.
+METADATA_CACHE_DIR = os.getenv("METADATA_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".metadata_cache"))
+
+def _scan_csv_files(directory_path, csv_files, dir_mtimes):
+    dir_mtimes[directory_path] = os.stat(directory_path).st_mtime_ns
+    # scandir yields the d_type with each entry, so no per-file stat is needed
+    with os.scandir(directory_path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _scan_csv_files(entry.path, csv_files, dir_mtimes)
+            elif entry.name.lower().endswith('.csv') and entry.is_file():
+                csv_files.append(entry.path)
+
 def get_csv_files_from_directory(directory_path):
-    """Return list of all CSV file paths inside the given directory."""
-    csv_files = []
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if file.lower().endswith('.csv'):
-                csv_files.append(os.path.join(root, file))
-    return csv_files
+    """Return list of all CSV file paths inside the given directory.
+
+    The listing is cached and reused while none of the scanned directories'
+    mtimes have changed (any create/delete/rename bumps the parent's mtime).
+    """
+    cached = _csv_cache.get(directory_path)
+    if cached is not None:
+        dir_mtimes, csv_files = cached
+        try:
+            if all(os.stat(d).st_mtime_ns == mt for d, mt in dir_mtimes.items()):
+                return list(csv_files)
+        except OSError:
+            pass
+    csv_files, dir_mtimes = [], {}
+    _scan_csv_files(directory_path, csv_files, dir_mtimes)
+    _csv_cache[directory_path] = (dir_mtimes, csv_files)
+    return list(csv_files)
+
+def invalidate_csv_cache(directory_path):
+    """Drop the cached listing for a directory (for writes within the mtime granularity)."""
+    _csv_cache.pop(directory_path, None)
+
+def has_csv_files(directory_path):
+    """True as soon as one CSV is found under the directory (stops scanning at the first hit)."""
+    with os.scandir(directory_path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if has_csv_files(entry.path):
+                    return True
+            elif entry.name.lower().endswith('.csv') and not entry.name.startswith('.') and entry.is_file():
+                return True
+    return False
 
 def read_csv_from_sharepoint(sharepoint_url):
     """Attempt to read a CSV file directly from a SharePoint link."""
@@ -32,43 +82,87 @@ def infer_data_type(series):
             return "string / null"
         return "string"
 
-def generate_metadata_for_dataframe(file_name, file_path, df):
-    """Generate metadata dictionary for a single CSV DataFrame."""
-    metadata = {
-        "file_name": os.path.splitext(file_name)[0],
-        "directory_path": file_path.replace("\\", "/"),
-        "columns": []
-    }
-
+def _column_metadata(df):
+    columns = []
     for col in df.columns:
         data_type = infer_data_type(df[col])
         has_duplicates = df[col].duplicated().any()
-        metadata["columns"].append({
+        columns.append({
             "column_name": col,
             "data_type": data_type,
             "has_duplicates": bool(has_duplicates)
         })
+    return columns
+
+def generate_metadata_for_dataframe(file_name, file_path, df, columns=None):
+    """Generate metadata dictionary for a single CSV DataFrame (or for already known `columns`)."""
+    return {
+        "file_name": os.path.splitext(file_name)[0],
+        "directory_path": file_path.replace("\\", "/"),
+        "columns": _column_metadata(df) if columns is None else columns
+    }
+
+def _read_csv(csv_path):
+    """pd.read_csv with the pyarrow engine when installed, falling back to the default parser."""
+    if _HAS_PYARROW:
+        try:
+            return pd.read_csv(csv_path, engine="pyarrow")
+        except Exception:
+            # e.g. ragged rows the C parser tolerates
+            pass
+    return pd.read_csv(csv_path)
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
+
+def _columns_cache_get(digest):
+    try:
+        with open(os.path.join(METADATA_CACHE_DIR, digest + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _columns_cache_put(digest, columns):
+    path = os.path.join(METADATA_CACHE_DIR, digest + ".json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(METADATA_CACHE_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(columns, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
 
-    return metadata
+def _csv_columns(csv_path):
+    """Column metadata for a local CSV, parsed only if these exact bytes have not been seen before."""
+    digest = _file_digest(csv_path)
+    columns = _columns_cache_get(digest)
+    if columns is None:
+        columns = _column_metadata(_read_csv(csv_path))
+        _columns_cache_put(digest, columns)
+    return columns
 
-def generate_metadata(source_dir_or_url, output_path):
+def generate_metadata(source_dir_or_url, output_path, csv_files=None):
     """
     Main callable function.
     Scans a local directory or SharePoint CSV URL and writes metadata.json.
+    For a directory whose CSV paths the caller already knows, pass them as
+    `csv_files` and the directory is not listed again.
     Returns the collected metadata as a Python object.
     """
     all_metadata = []
 
     if os.path.isdir(source_dir_or_url):
-        csv_files = get_csv_files_from_directory(source_dir_or_url)
+        if csv_files is None:
+            csv_files = get_csv_files_from_directory(source_dir_or_url)
         if not csv_files:
             raise FileNotFoundError(f"No CSV files found in directory: {source_dir_or_url}")
         for csv_path in csv_files:
             try:
-                df = pd.read_csv(csv_path)
                 relative_path = os.path.relpath(csv_path, source_dir_or_url)
                 file_name = os.path.basename(relative_path)
-                metadata = generate_metadata_for_dataframe(file_name, relative_path, df)
+                metadata = generate_metadata_for_dataframe(file_name, relative_path, None, columns=_csv_columns(csv_path))
                 all_metadata.append(metadata)
             except Exception as e:
                 raise RuntimeError(f"Error reading {csv_path}: {e}")
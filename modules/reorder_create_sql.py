@@ -5,16 +5,12 @@ import argparse
 import logging
 import copy
 from typing import List, Dict, Tuple, Set, Optional
-from .api_Call import api_call
+from .api_Call import api_call, evict_cached
+from .sql_Parser import iter_create_blocks, split_sql_statements
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
-CREATE_TABLE_REGEX = re.compile(
-    r"(CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:`?[\w_]+`?\.)?[`\"]?([\w_]+)[`\"]?\s*\(.*?\)\s*;)",
-    re.IGNORECASE | re.DOTALL,
-)
-
 REFERENCES_REGEX = re.compile(
     r"REFERENCES\s+(?:`?[\w_]+`?\.)?[`\"]?([\w_]+)[`\"]?",
     re.IGNORECASE,
@@ -34,10 +30,8 @@ def read_sql_file(path: str) -> str:
 
 def extract_create_blocks(sql_text: str) -> List[Tuple[str, str]]:
     blocks = []
-    for match in CREATE_TABLE_REGEX.finditer(sql_text):
-        full = match.group(1).strip()
-        name = match.group(2).strip()
-        blocks.append((full, name))
+    for full, name in iter_create_blocks(sql_text):
+        blocks.append((full.strip(), name.strip()))
     logger.info("Extracted %d CREATE TABLE blocks.", len(blocks))
     return blocks
 
@@ -123,25 +117,12 @@ def call_llm_for_ordering(create_blocks: List[Tuple[str, str]], drop_map: Dict[s
             sql_text = fenced.group(1).strip()
         else:
             sql_text = resp_text.strip()
-        statements = []
-        cur = []
-        in_single_quote = False
-        for ch in sql_text:
-            cur.append(ch)
-            if ch == "'":
-                if len(cur) >= 2 and cur[-2] == "\\":
-                    pass
-                else:
-                    in_single_quote = not in_single_quote
-            if ch == ";" and not in_single_quote:
-                stmt = "".join(cur).strip()
-                if stmt:
-                    statements.append(stmt)
-                cur = []
-        leftover = "".join(cur).strip()
-        if leftover:
-            statements.append(leftover)
+        statements = split_sql_statements(sql_text)
         logger.info("LLM returned %d statements.", len(statements))
+        if not statements:
+            # the caller falls back to the heuristic order; don't replay this reply next time
+            evict_cached(prompt)
+            return None
         return statements
     except Exception as e:
         logger.exception("LLM call failed: %s", e)
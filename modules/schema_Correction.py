@@ -7,7 +7,7 @@ from typing import Any, Dict, List, Union
 from dotenv import load_dotenv
 import google.generativeai as genai
 import re
-from .api_Call import api_call
+from .api_Call import api_call, evict_cached
 
 
 def load_json_file(path: str) -> Any:
@@ -29,13 +29,7 @@ def normalize_errors(errors_raw: Any) -> List[Dict[str, Any]]:
 
     raise ValueError("Unsupported errors.json format — expected JSON list or object.")
 
-def build_prompt(errors: list[dict[str, any]], puml: str, query_text: str) -> str:
-    """
-    Build a GPT-4o-optimized prompt to correct PlantUML ERD code.
-    The model must fix only the described issues and return one valid JSON object.
-    """
-
-    json_structure_example = """
+CORRECTION_JSON_STRUCTURE = """
 {
   "reasoning": [
     {
@@ -47,9 +41,8 @@ def build_prompt(errors: list[dict[str, any]], puml: str, query_text: str) -> st
 }
 """
 
-    errors_summary = json.dumps(errors, indent=2, ensure_ascii=False)
-
-    prompt = textwrap.dedent(f"""
+# Dedented once at import; build_prompt only fills in the per-call inputs
+_CORRECTION_TEMPLATE = textwrap.dedent("""
     You are a senior data architect and PlantUML ERD specialist.
     Your task is to correct a PlantUML data model based on the provided
     requirements and error report. This current PlantUML diagram has been made for a 3NF normalized relational database schema. Maintain this normalization level and make only the necessary corrections.
@@ -85,14 +78,25 @@ def build_prompt(errors: list[dict[str, any]], puml: str, query_text: str) -> st
     Please produce the corrected output JSON now.
     """).strip()
 
-    return prompt
+def build_prompt(errors: list[dict[str, any]], puml: str, query_text: str) -> str:
+    """
+    Build a GPT-4o-optimized prompt to correct PlantUML ERD code.
+    The model must fix only the described issues and return one valid JSON object.
+    """
+    errors_summary = json.dumps(errors, indent=2, ensure_ascii=False)
+    return _CORRECTION_TEMPLATE.format(
+        json_structure_example=CORRECTION_JSON_STRUCTURE,
+        query_text=query_text,
+        puml=puml,
+        errors_summary=errors_summary,
+    )
 
 def save_output(text: str, path: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
     print(f"✅ Saved corrected PlantUML to: {path}")
 
-def correction(errors_path: str, puml_path: str, query_path: str):
+def correction(errors_path: str, puml_path: str, query_path: str, query_text: str = None):
 
     if not os.path.exists(errors_path):
         print(f"ERROR: errors file not found: {errors_path}")
@@ -100,17 +104,19 @@ def correction(errors_path: str, puml_path: str, query_path: str):
     if not os.path.exists(puml_path):
         print(f"ERROR: puml file not found: {puml_path}")
         sys.exit(2)
-    if not os.path.exists(query_path):
+    if query_text is None and not os.path.exists(query_path):
         print(f"ERROR: query file not found: {query_path}")
         sys.exit(2)
 
     raw_errors = load_json_file(errors_path)
     errors = normalize_errors(raw_errors)
     puml = load_text_file(puml_path)
-    query_text = load_text_file(query_path)
+    if query_text is None:
+        query_text = load_text_file(query_path)
 
     prompt = build_prompt(errors, puml, query_text)
 
+    response_text = ""
     try:
         response_text = api_call(prompt)
         clean_output = re.sub(r"```json|```", "", response_text, flags=re.DOTALL).strip()
@@ -127,6 +133,7 @@ def correction(errors_path: str, puml_path: str, query_path: str):
 
     except Exception as e:
         print(f"⚠️ Correction failed: {e}. Saving raw output for debugging.")
+        evict_cached(prompt)
         with open(puml_path + ".correction-error.txt", "w", encoding="utf-8") as f:
             f.write(response_text)
         raise
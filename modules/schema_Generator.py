@@ -1,11 +1,20 @@
 import os
 import json
+import shutil
+import tempfile
 import logging
 from dotenv import load_dotenv
 import subprocess
 import requests
 import google.generativeai as genai
-from .api_Call import api_call
+from .api_Call import api_call, evict_cached
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
 
 # ========== PATH CONFIG ==========
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,17 +37,15 @@ def load_dimensional_model(path):
     """Load dimensional_model.json."""
     if not os.path.exists(path):
         raise FileNotFoundError(f"❌ dimensional_model.json not found at {path}")
+    if _HAS_ORJSON:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def build_prompt(dimensional_model, schema_context):
-    """
-    Builds a GPT-4o-optimized prompt for generating a 3NF database schema 
-    and PlantUML ER diagram from a dimensional model and contextual metadata.
-    """
-
-    system_instructions = (
-        """You are a senior data architect AI.
+# Instruction blocks are module constants sent as the system message, so every call
+# shares a byte-identical prefix the endpoint can serve from its prompt cache.
+SCHEMA_SYSTEM_INSTRUCTIONS = """You are a senior data architect AI.
 Your goal is to analyze a user-provided JSON model and contextual metadata,
 then infer normalized (3NF) relational structures and their relationships.
 
@@ -71,8 +78,22 @@ Important:
   "plantuml_code": "Full corrected PlantUML ER diagram code as a single string"
 }
 """
-    )
 
+CORRECTION_SYSTEM_INSTRUCTIONS = """You are an expert data modeler and PlantUML ERD specialist. Your task is to update an existing PlantUML ER diagram based on a user's correction request.
+
+--- OUTPUT REQUIREMENTS ---
+- Return ONLY the corrected PlantUML code.
+- The code must:
+  - Begin with '@startuml' and end with '@enduml'
+  - Preserve all valid existing entities, relationships, and formatting.
+  - Apply ONLY the requested corrections; do not invent unrelated changes.
+  - Maintain valid syntax and consistent indentation.
+- Do NOT include explanations, markdown, reasoning, or commentary outside the code.
+- No matter what the correction request should be ALWAYS fulfilled in the output.
+"""
+
+def build_user_payload(dimensional_model, schema_context):
+    """Per-call part of the schema prompt."""
     context_instructions = f"""
 Use this external context and metadata to guide normalization and relationship inference:
 ---USER CONTEXT---
@@ -88,7 +109,14 @@ Use this external context and metadata to guide normalization and relationship i
         + "\nNow, infer relationships, keys, and design the ER diagram according to the rules above."
     )
 
-    return system_instructions + "\n\n" + user_payload
+    return user_payload
+
+def build_prompt(dimensional_model, schema_context):
+    """
+    Builds a GPT-4o-optimized prompt for generating a 3NF database schema 
+    and PlantUML ER diagram from a dimensional model and contextual metadata.
+    """
+    return f"{SCHEMA_SYSTEM_INSTRUCTIONS}\n\n{build_user_payload(dimensional_model, schema_context)}"
 
 def save_plantuml(code_text, out_path):
     """Saves valid PlantUML code to the provided out_path."""
@@ -111,6 +139,29 @@ def save_plantuml(code_text, out_path):
 
     return out_path
 
+def _render_in_scratch_dir(cmd, puml_path, output_png_path):
+    """Run a PlantUML renderer on a copy of `puml_path` in a fresh directory and move its PNG
+    to `output_png_path`; returns the CompletedProcess, or None if no PNG was produced.
+
+    The renderer names its output after the .puml file, which for the task's canonical
+    relationship_schema.puml is the canonical PNG itself (possibly a hard link to an earlier
+    round's image). Rendering into a scratch directory means no existing file is ever written
+    in place, and os.replace swaps the result in as a new file.
+    """
+    puml_dir = os.path.dirname(puml_path) or '.'
+    puml_base = os.path.basename(puml_path)
+    scratch = tempfile.mkdtemp(prefix=".render-", dir=puml_dir)
+    try:
+        shutil.copyfile(puml_path, os.path.join(scratch, puml_base))
+        proc = subprocess.run(cmd + [puml_base], check=True, capture_output=True, text=True, cwd=scratch)
+        generated_file = os.path.join(scratch, os.path.splitext(puml_base)[0] + ".png")
+        if not os.path.exists(generated_file):
+            return None
+        os.replace(generated_file, output_png_path)
+        return proc
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
 def render_plantuml_to_png(puml_path, output_png_path):
     """Render PlantUML .puml file to PNG using plantuml.jar"""
     # Use the provided paths directly
@@ -125,13 +176,9 @@ def render_plantuml_to_png(puml_path, output_png_path):
 
     # Attempt 1: use plantuml.jar if it exists
     if os.path.exists(PLANTUML_JAR):
-        puml_dir = os.path.dirname(puml_path) or '.'
-        puml_base = os.path.basename(puml_path)
-        cmd = ["java", "-jar", PLANTUML_JAR, "-tpng", puml_base]
-        logger.info(f"Trying plantuml.jar: {PLANTUML_JAR} (cwd={puml_dir})")
+        logger.info(f"Trying plantuml.jar: {PLANTUML_JAR}")
         try:
-            proc = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=puml_dir)
-            diagnostics["attempts"].append({"method": "jar", "returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr})
+            proc = _render_in_scratch_dir(["java", "-jar", PLANTUML_JAR, "-tpng"], puml_path, output_png_path)
         except FileNotFoundError as e:
             diagnostics["attempts"].append({"method": "jar", "error": str(e)})
             logger.warning("Java executable not found when trying plantuml.jar")
@@ -139,23 +186,17 @@ def render_plantuml_to_png(puml_path, output_png_path):
             diagnostics["attempts"].append({"method": "jar", "returncode": e.returncode, "stdout": getattr(e, 'stdout', ''), "stderr": getattr(e, 'stderr', '')})
             logger.warning(f"plantuml.jar rendering failed: returncode={getattr(e,'returncode',None)}")
         else:
-            generated_file = os.path.join(puml_dir, os.path.splitext(puml_base)[0] + ".png")
-            if os.path.exists(generated_file):
-                os.replace(generated_file, output_png_path)
+            diagnostics["attempts"].append({"method": "jar", "produced_png": proc is not None})
+            if proc is not None:
                 logger.info(f"🖼 PNG generated with plantuml.jar: {output_png_path}")
                 return output_png_path
 
     # Attempt 2: try plantuml CLI if available in PATH
     try:
-        puml_dir = os.path.dirname(puml_path) or '.'
-        puml_base = os.path.basename(puml_path)
-        cmd = ["plantuml", "-tpng", puml_base]
-        logger.info(f"Trying plantuml CLI (plantuml in PATH) (cwd={puml_dir})")
-        proc = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=puml_dir)
-        diagnostics["attempts"].append({"method": "cli", "returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr})
-        generated_file = os.path.join(puml_dir, os.path.splitext(puml_base)[0] + ".png")
-        if os.path.exists(generated_file):
-            os.replace(generated_file, output_png_path)
+        logger.info("Trying plantuml CLI (plantuml in PATH)")
+        proc = _render_in_scratch_dir(["plantuml", "-tpng"], puml_path, output_png_path)
+        diagnostics["attempts"].append({"method": "cli", "produced_png": proc is not None})
+        if proc is not None:
             logger.info(f"🖼 PNG generated with plantuml CLI: {output_png_path}")
             return output_png_path
     except FileNotFoundError as e:
@@ -176,8 +217,11 @@ def render_plantuml_to_png(puml_path, output_png_path):
             out_dir = os.path.dirname(output_png_path)
             if out_dir:
                 os.makedirs(out_dir, exist_ok=True)
-            with open(output_png_path, 'wb') as outf:
+            # new file swapped in, never written through an existing (possibly linked) one
+            tmp = f"{output_png_path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as outf:
                 outf.write(resp.content)
+            os.replace(tmp, output_png_path)
             logger.info(f"🖼 PNG generated via PlantUML server: {output_png_path}")
             return output_png_path
         else:
@@ -203,10 +247,10 @@ def generate_schema(dimensional_model_path, output_puml_path, output_png_path, s
     dimensional_model = load_dimensional_model(dimensional_model_path)
 
     logger.info("✍️ Building prompt...")
-    prompt = build_prompt(dimensional_model, schema_context)
+    user_payload = build_user_payload(dimensional_model, schema_context)
 
     logger.info("🤖 Calling Openai model...")
-    result_text = api_call(prompt)
+    result_text = api_call(user_payload, system=SCHEMA_SYSTEM_INSTRUCTIONS)
     if result_text.startswith("```plantuml"):
         result_text = result_text[11:-3].strip()
     elif result_text.startswith("```json"):
@@ -231,30 +275,17 @@ def generate_schema(dimensional_model_path, output_puml_path, output_png_path, s
     except (json.JSONDecodeError, ValueError) as e:
         logger.error(f"❌ Failed to parse PlantUML from Openai response: {e}. Saving raw output for debugging.")
         save_plantuml(result_text, out_path=output_puml_path + ".error.puml")
+        # the dimensional model is cached too, so a re-run would send this exact payload again
+        evict_cached(user_payload, system=SCHEMA_SYSTEM_INSTRUCTIONS)
+        raise
+    except RuntimeError:
+        # render_plantuml_to_png gave up on this diagram; don't replay it from the cache
+        evict_cached(user_payload, system=SCHEMA_SYSTEM_INSTRUCTIONS)
         raise
 
-def build_correction_prompt(current_schema: str, correction_text: str) -> str:
-    """
-    Builds a GPT-4o-optimized prompt to correct or update an existing PlantUML ER diagram.
-    The model must apply only the requested corrections and return the full corrected code.
-    """
-
-    system_instructions = (
-        """You are an expert data modeler and PlantUML ERD specialist. Your task is to update an existing PlantUML ER diagram based on a user's correction request.
-
---- OUTPUT REQUIREMENTS ---
-- Return ONLY the corrected PlantUML code.
-- The code must:
-  - Begin with '@startuml' and end with '@enduml'
-  - Preserve all valid existing entities, relationships, and formatting.
-  - Apply ONLY the requested corrections; do not invent unrelated changes.
-  - Maintain valid syntax and consistent indentation.
-- Do NOT include explanations, markdown, reasoning, or commentary outside the code.
-- No matter what the correction request should be ALWAYS fulfilled in the output.
-"""
-    )
-
-    user_payload = f"""
+def build_correction_payload(current_schema: str, correction_text: str) -> str:
+    """Per-call part of the correction prompt."""
+    return f"""
 --- EXISTING PLANTUML SCHEMA ---
 {current_schema}
 
@@ -264,8 +295,12 @@ def build_correction_prompt(current_schema: str, correction_text: str) -> str:
 Now apply the correction and return only the fully updated PlantUML diagram.
 """
 
-    prompt = system_instructions + "\n\n" + user_payload
-    return prompt
+def build_correction_prompt(current_schema: str, correction_text: str) -> str:
+    """
+    Builds a GPT-4o-optimized prompt to correct or update an existing PlantUML ER diagram.
+    The model must apply only the requested corrections and return the full corrected code.
+    """
+    return f"{CORRECTION_SYSTEM_INSTRUCTIONS}\n\n{build_correction_payload(current_schema, correction_text)}"
 
 def schema_correction(user_input, puml_path, png_path):
     """Apply corrections to the current schema based on user input."""
@@ -290,12 +325,16 @@ def schema_correction(user_input, puml_path, png_path):
         with open(puml_path, "r", encoding="utf-8") as f:
             current_schema = f.read()
 
-        prompt = build_correction_prompt(current_schema, correction_text)
+        user_payload = build_correction_payload(current_schema, correction_text)
         logger.info("🤖 Calling Openai model for schema correction...")
 
-        corrected_text = api_call(prompt)
+        corrected_text = api_call(user_payload, system=CORRECTION_SYSTEM_INSTRUCTIONS)
         save_plantuml(corrected_text, out_path=puml_path)
-        render_plantuml_to_png(puml_path=puml_path, output_png_path=png_path)
+        try:
+            render_plantuml_to_png(puml_path=puml_path, output_png_path=png_path)
+        except RuntimeError:
+            evict_cached(user_payload, system=CORRECTION_SYSTEM_INSTRUCTIONS)
+            raise
         logger.info("🛠 Schema correction applied.")
         return "Schema corrected successfully."
 
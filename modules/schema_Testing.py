@@ -2,16 +2,14 @@ import google.generativeai as genai
 import re
 import os
 from dotenv import load_dotenv
-from .api_Call import api_call
+from .api_Call import api_call, evict_cached
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-def build_prompt_phase_1(user_query: str) -> str:
-    """
-    Builds a GPT-4o-optimized prompt for generating QA test cases
-    to validate a relational database schema based on a user query.
-    """
+# markdown code fences the model sometimes wraps its JSON in
+_CODE_FENCE_RE = re.compile(r"```json|```")
 
-    json_structure_example = """
+PHASE1_JSON_STRUCTURE = """
 {
   "reasoning": [
     {
@@ -32,6 +30,11 @@ def build_prompt_phase_1(user_query: str) -> str:
 }
 """
 
+def build_prompt_phase_1(user_query: str) -> str:
+    """
+    Builds a GPT-4o-optimized prompt for generating QA test cases
+    to validate a relational database schema based on a user query.
+    """
     prompt_phase1 = f"""
 You are a senior **Database QA Architect**.
 Your task is to design **20 detailed QA test cases** that validate a relational database schema . These should test by giving simple natural language descriptions that would create sql queries to fetch data from the database to verify its correctness.
@@ -65,25 +68,29 @@ referential integrity, data type consistency, and normalization adherence.
 
 --- OUTPUT FORMAT ---
 It must STRICTLY follow this structure:
-{json_structure_example}
+{PHASE1_JSON_STRUCTURE}
 """
 
     return prompt_phase1
 
-def run_phase1(user_query_path, output_path):
+def run_phase1(user_query_path, output_path, user_query=None):
     """Generate Phase 1 testcases from a user query and write to output_path.
 
-    Both arguments must be explicit paths.
+    Both path arguments must be explicit paths. When the query text is already in
+    memory, pass it as `user_query` and the file is not read.
     """
-    if not os.path.exists(user_query_path):
-        raise FileNotFoundError(f"❌ Missing file: {user_query_path}")
-    with open(user_query_path, "r", encoding="utf-8") as f:
-        user_query = f.read().strip()
+    if user_query is not None:
+        user_query = user_query.strip()
+    else:
+        if not os.path.exists(user_query_path):
+            raise FileNotFoundError(f"❌ Missing file: {user_query_path}")
+        with open(user_query_path, "r", encoding="utf-8") as f:
+            user_query = f.read().strip()
 
     prompt_phase1 = build_prompt_phase_1(user_query)
     print("\n⚙️ Running Phase 1 — generating testcases...")
     output_text = api_call(prompt_phase1)
-    clean_output = re.sub(r"```json|```", "", output_text, flags=re.DOTALL).strip()
+    clean_output = _CODE_FENCE_RE.sub("", output_text).strip()
 
     try:
         response_data = json.loads(clean_output)
@@ -100,21 +107,10 @@ def run_phase1(user_query_path, output_path):
         return True, reasoning
     except Exception as e:
         print("⚠️ Phase 1 failed.\nOutput:\n", clean_output, "\nError:", e)
+        evict_cached(prompt_phase1)
         return False, None
 
-def run_phase2(plantuml_code_path, testcases_path, output_dir):
-    if not os.path.exists(plantuml_code_path):
-        raise FileNotFoundError(f"❌ Missing file: {plantuml_code_path}")
-    with open(plantuml_code_path, "r", encoding="utf-8") as f:
-        plantuml_code = f.read().strip()
-    print("\n⚙️ Running Phase 2 — executing testcases...")
-    if not os.path.exists(testcases_path):
-        raise FileNotFoundError(f"❌ Missing file from Phase 1: {testcases_path}")
-
-    with open(testcases_path, "r", encoding="utf-8") as f:
-        testcases_prompt = f.read()
-
-    json_structure_example = """
+PHASE2_JSON_STRUCTURE = """
         {
         "reasoning": [
             {
@@ -138,7 +134,13 @@ def run_phase2(plantuml_code_path, testcases_path, output_dir):
         }
         """
 
-    prompt_phase2 = f"""
+# Phase 2 sends the test cases in batches of this size, validated concurrently
+PHASE2_BATCH_SIZE = int(os.getenv("PHASE2_BATCH_SIZE", "5"))
+MAX_LLM_WORKERS = 8
+
+def build_prompt_phase_2(plantuml_code: str, testcases_prompt: str) -> str:
+    """Builds the prompt that validates the PlantUML schema against a set of test cases."""
+    return f"""
         SYSTEM INSTRUCTIONS:
         You are a highly accurate and detail-oriented **Database QA Expert**.
         Your job is to validate a database schema (in 3NF) against a set of test cases.
@@ -164,21 +166,63 @@ def run_phase2(plantuml_code_path, testcases_path, output_dir):
         4. If a test case fails, include a corresponding entry in the "errors" list with a clear error description.
         5. Ensure all output fits the following JSON structure exactly:
 
-        {json_structure_example}
+        {PHASE2_JSON_STRUCTURE}
 
         FINAL REQUIREMENT:
         Return ONLY the JSON object — no markdown, preamble, or commentary.
         """
 
+def generate_testcases_batch(prompts):
+    """api_call() for every prompt, issued concurrently; responses come back in prompt order."""
+    if len(prompts) <= 1:
+        return [api_call(p) for p in prompts]
+    with ThreadPoolExecutor(max_workers=min(MAX_LLM_WORKERS, len(prompts))) as executor:
+        return list(executor.map(api_call, prompts))
+
+def _split_testcases(testcases_prompt):
+    """Phase 1 output as JSON-encoded batches of PHASE2_BATCH_SIZE; the raw text if it is not a list."""
+    try:
+        testcases = json.loads(testcases_prompt)
+    except ValueError:
+        return [testcases_prompt]
+    if not isinstance(testcases, list) or len(testcases) <= PHASE2_BATCH_SIZE:
+        return [testcases_prompt]
+    return [
+        json.dumps(testcases[i:i + PHASE2_BATCH_SIZE], indent=2)
+        for i in range(0, len(testcases), PHASE2_BATCH_SIZE)
+    ]
+
+def run_phase2(plantuml_code_path, testcases_path, output_dir):
+    if not os.path.exists(plantuml_code_path):
+        raise FileNotFoundError(f"❌ Missing file: {plantuml_code_path}")
+    with open(plantuml_code_path, "r", encoding="utf-8") as f:
+        plantuml_code = f.read().strip()
+    print("\n⚙️ Running Phase 2 — executing testcases...")
+    if not os.path.exists(testcases_path):
+        raise FileNotFoundError(f"❌ Missing file from Phase 1: {testcases_path}")
+
+    with open(testcases_path, "r", encoding="utf-8") as f:
+        testcases_prompt = f.read()
 
-    output_text = api_call(prompt_phase2)
-    clean_output = re.sub(r"```json|```", "", output_text, flags=re.DOTALL).strip()
+    prompts = [build_prompt_phase_2(plantuml_code, batch) for batch in _split_testcases(testcases_prompt)]
+    outputs = generate_testcases_batch(prompts)
 
+    testcases_results, errors_found, reasoning = [], [], []
+    clean_output = ""
+    prompt = None
     try:
-        response_data = json.loads(clean_output)
-        testcases_results = response_data.get("testcases", [])
-        errors_found = response_data.get("errors", [])
-        reasoning = response_data.get("reasoning")
+        for prompt, output_text in zip(prompts, outputs):
+            clean_output = _CODE_FENCE_RE.sub("", output_text).strip()
+            response_data = json.loads(clean_output)
+            testcases_results.extend(response_data.get("testcases", []))
+            errors_found.extend(response_data.get("errors", []))
+            batch_reasoning = response_data.get("reasoning")
+            if isinstance(batch_reasoning, list):
+                reasoning.extend(batch_reasoning)
+            elif batch_reasoning:
+                reasoning.append(batch_reasoning)
+        # every reply was usable
+        prompt = None
 
         # Write outputs to provided output_dir
         if output_dir:
@@ -189,9 +233,12 @@ def run_phase2(plantuml_code_path, testcases_path, output_dir):
                 json.dump(errors_found, f, indent=2)
 
         print(f"✅ Phase 2 done: testcases.json and errors.json created in {output_dir}")
-        return True, reasoning
+        return True, reasoning or None
     except Exception as e:
         print("⚠️ Phase 2 failed.\nOutput:\n", clean_output, "\nError:", e)
+        if prompt is not None:
+            # the batch whose reply could not be used; the others parsed and stay cached
+            evict_cached(prompt)
         return False, None
 
 # ==========================================
@@ -2,16 +2,121 @@ import re
 import os
 import shutil
 import glob
+import multiprocessing
+import runpy
 import subprocess
 import sys
 import tempfile
-import time
+import traceback
 from typing import List, Dict, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Generated scripts `import db_utils`; it lives once at the project root and is put
+# on the child's PYTHONPATH instead of being copied into every task folder.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _script_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    existing = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + existing if existing else PROJECT_ROOT
+    return env
+
+
+# With SCRIPT_FORKSERVER=1, generated scripts run in a child forked from a forkserver that
+# has pandas/mysql already imported, skipping interpreter startup and the import stack on
+# every run. The scripts are model-generated, so they still never run in the server process.
+SCRIPT_FORKSERVER = (
+    os.getenv("SCRIPT_FORKSERVER", "").lower() in ("1", "true", "yes")
+    and "forkserver" in multiprocessing.get_all_start_methods()
+)
+_FORKSERVER_PRELOAD = ["pandas", "mysql.connector", "db_utils"]
+_forkserver_ctx = None
+
+
+def _get_forkserver_ctx():
+    global _forkserver_ctx
+    if _forkserver_ctx is None:
+        ctx = multiprocessing.get_context("forkserver")
+        # only takes effect before the forkserver starts; modules that fail to import are skipped
+        ctx.set_forkserver_preload(_FORKSERVER_PRELOAD)
+        _forkserver_ctx = ctx
+    return _forkserver_ctx
+
+
+def _exec_script_child(script_path: str, cwd: str, out_path: str, err_path: str) -> None:
+    """Forkserver child: run `script_path` as __main__ in `cwd` with fds 1/2 sent to the given files."""
+    os.chdir(cwd)
+    sys.path[:0] = [cwd, PROJECT_ROOT]
+    with open(out_path, "w", encoding="utf-8") as out, open(err_path, "w", encoding="utf-8") as err:
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        sys.stdout = os.fdopen(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = os.fdopen(2, "w", encoding="utf-8", closefd=False)
+        try:
+            runpy.run_path(script_path, run_name="__main__")
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+
+def _run_in_forkserver(script_path: str, cwd: str, timeout: int) -> Dict[str, object]:
+    """Run the script in a forkserver child; returncode -1 on timeout."""
+    ctx = _get_forkserver_ctx()
+    out_fd, out_path = tempfile.mkstemp(suffix=".out")
+    err_fd, err_path = tempfile.mkstemp(suffix=".err")
+    os.close(out_fd)
+    os.close(err_fd)
+    try:
+        proc = ctx.Process(target=_exec_script_child, args=(script_path, cwd, out_path, err_path), daemon=True)
+        proc.start()
+        proc.join(timeout)
+        timed_out = proc.is_alive()
+        if timed_out:
+            proc.kill()
+            proc.join(5)
+        with open(out_path, encoding="utf-8", errors="replace") as f:
+            stdout = f.read()
+        with open(err_path, encoding="utf-8", errors="replace") as f:
+            stderr = f.read()
+        if timed_out:
+            return {"returncode": -1, "stdout": stdout, "stderr": f"Timeout after {timeout}s\n{stderr}"}
+        return {"returncode": proc.exitcode, "stdout": stdout, "stderr": stderr}
+    finally:
+        for path in (out_path, err_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _syntax_error(code: str, script_path: str) -> Optional[str]:
+    """Compile the generated source once up front; broken model output then fails without spawning a child."""
+    try:
+        compile(code, script_path, "exec")
+    except SyntaxError as e:
+        return "".join(traceback.format_exception_only(type(e), e))
+    return None
+
+
+def _run_in_subprocess(script_path: str, cwd: str, timeout: int) -> Dict[str, object]:
+    """Run the script in a fresh interpreter; returncode -1 on timeout."""
+    # relative name when the script sits in cwd (keeps tracebacks short), absolute otherwise
+    in_cwd = os.path.dirname(os.path.abspath(script_path)) == os.path.abspath(cwd)
+    command = [sys.executable, os.path.basename(script_path) if in_cwd else os.path.abspath(script_path)]
+    logger.info("Executing command: %s in CWD: %s", " ".join(command), cwd)
+    proc = subprocess.Popen(command, cwd=cwd, env=_script_env(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', close_fds=os.name != 'nt')
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate(timeout=5)
+        return {"returncode": -1, "stdout": stdout or "", "stderr": f"Timeout after {timeout}s\n{stderr or ''}"}
+    return {"returncode": proc.returncode, "stdout": stdout, "stderr": stderr}
+
 
 def extract_code_blocks(text: str) -> List[Dict[str, str]]:
     pattern = re.compile(r"```(\w+)?\n(.*?)```", re.S)
@@ -24,62 +129,63 @@ def extract_code_blocks(text: str) -> List[Dict[str, str]]:
     return blocks
 
 
-def _wait_for_new_files_stable(before_set: set, directory: str, max_wait_s: float = 5.0, stability_interval: float = 0.3):
+def _new_files(before_set: set, directory: str) -> List[str]:
     """
-    After a script runs, detect which files are newly created in `directory` (not present in before_set),
-    wait for each new file to reach a stable size (no growth) for stability_interval, up to max_wait_s total.
-    Return list of new file full paths (stable ones only).
+    Return full paths of regular files in `directory` that are not in before_set.
+    Called after the child process has exited, so every file it wrote is already
+    closed; a single directory scan replaces polling for size stability.
     """
-    start = time.time()
-    stable_files = []
-    attempted = set()
-    while True:
-        now = time.time()
-        after_names = set(os.listdir(directory))
-        new_names = after_names - before_set
-        # exclude the script itself if present (we don't care)
-        new_paths = [os.path.join(directory, n) for n in new_names]
-        # For each candidate file, wait for size stability
-        for p in new_paths:
-            if p in attempted:
-                continue
-            attempted.add(p)
-            # only consider files (not directories)
-            if not os.path.isfile(p):
-                continue
-            try:
-                # wait up to (remaining_time) for size to stabilize
-                last_size = os.path.getsize(p)
-                stable_since = time.time()
-                while True:
-                    time.sleep(stability_interval)
-                    try:
-                        cur_size = os.path.getsize(p)
-                    except Exception:
-                        # file might have been removed; break out and try later
-                        break
-                    if cur_size == last_size:
-                        # still same size across stability_interval -> treat as stable
-                        stable_files.append(p)
-                        break
-                    last_size = cur_size
-                    if time.time() - start > max_wait_s:
-                        # timed out waiting for this file, give up on stability
-                        logger.warning("Timed out waiting for file stability: %s", p)
-                        break
-            except Exception as e:
-                logger.debug("Exception while waiting for file stability: %s", e)
-        # finish when we've checked all new items or time exhausted
-        if time.time() - start > max_wait_s:
-            break
-        # small sleep before re-evaluating new files
-        time.sleep(0.05)
-        # break early if we've found any stable files and no more new names are appearing rapidly
-        # (helps return faster in common cases)
-        if stable_files and (time.time() - start) > 0.1:
-            break
-    # Filter stable_files to unique and existing
-    return [p for p in dict.fromkeys(stable_files) if os.path.exists(p)]
+    with os.scandir(directory) as it:
+        return [e.path for e in it if e.name not in before_set and e.is_file()]
+
+
+def _execute_in_dir(script_path: str, run_space_dir: str, timeout: int, before_files: set, source) -> Dict[str, object]:
+    """Compile-check `source`, run `script_path` with cwd=run_space_dir and collect the files it produced."""
+    syntax_error = _syntax_error(source, script_path)
+    if syntax_error:
+        logger.error("Generated script does not compile: %s", syntax_error.strip())
+        return {"returncode": 1, "stdout": "", "stderr": syntax_error, "path": script_path, "files": [], "copied": []}
+
+    # Execute and capture output reliably
+    try:
+        if SCRIPT_FORKSERVER:
+            logger.info("Executing %s via forkserver in CWD: %s", script_path, run_space_dir)
+            ran = _run_in_forkserver(script_path, run_space_dir, timeout)
+        else:
+            ran = _run_in_subprocess(script_path, run_space_dir, timeout)
+    except Exception as e:
+        logger.exception("Error while executing subprocess: %s", e)
+        return {"returncode": -3, "stdout": "", "stderr": str(e), "path": script_path, "files": [], "copied": []}
+    if ran["returncode"] == -1:
+        return {**ran, "path": script_path, "files": [], "copied": []}
+    stdout, stderr, returncode = ran["stdout"], ran["stderr"], ran["returncode"]
+
+    # The child has exited by now, so its outputs are complete on disk.
+    try:
+        produced_candidates = _new_files(before_files, run_space_dir)
+    except Exception as e:
+        logger.warning("Error while listing new files: %s", e)
+        produced_candidates = []
+
+    # Filter produced list to include interesting file types only (like you had before)
+    produced = []
+    for full in produced_candidates:
+        name = os.path.basename(full)
+        if name == os.path.basename(script_path):
+            continue
+        if os.path.isfile(full) and name.lower().endswith(('.png', '.jpg', '.jpeg', '.svg', '.gif', '.pdf', '.csv', '.txt', '.sql')):
+            produced.append(full)
+
+    result = {
+        "returncode": returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "path": script_path,
+        "files": produced,
+        "copied": [],
+    }
+    logger.info("%s finished: stdout length=%d, files=%s", os.path.basename(script_path), len(result["stdout"] or ""), result["files"])
+    return result
 
 
 def run_python_code(code: str, outfile: Optional[str] = None, timeout: int = 10000, run_space_dir: Optional[str] = None) -> Dict[str, object]:
@@ -143,50 +249,7 @@ def run_python_code(code: str, outfile: Optional[str] = None, timeout: int = 100
             logger.error("Script file was not found after write: %s", script_path)
             return {"returncode": -2, "stdout": "", "stderr": f"Script file not found: {script_path}", "path": script_path, "files": [], "copied": []}
 
-        command = [sys.executable, os.path.basename(script_path)]
-        logger.info("Executing command: %s in CWD: %s", " ".join(command), run_space_dir)
-
-        # Execute and capture output reliably
-        try:
-            proc = subprocess.Popen(command, cwd=run_space_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', close_fds=os.name != 'nt')
-            try:
-                stdout, stderr = proc.communicate(timeout=timeout)
-                returncode = proc.returncode
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                stdout, stderr = proc.communicate(timeout=5)
-                return {"returncode": -1, "stdout": stdout or "", "stderr": f"Timeout after {timeout}s\n{stderr or ''}", "path": script_path, "files": [], "copied": []}
-        except Exception as e:
-            logger.exception("Error while executing subprocess: %s", e)
-            return {"returncode": -3, "stdout": "", "stderr": str(e), "path": script_path, "files": [], "copied": []}
-
-        # After process exit, detect newly created files and wait for them to become stable.
-        # This prevents the parent from reading files that the child is still writing/flushing.
-        try:
-            produced_candidates = _wait_for_new_files_stable(before_files, run_space_dir, max_wait_s=6.0, stability_interval=0.25)
-        except Exception as e:
-            logger.warning("Error while waiting for new files to stabilize: %s", e)
-            produced_candidates = []
-
-        # Filter produced list to include interesting file types only (like you had before)
-        produced = []
-        for full in produced_candidates:
-            name = os.path.basename(full)
-            if name == os.path.basename(script_path):
-                continue
-            if os.path.isfile(full) and name.lower().endswith(('.png', '.jpg', '.jpeg', '.svg', '.gif', '.pdf', '.csv', '.txt', '.sql')):
-                produced.append(full)
-
-        result = {
-            "returncode": returncode,
-            "stdout": stdout,
-            "stderr": stderr,
-            "path": script_path,
-            "files": produced,
-            "copied": [],
-        }
-        logger.info("run_python_code: returning result with stdout length=%d, files=%s", len(result['stdout'] or ""), result['files'])
-        return result
+        return _execute_in_dir(script_path, run_space_dir, timeout, before_files, code)
     else:
         # Fallback: isolated temp dir execution (unchanged, but also uses communicate)
         with tempfile.TemporaryDirectory() as d:
@@ -217,12 +280,17 @@ def run_python_code(code: str, outfile: Optional[str] = None, timeout: int = 100
                 logger.error("Failed to write script in temp dir: %s", e)
                 return {"returncode": -2, "stdout": "", "stderr": f"Script write failed: {e}", "path": script_path, "files": [], "copied": copied_files}
 
+            syntax_error = _syntax_error(code, script_path)
+            if syntax_error:
+                logger.error("Generated script does not compile: %s", syntax_error.strip())
+                return {"returncode": 1, "stdout": "", "stderr": syntax_error, "path": script_path, "files": [], "copied": copied_files}
+
             logger.info("Executing script in temp dir: %s", script_path)
             if not os.path.exists(script_path):
                 logger.error("Script file was not found in temp dir after write: %s", script_path)
                 return {"returncode": -2, "stdout": "", "stderr": f"Script file not found: {script_path}", "path": script_path, "files": [], "copied": copied_files}
             try:
-                completed = subprocess.run([sys.executable, os.path.basename(script_path)], capture_output=True, text=True, timeout=timeout, cwd=d)
+                completed = subprocess.run([sys.executable, os.path.basename(script_path)], capture_output=True, text=True, timeout=timeout, cwd=d, env=_script_env())
             except subprocess.TimeoutExpired as e:
                 logger.warning("Script timeout after %s seconds", timeout)
                 return {"returncode": -1, "stdout": e.stdout or "", "stderr": f"Timeout after {timeout}s", "path": script_path, "files": [], "copied": copied_files}
@@ -250,6 +318,30 @@ def run_python_code(code: str, outfile: Optional[str] = None, timeout: int = 100
             return result
 
 
+def run_python_file(script_path: str, timeout: int = 10000, run_space_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    Run a script that is already saved on disk, in place, with cwd=run_space_dir
+    (default: the script's folder). Unlike run_python_code the source is not
+    passed around as a string or rewritten to generated_script.py; the result
+    dict has the same shape.
+    """
+    script_path = os.path.abspath(script_path)
+    run_space_dir = os.path.abspath(run_space_dir or os.path.dirname(script_path))
+    logger.info("run_python_file: %s (timeout=%s, run_space_dir=%s)", script_path, timeout, run_space_dir)
+    try:
+        with open(script_path, "rb") as f:
+            source = f.read()
+    except OSError as e:
+        logger.error("Script file could not be read: %s", e)
+        return {"returncode": -2, "stdout": "", "stderr": f"Script file not found: {script_path}", "path": script_path, "files": [], "copied": []}
+    try:
+        with os.scandir(run_space_dir) as it:
+            before_files = {e.name for e in it}
+    except OSError:
+        before_files = set()
+    return _execute_in_dir(script_path, run_space_dir, timeout, before_files, source)
+
+
 def save_generated_code(code: str, filename: str = "generated_code.py") -> None:
     try:
         with open(filename, "w", encoding="utf-8") as f:
@@ -7,35 +7,17 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from modules.api_Call import api_call
+from modules.api_Call import api_call, evict_cached
 
-def generate_create_sql_writer_script(metadata_file, plantuml_file, output_file, model=None):
-    """
-    Generates a Python script that, when run, writes CREATE TABLE SQL statements to a .sql file.
-    """
-    with open(metadata_file, 'r') as file:
-        refined_metadata = json.load(file)
-
-    plantuml_code = ""
-    if os.path.exists(plantuml_file):
-        with open(plantuml_file, 'r') as file:
-            plantuml_code = file.read()
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    _HAS_ORJSON = False
 
-    example_metadata = """[
-    {
-        "file_name": "orders",
-        "directory_path": "orders.csv",
-        "columns": [
-            {
-                "column_name": "order_id",
-                "data_type": "number",
-                "has_duplicates": false
-            }, ...
-        ]
-    }, ...
-]"""
-
-    example_code = """
+# Static example embedded in the prompt, built once at import
+EXAMPLE_CODE = """
 import os
 
 def write_create_tables_sql():
@@ -67,6 +49,20 @@ if __name__ == '__main__':
     write_create_tables_sql()
 """
 
+def build_create_writer_prompt(metadata_file, plantuml_file):
+    """The prompt generate_create_sql_writer_script sends for these input files."""
+    if _HAS_ORJSON:
+        with open(metadata_file, 'rb') as file:
+            refined_metadata = orjson.loads(file.read())
+    else:
+        with open(metadata_file, 'r') as file:
+            refined_metadata = json.load(file)
+
+    plantuml_code = ""
+    if os.path.exists(plantuml_file):
+        with open(plantuml_file, 'r') as file:
+            plantuml_code = file.read()
+
     prompt = f"""You are a Python coding assistant and MySQL database expert.
 
 Task:
@@ -93,13 +89,22 @@ Here is the ER diagram in PlantUML for context on relationships:
 {plantuml_code}
 
 Use the following Python code as a template for the script you need to generate:
-{example_code}
+{EXAMPLE_CODE}
 
 Return only a Python script that is fully executable as a single file. Do not include explanations or markdown.
 """
+    return prompt
+
+def generate_create_sql_writer_script(metadata_file, plantuml_file, output_file, model=None, use_cache=True):
+    """
+    Generates a Python script that, when run, writes CREATE TABLE SQL statements to a .sql file.
+    Returns the generated source (also written to output_file). Pass use_cache=False
+    to ask the model again instead of reusing a cached reply.
+    """
+    prompt = build_create_writer_prompt(metadata_file, plantuml_file)
 
     print("⏳ Generating Python script to write SQL file...")
-    py_code = api_call(prompt, model=model)
+    py_code = api_call(prompt, model=model, use_cache=use_cache)
 
     if "```python" in py_code:
         py_code = py_code.split("```python")[1].split("```")[0]
@@ -108,10 +113,16 @@ Return only a Python script that is fully executable as a single file. Do not in
     if out_dir:
         os.makedirs(out_dir, exist_ok=True)
 
+    py_code = py_code.strip()
     with open(output_file, "w") as f:
-        f.write(py_code.strip())
+        f.write(py_code)
 
     print(f"✅ Python script (for writing SQL) generated and saved to: {output_file}")
+    return py_code
+
+def evict_create_sql_writer_script(metadata_file, plantuml_file, model=None):
+    """Drop the cached reply for these inputs, e.g. once its script or SQL turned out broken."""
+    evict_cached(build_create_writer_prompt(metadata_file, plantuml_file), model=model)
 
 if __name__ == "__main__":
 
@@ -0,0 +1,114 @@
+"""
+sql_Parser.py
+
+Small scanners for generated SQL scripts. They walk the text with compiled
+delimiter searches instead of `.*?` regexes over the whole file, so ';' / ')'
+characters inside quotes or comments are handled and nothing backtracks on
+large inputs.
+"""
+import re
+from typing import Iterator, List, Tuple
+
+CREATE_TABLE_HEAD_REGEX = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:`?[\w_]+`?\.)?[`\"]?([\w_]+)[`\"]?\s*\(",
+    re.IGNORECASE,
+)
+
+# tokens that can change the scanner state inside a statement body: quotes, parentheses,
+# ';' and the starts of MySQL comments (-- , # and /* */)
+_BODY_DELIMS = re.compile(r"['\"`();#]|--|/\*")
+# the same without parentheses, for splitting a script into statements
+_SPLIT_DELIMS = re.compile(r"['\"`;#]|--|/\*")
+
+
+def _skip_span(sql_text: str, i: int) -> int:
+    """
+    If a quoted literal/identifier or a comment starts at `i`, return the index just
+    past it (len(sql_text) for a line comment at the end of the text, -1 if a quote or
+    block comment is never closed). Otherwise return `i` unchanged.
+    """
+    ch = sql_text[i]
+    if ch in "'\"`":
+        # jump straight to the closing (unescaped) quote
+        close = sql_text.find(ch, i + 1)
+        while close != -1 and sql_text[close - 1] == "\\":
+            close = sql_text.find(ch, close + 1)
+        return -1 if close == -1 else close + 1
+    if ch == "#" or (sql_text.startswith("--", i) and sql_text[i + 2:i + 3] in ("", " ", "\t", "\n", "\r")):
+        # MySQL only treats '--' as a comment when whitespace follows it
+        eol = sql_text.find("\n", i)
+        return len(sql_text) if eol == -1 else eol + 1
+    if sql_text.startswith("/*", i):
+        close = sql_text.find("*/", i + 2)
+        return -1 if close == -1 else close + 2
+    return i
+
+
+def find_statement_end(sql_text: str, pos: int, depth: int = 0) -> int:
+    """
+    Return the index of the ';' that terminates the statement starting at `pos`
+    (outside quotes and comments, at parenthesis depth 0), or -1 if there is none.
+    `depth` is the nesting level already open at `pos`.
+    """
+    m = _BODY_DELIMS.search(sql_text, pos)
+    while m:
+        i = m.start()
+        after = _skip_span(sql_text, i)
+        if after == -1:
+            return -1
+        if after != i:
+            m = _BODY_DELIMS.search(sql_text, after)
+            continue
+        ch = sql_text[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch == ";" and depth == 0:
+            return i
+        m = _BODY_DELIMS.search(sql_text, i + 1)
+    return -1
+
+
+def iter_create_blocks(sql_text: str) -> Iterator[Tuple[str, str]]:
+    """Yield (full_create_statement, table_name) for every CREATE TABLE ... ; in sql_text."""
+    pos = 0
+    while True:
+        head = CREATE_TABLE_HEAD_REGEX.search(sql_text, pos)
+        if not head:
+            return
+        end = find_statement_end(sql_text, head.end(), depth=1)
+        if end == -1:
+            return
+        yield sql_text[head.start():end + 1], head.group(1)
+        pos = end + 1
+
+
+def split_sql_statements(sql_text: str) -> List[str]:
+    """Split on ';' outside quoted literals/identifiers and comments.
+
+    Skip-scans with a compiled delimiter search instead of visiting every
+    character, so the work is proportional to the number of delimiters.
+    """
+    statements = []
+    start = 0
+    m = _SPLIT_DELIMS.search(sql_text)
+    while m:
+        i = m.start()
+        after = _skip_span(sql_text, i)
+        if after == -1:
+            # unterminated quote or comment: the rest is one trailing statement
+            break
+        if after != i:
+            m = _SPLIT_DELIMS.search(sql_text, after)
+            continue
+        if sql_text[i] == ";":
+            stmt = sql_text[start:i + 1].strip()
+            if stmt:
+                statements.append(stmt)
+            start = i + 1
+        m = _SPLIT_DELIMS.search(sql_text, i + 1)
+    leftover = sql_text[start:].strip()
+    if leftover:
+        statements.append(leftover)
+    return statements
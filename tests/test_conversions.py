@@ -0,0 +1,34 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+conversions = pytest.importorskip("modules.conversions")
+
+
+def test_write_dataframe_csv_matches_to_csv(tmp_path):
+    df = pd.DataFrame({
+        "name": ["plain", "has, comma", 'has "quote"', None],
+        "when": pd.to_datetime(["2024-01-01", "2024-01-02 03:04:05", None, "2024-12-31"]),
+        "amount": [1.0, 2.5, None, 3.0],
+        "count": [1, 2, 3, 4],
+    })
+    out = tmp_path / "out.csv"
+    conversions._write_dataframe_csv(df, str(out))
+    assert out.read_text(encoding="utf-8") == df.to_csv(index=False)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_streamed_xlsx_matches_read_excel(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["id", "name", "name", None, "name.1", "id"])
+    ws.append([1, "a", "b", "x", "c", 10])
+    ws.append([None, None, None, None, None, None])
+    ws.append([2, "has, comma", "e", "y", "f", 20])
+    xlsx = tmp_path / "book.xlsx"
+    wb.save(xlsx)
+
+    streamed = tmp_path / "streamed.csv"
+    conversions._stream_xlsx_to_csv(str(xlsx), str(streamed))
+    expected = conversions._read_first_sheet(str(xlsx)).to_csv(index=False)
+    assert streamed.read_bytes() == expected.encode("utf-8")
@@ -0,0 +1,49 @@
+from modules.sql_Parser import find_statement_end, iter_create_blocks, split_sql_statements
+
+SCRIPT_WITH_COMMENTS = """
+-- customer's master data
+CREATE TABLE customers (
+    id INT PRIMARY KEY, # the customer's id
+    name VARCHAR(100) /* can't be null; see below */ NOT NULL
+);
+/* orders: one row per customer's order */
+CREATE TABLE orders (
+    id INT PRIMARY KEY,
+    customer_id INT, -- FK to customers(id); it's required
+    note VARCHAR(20) DEFAULT 'a;b)'
+);
+"""
+
+
+def test_iter_create_blocks_ignores_quotes_in_comments():
+    blocks = list(iter_create_blocks(SCRIPT_WITH_COMMENTS))
+    assert [name for _, name in blocks] == ["customers", "orders"]
+    assert blocks[1][0].rstrip().endswith("DEFAULT 'a;b)'\n);")
+
+
+def test_split_ignores_semicolons_and_quotes_in_comments():
+    statements = split_sql_statements(SCRIPT_WITH_COMMENTS)
+    assert len(statements) == 2
+    assert statements[0].startswith("-- customer's master data")
+    assert statements[1].endswith("DEFAULT 'a;b)'\n);")
+
+
+def test_split_plain_statements_and_trailing_text():
+    assert split_sql_statements("SELECT 1; SELECT 'x;y';\nSELECT 2") == [
+        "SELECT 1;", "SELECT 'x;y';", "SELECT 2",
+    ]
+
+
+def test_double_dash_without_space_is_not_a_comment():
+    # MySQL reads 5--1 as 5 - (-1)
+    assert split_sql_statements("SELECT 5--1; SELECT 2;") == ["SELECT 5--1;", "SELECT 2;"]
+
+
+def test_escaped_quote_inside_literal():
+    assert split_sql_statements(r"INSERT INTO t VALUES ('it\'s;here'); SELECT 1;") == [
+        r"INSERT INTO t VALUES ('it\'s;here');", "SELECT 1;",
+    ]
+
+
+def test_find_statement_end_unterminated_block_comment():
+    assert find_statement_end("CREATE TABLE t (a INT) /* never closed;", 0) == -1